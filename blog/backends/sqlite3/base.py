@@ -0,0 +1,54 @@
+"""SQLite backend that tunes each new connection for a web server.
+
+Use it as the ENGINE of a database in place of
+``django.db.backends.sqlite3``. Every new connection runs the PRAGMAs in
+``DEFAULT_PRAGMAS``, overridden by the ``pragmas`` dict in the database's
+OPTIONS:
+
+* WAL journaling lets readers carry on while a writer commits.
+* ``synchronous = NORMAL`` is safe under WAL and skips an fsync per commit.
+* ``mmap_size`` and ``cache_size`` keep hot pages in memory.
+
+How long a writer waits for the lock, instead of failing with "database
+is locked", is the ``timeout`` of OPTIONS, which sqlite3 applies as the
+busy timeout. No PRAGMA sets it here, so the two cannot disagree.
+
+Pair it with CONN_MAX_AGE so connections, and the page cache that comes
+with them, are reused across requests.
+"""
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative values are in KiB.
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+}
+
+
+def apply_pragmas(connection, pragmas):
+    """Run ``PRAGMA name = value`` on a DB-API connection for each pragma."""
+    cursor = connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute('PRAGMA %s = %s' % (name, value))
+    finally:
+        cursor.close()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # Not an argument of sqlite3.connect().
+        kwargs.pop('pragmas', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = dict(DEFAULT_PRAGMAS)
+        pragmas.update(self.settings_dict['OPTIONS'].get('pragmas', {}))
+        apply_pragmas(conn, pragmas)
+        return conn
@@ -42,23 +42,32 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blogs.middleware.MetricsMiddleware',
+    'blogs.middleware.TemplateProfileMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'blogs.middleware.CachedAuthenticationMiddleware',
+    'blogs.middleware.HashingBusyMiddleware',
+    'blogs.middleware.ReplicaPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'blog.urls'
 
+# Outside DEBUG, templates are compiled once and kept by the cached loader;
+# blog.wsgi warms it at startup.
+template_loaders = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [os.path.join(BASE_DIR, 'templates')]
-        ,
-        'APP_DIRS': True,
+        'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -66,6 +75,9 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'loaders': template_loaders if DEBUG else [
+                ('django.template.loaders.cached.Loader', template_loaders),
+            ],
         },
     },
 ]
@@ -76,17 +88,134 @@ WSGI_APPLICATION = 'blog.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
+# blog.backends.sqlite3 enables WAL and memory-mapped I/O on each
+# connection; see that module for the PRAGMAs and how to override them.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'blog.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Keep connections open between requests.
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            # Seconds sqlite3 waits for a lock before raising an error; this
+            # is the connection's busy_timeout.
+            'timeout': 20,
+        },
     }
 }
 
 
+# Reads of the blogs app go to the aliases in BLOGS_READ_REPLICAS, if any.
+DATABASE_ROUTERS = ['blogs.routers.PrimaryReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Rendered post and comment bodies, evicted least recently used first.
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'blogs-fragments',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+    # Whole pages served to anonymous readers; off while developing.
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+        if DEBUG else 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'blogs-pages',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    },
+    # Sessions in cached_db mode. A local-memory cache is only safe with a
+    # single process; point it at a shared cache when running several.
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'blogs-sessions',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    # Captcha images; hold more entries than BLOGS_CAPTCHA_POOL_SIZE. In a
+    # shared cache the captcha_pool command draws the images of the
+    # challenges it adds; in this one each web process draws them itself.
+    'captchas': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'blogs-captchas',
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000,
+        },
+    },
+    # Rate limit buckets and counters. Limits only hold across processes
+    # if this is a shared cache.
+    'ratelimit': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'blogs-ratelimit',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    # Request metrics. Only counts the requests of other processes if
+    # this is a shared cache. Counters are never evicted while there is
+    # room for all of them (about 30 per route).
+    'metrics': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'blogs-metrics',
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000,
+        },
+    },
+}
+
+
+# Sessions
+# https://docs.djangoproject.com/en/2.1/topics/http/sessions/
+
+# 'db' reads django_session on every request that uses the session,
+# 'cached_db' reads it only on a cache miss, and 'signed_cookies' keeps the
+# session in the browser, so logging out cannot end a copied cookie.
+# Expired rows are deleted by the sweep_sessions command. Only use
+# 'cached_db' once the 'sessions' cache is shared by every process: with a
+# local-memory cache, a logout in one process leaves the session valid in
+# the others. A system check warns about that.
+BLOGS_SESSION_MODE = 'db'
+
+BLOGS_SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = BLOGS_SESSION_ENGINES[BLOGS_SESSION_MODE]
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Cache alias and lifetime in seconds of signed-in users, saving a query on
+# every request, or None to load them from the database. Only name a cache
+# shared by every process: a local-memory cache keeps serving a user whose
+# password changed in another process. A system check warns about that.
+# See blogs.auth.
+BLOGS_USER_CACHE = None
+BLOGS_USER_CACHE_TIMEOUT = 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
+# Django's default hashers, with PBKDF2 run through blogs.hashing, which
+# bounds how many hashes run at once. Existing hashes stay valid.
+PASSWORD_HASHERS = [
+    'blogs.hashing.BoundedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -121,6 +250,12 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.1/howto/static-files/
 
 STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# Outside DEBUG, collectstatic hashes, bundles and precompresses the files.
+STATICFILES_STORAGE = (
+    'django.contrib.staticfiles.storage.StaticFilesStorage'
+    if DEBUG else 'blogs.staticfiles.PipelineStorage')
 
 # My setting
 
@@ -128,4 +263,104 @@ LOGIN_URL = '/login'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
-CAPTCHA_TEST_MODE = True
\ No newline at end of file
+CAPTCHA_TEST_MODE = True
+
+# Forms show challenges from a pool that the captcha_pool command keeps
+# filled, each while it has at least CAPTCHA_GET_FROM_POOL_TIMEOUT of its
+# CAPTCHA_TIMEOUT minutes left. See blogs.captchas.
+CAPTCHA_GET_FROM_POOL = True
+CAPTCHA_GET_FROM_POOL_TIMEOUT = 5
+CAPTCHA_TIMEOUT = 20
+BLOGS_CAPTCHA_POOL_SIZE = 500
+
+# Cache alias of rendered captcha images.
+BLOGS_CAPTCHA_IMAGE_CACHE = 'captchas'
+
+# Number of posts on each page of the home feed.
+BLOGS_PAGE_SIZE = 20
+
+# Number of comments on each page of a post's comments.
+BLOGS_COMMENT_PAGE_SIZE = 20
+
+# Number of posts in the RSS and Atom feeds.
+BLOGS_FEED_SIZE = 20
+
+# Cache alias of rendered post and comment bodies, and the largest body in
+# bytes worth keeping there.
+BLOGS_FRAGMENT_CACHE = 'fragments'
+BLOGS_FRAGMENT_MAX_SIZE = 64 * 1024
+
+# Database aliases of read replicas, and how many seconds after a write a
+# user's reads stay on the primary.
+BLOGS_READ_REPLICAS = []
+BLOGS_REPLICA_PIN_SECONDS = 10
+
+# How search text is split into tokens; run rebuild_search_index after
+# changing it. See blogs.search for the choices.
+BLOGS_SEARCH_TOKENIZER = 'blogs.search.CJKTokenizer'
+
+# Cache alias and lifetime in seconds of pages served to anonymous readers.
+BLOGS_PAGE_CACHE = 'pages'
+BLOGS_PAGE_CACHE_TIMEOUT = 600
+# Directory the export_static command renders pages to, or None to turn
+# off queueing of re-renders on save.
+BLOGS_STATIC_EXPORT_DIR = None
+
+# Stylesheets joined into one minified bundle by collectstatic, and icons
+# inlined into pages rather than fetched.
+BLOGS_CSS_BUNDLE = [
+    'blogs/css/normalize.css',
+    'blogs/css/milligram.min.css',
+    'blogs/css/style.css',
+]
+BLOGS_INLINE_SVGS = [
+    'blogs/images/edit.svg',
+    'blogs/images/rubbish-bin.svg',
+    'blogs/images/comment-bubble.svg',
+]
+
+# Time templates and tags on every request, reported in a Server-Timing
+# header. See blogs.rendering.
+BLOGS_TEMPLATE_PROFILE = False
+
+# Rate limits of the login, signup and write routes, which are set in
+# blogs.urls. See blogs.ratelimit for the stores.
+BLOGS_RATELIMIT_ENABLED = True
+BLOGS_RATELIMIT_STORE = 'blogs.ratelimit.CacheStore'
+BLOGS_RATELIMIT_CACHE = 'ratelimit'
+BLOGS_RATELIMIT_IP_META = 'REMOTE_ADDR'
+
+# Password hashes run at once in each process, None for half the cores or
+# 0 for no bound, and the seconds a request waits for one before it gets a
+# 503. PBKDF2 iterations, or None for Django's default. See blogs.hashing.
+BLOGS_HASHING_CONCURRENCY = None
+BLOGS_HASHING_WAIT = 1.0
+BLOGS_PASSWORD_ITERATIONS = None
+
+# Deleting a post only hides it, with its comments, until reap_tombstones
+# deletes them in batches. See blogs.tombstones.
+BLOGS_SOFT_DELETE = True
+
+# Run search indexing and static export queueing at once, rather than
+# through the task queue, only while developing; otherwise run run_tasks
+# workers. Retries wait BLOGS_TASKS_RETRY_DELAY seconds, doubling with each
+# attempt; a worker holds a task for BLOGS_TASKS_LEASE seconds. See
+# blogs.tasks.
+BLOGS_TASKS_EAGER = DEBUG
+BLOGS_TASKS_MAX_ATTEMPTS = 5
+BLOGS_TASKS_RETRY_DELAY = 2
+BLOGS_TASKS_MAX_RETRY_DELAY = 3600
+BLOGS_TASKS_LEASE = 300
+
+# Count the latency, queries, template time and cache hits of each route,
+# adding them to the counters in BLOGS_METRICS_CACHE at most every
+# BLOGS_METRICS_FLUSH_INTERVAL seconds. Queries slower than
+# BLOGS_SLOW_QUERY_SECONDS are logged. /metrics answers requests bearing
+# BLOGS_METRICS_TOKEN if it is set, and otherwise only unproxied requests
+# from BLOGS_METRICS_ALLOWED_IPS. See blogs.metrics.
+BLOGS_METRICS_ENABLED = True
+BLOGS_METRICS_CACHE = 'metrics'
+BLOGS_METRICS_FLUSH_INTERVAL = 5
+BLOGS_SLOW_QUERY_SECONDS = 0.1
+BLOGS_METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+BLOGS_METRICS_TOKEN = None
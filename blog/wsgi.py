@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog.settings')
 
 application = get_wsgi_application()
+
+# Compile templates now rather than on the first requests.
+from blogs.rendering import warm_templates  # noqa: E402
+
+warm_templates()
@@ -1,5 +1,33 @@
 from django.contrib import admin
-from blogs.models import Post, Comment
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.models import User
+
+from blogs.models import Post, Comment, Task
+from blogs.tombstones import tombstone_user
 
 admin.site.register(Post)
 admin.site.register(Comment)
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['name', 'args', 'run_at', 'attempts', 'locked_by',
+                    'failed_at']
+    list_filter = ['name']
+
+
+class BlogUserAdmin(UserAdmin):
+    actions = ['delete_in_background']
+
+    def delete_in_background(self, request, queryset):
+        """Hide users and their content now; reap_tombstones deletes them."""
+        for user in queryset:
+            tombstone_user(user)
+        self.message_user(request, 'Deleting %d users in the background.'
+                          % len(queryset))
+    delete_in_background.short_description = \
+        'Delete selected users in the background'
+
+
+admin.site.unregister(User)
+admin.site.register(User, BlogUserAdmin)
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class BlogsConfig(AppConfig):
     name = 'blogs'
+
+    def ready(self):
+        # Connect the receivers that keep the search index in sync.
+        import blogs.signals  # noqa: F401
+        # Register the system checks.
+        import blogs.checks  # noqa: F401
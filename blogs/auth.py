@@ -0,0 +1,90 @@
+"""Caching of the signed-in user between requests.
+
+``django.contrib.auth`` loads the user from ``auth_user`` on every request
+that touches ``request.user``, which is every page, since ``base.html``
+shows the username. ``CachedAuthenticationMiddleware`` keeps the user in
+the cache named by ``BLOGS_USER_CACHE`` for ``BLOGS_USER_CACHE_TIMEOUT``
+seconds instead, and checks the session against it the way Django does, so
+a password change still ends the user's other sessions.
+
+The cache must be shared by every process: a local-memory cache only
+learns of the changes made in its own process, and the others would keep
+accepting the sessions of a user whose password changed or who was
+deactivated. Caching is therefore off unless ``BLOGS_USER_CACHE`` names a
+cache, and a system check warns when that is a local-memory one.
+
+Each user's key carries a version token, replaced whenever the user is
+saved or deleted or logs out (see ``blogs.signals``). A request that read
+the old token before the change can only store its user under the old key,
+which no one reads again. Updates made with ``QuerySet.update()`` send no
+signals; call ``invalidate_user`` after them.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, \
+    SESSION_KEY, get_user_model, load_backend
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+
+
+def user_cache():
+    """Return the cache holding signed-in users, or None if they are not
+    cached."""
+    alias = getattr(settings, 'BLOGS_USER_CACHE', None)
+    return caches[alias] if alias is not None else None
+
+
+def user_version_key(user_id):
+    return 'blogs:user-version:%s' % user_id
+
+
+def invalidate_user(user_id):
+    """Stop serving the cached copy of a user."""
+    cache = user_cache()
+    if cache is not None:
+        cache.set(user_version_key(user_id), time.time(), None)
+
+
+def load_user(user_id, backend):
+    """Return the user from the cache, or from ``backend`` on a miss."""
+    cache = user_cache()
+    if cache is None:
+        return load_backend(backend).get_user(user_id)
+    version_key = user_version_key(user_id)
+    version = cache.get(version_key)
+    if version is None:
+        version = time.time()
+        cache.set(version_key, version, None)
+
+    key = 'blogs:user:%s:%s:%r' % (backend, user_id, version)
+    user = cache.get(key)
+    if user is None:
+        user = load_backend(backend).get_user(user_id)
+        if user is not None:
+            cache.set(key, user,
+                      getattr(settings, 'BLOGS_USER_CACHE_TIMEOUT', 60))
+    return user
+
+
+def get_user(request):
+    """Like ``django.contrib.auth.get_user``, through the user cache."""
+    try:
+        user_id = get_user_model()._meta.pk.to_python(
+            request.session[SESSION_KEY])
+        backend = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+
+    user = load_user(user_id, backend)
+    if user is not None and hasattr(user, 'get_session_auth_hash'):
+        # Verify the session, as Django does.
+        session_hash = request.session.get(HASH_SESSION_KEY)
+        if not (session_hash and constant_time_compare(
+                session_hash, user.get_session_auth_hash())):
+            request.session.flush()
+            user = None
+    return user or AnonymousUser()
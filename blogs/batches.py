@@ -0,0 +1,28 @@
+"""Deleting many rows without holding the write lock for long.
+
+A single DELETE of every matching row locks SQLite for its whole run and
+stalls every writer. ``delete_in_batches`` deletes at most ``batch_size``
+rows per statement and pauses between statements so others get a turn.
+"""
+import time
+
+
+def delete_in_batches(queryset, batch_size=1000, pause=0.1, stdout=None,
+                      label='rows', on_batch=None):
+    """Delete the rows of ``queryset``, and return how many were deleted.
+    ``on_batch`` is called with the primary keys of each deleted batch."""
+    model = queryset.model
+    deleted = 0
+    while True:
+        keys = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not keys:
+            break
+        deleted += model._base_manager.filter(pk__in=keys).delete()[0]
+        if on_batch is not None:
+            on_batch(keys)
+        if stdout is not None:
+            stdout.write('Deleted %d %s' % (deleted, label))
+        if len(keys) < batch_size:
+            break
+        time.sleep(pause)
+    return deleted
@@ -0,0 +1,37 @@
+"""Helpers shared by the benchmark management commands."""
+import math
+import time
+
+
+def percentile(samples, pct):
+    """Return the ``pct`` percentile of ``samples`` (nearest rank)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, int(math.ceil(pct / 100.0 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def summarize(samples, elapsed):
+    """Return throughput and latency percentiles in milliseconds."""
+    return {
+        'count': len(samples),
+        'per_second': len(samples) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+    }
+
+
+def format_summary(label, summary):
+    """Return ``summary`` as one line of a report."""
+    return '%-24s %8d %10.1f/s  p50 %7.2fms  p95 %7.2fms  p99 %7.2fms' % (
+        label, summary['count'], summary['per_second'], summary['p50_ms'],
+        summary['p95_ms'], summary['p99_ms'])
+
+
+def timed(func, *args, **kwargs):
+    """Call ``func`` and return the seconds it took."""
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
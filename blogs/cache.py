@@ -0,0 +1,200 @@
+"""Caching of rendered post and comment bodies, and of whole pages.
+
+Bodies are read far more often than they are written, so the HTML that
+``linebreaks`` produces for them is kept in the cache named by the
+``BLOGS_FRAGMENT_CACHE`` setting. Keys carry the object's ``last_date`` and
+a checksum of its content: ``last_date`` is a day, so only the checksum
+tells apart two edits made on the same day. The edit and delete paths in
+``blogs.views`` drop the old key so it does not linger until evicted.
+
+The cache backend bounds memory: the local-memory backend evicts least
+recently used entries past ``MAX_ENTRIES``. Bodies larger than
+``BLOGS_FRAGMENT_MAX_SIZE`` are rendered on every request rather than
+letting a few huge posts crowd out everything else.
+
+Whole pages are cached for anonymous readers only, in the cache named by
+``BLOGS_PAGE_CACHE``. Every page belongs to a scope (the feed, or a single
+post) whose version token is part of the page keys; purging a scope
+replaces the token, which drops exactly the pages of that scope.
+"""
+import hashlib
+import time
+import zlib
+from datetime import datetime
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.html import linebreaks
+from django.utils.http import http_date, quote_etag
+from django.utils.safestring import mark_safe
+
+from blogs.metrics import count_cache
+
+FEED_SCOPE = 'feed'
+
+
+def fragment_cache():
+    """Return the cache holding rendered fragments."""
+    return caches[getattr(settings, 'BLOGS_FRAGMENT_CACHE', 'default')]
+
+
+def fragment_key(obj):
+    """Return the cache key of the rendered content of ``obj``, which
+    changes with every edit of it, even on the same day."""
+    return 'blogs:fragment:%s:%d:%s:%08x' % (
+        obj._meta.model_name, obj.pk, obj.last_date.isoformat(),
+        zlib.crc32(obj.content.encode()))
+
+
+def attach_rendered_content(objects):
+    """Set ``content_html`` on each of ``objects`` to its rendered content.
+
+    Cached fragments are fetched in a single round trip and only the
+    missing ones are rendered and stored.
+    """
+    objects = list(objects)
+    cache = fragment_cache()
+    keys = {fragment_key(obj): obj for obj in objects}
+    found = cache.get_many(keys)
+    count_cache('fragments', 'hit', len(found))
+    count_cache('fragments', 'miss', len(keys) - len(found))
+
+    max_size = getattr(settings, 'BLOGS_FRAGMENT_MAX_SIZE', 64 * 1024)
+    missing = {}
+    for key, obj in keys.items():
+        html = found.get(key)
+        if html is None:
+            html = linebreaks(obj.content, autoescape=True)
+            if len(html) <= max_size:
+                missing[key] = html
+        obj.content_html = mark_safe(html)
+    if missing:
+        cache.set_many(missing)
+    return objects
+
+
+def invalidate_fragment(obj):
+    """Drop the rendered content of ``obj`` after it was edited or deleted."""
+    fragment_cache().delete(fragment_key(obj))
+
+
+def page_cache():
+    """Return the cache holding anonymous pages."""
+    return caches[getattr(settings, 'BLOGS_PAGE_CACHE', 'default')]
+
+
+def post_scope(post_id):
+    """Return the page scope of a single post."""
+    return 'post:%d' % post_id
+
+
+def page_version(scope):
+    """Return the version token of ``scope``.
+
+    The token is the time the scope last changed. A token lost to eviction
+    is replaced with the current time, so old pages are never reused.
+    """
+    cache = page_cache()
+    key = 'blogs:page-version:%s' % scope
+    version = cache.get(key)
+    if version is None:
+        version = time.time()
+        cache.set(key, version, None)
+    return version
+
+
+def purge_pages(scope):
+    """Drop every cached page of ``scope``."""
+    page_cache().set('blogs:page-version:%s' % scope, time.time(), None)
+
+
+def purge_post_pages(post_id):
+    """Drop the cached page of a single post."""
+    purge_pages(post_scope(post_id))
+
+
+def purge_feed_pages():
+    """Drop every cached page of the home feed."""
+    purge_pages(FEED_SCOPE)
+
+
+def count_page_cache(outcome):
+    """Add one to the counter of ``outcome`` (hit, miss or not_modified)."""
+    count_cache('pages', outcome)
+    cache = page_cache()
+    key = 'blogs:page-stats:%s' % outcome
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr().
+        cache.set(key, 1, None)
+
+
+def page_cache_stats():
+    """Return the hit, miss and not_modified counters."""
+    outcomes = ['hit', 'miss', 'not_modified']
+    found = page_cache().get_many(
+        ['blogs:page-stats:%s' % outcome for outcome in outcomes])
+    return {outcome: found.get('blogs:page-stats:%s' % outcome, 0)
+            for outcome in outcomes}
+
+
+def anonymous_page_cache(scope, last_modified=None):
+    """Cache the responses of a view for anonymous readers.
+
+    ``scope(request, **kwargs)`` returns the scope the page belongs to.
+    ``last_modified(request, **kwargs)``, if given, returns the date the
+    content last changed according to the database, or None when there is
+    no such content. Both feed the ETag and Last-Modified headers used to
+    answer conditional GETs with 304.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def inner(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or \
+                    request.user.is_authenticated:
+                return view_func(request, *args, **kwargs)
+
+            page_scope = scope(request, *args, **kwargs)
+            changed = datetime.fromtimestamp(page_version(page_scope),
+                                             timezone.utc)
+            if last_modified is not None:
+                changed_date = last_modified(request, *args, **kwargs)
+                if changed_date is None:
+                    return view_func(request, *args, **kwargs)
+                changed = max(changed, timezone.make_aware(
+                    datetime.combine(changed_date, datetime.min.time())))
+
+            tag = hashlib.md5(('%s:%s:%s' % (
+                page_scope, changed.timestamp(), request.get_full_path()
+            )).encode()).hexdigest()
+            etag = quote_etag(tag)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=int(changed.timestamp()))
+            if response is not None:
+                count_page_cache('not_modified')
+                return response
+
+            cache = page_cache()
+            key = 'blogs:page:%s:%s' % (page_scope, tag)
+            response = cache.get(key)
+            if response is not None:
+                count_page_cache('hit')
+                response['X-Page-Cache'] = 'hit'
+                return response
+
+            count_page_cache('miss')
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and not response.cookies:
+                response['ETag'] = etag
+                response['Last-Modified'] = http_date(changed.timestamp())
+                cache.set(key, response, getattr(
+                    settings, 'BLOGS_PAGE_CACHE_TIMEOUT', 600))
+                response['X-Page-Cache'] = 'miss'
+            return response
+        return inner
+    return decorator
@@ -0,0 +1,144 @@
+"""A pool of pre-generated captcha challenges, and cached captcha images.
+
+Rendering a captcha form normally inserts a new ``CaptchaStore`` row, and
+each image request draws the challenge again with PIL. With
+``CAPTCHA_GET_FROM_POOL`` on, forms instead show a random challenge from a
+pool that the ``captcha_pool`` command keeps filled and purges of expired
+rows, in batches. A challenge is only handed out while it has at least
+``CAPTCHA_GET_FROM_POOL_TIMEOUT`` minutes left, so ``CAPTCHA_TIMEOUT`` must
+be longer than that.
+
+A captcha image depends on nothing but its key, so rendered PNGs are kept
+in the cache named by ``BLOGS_CAPTCHA_IMAGE_CACHE`` until the challenge
+expires. ``captcha_pool`` draws the images of the challenges it adds only
+when that cache is shared; a local-memory cache is private to the command,
+so web processes then draw each image on its first request.
+"""
+import random
+import time
+from datetime import timedelta
+
+from captcha.conf import settings as captcha_settings
+from captcha.models import CaptchaStore
+from captcha.views import captcha_image
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import Http404, HttpResponse
+from django.utils import timezone
+
+from blogs.batches import delete_in_batches
+from blogs.checks import is_local_cache
+
+# How long pick_key() trusts the id range of the pool, in seconds.
+BOUNDS_SECONDS = 10
+
+_bounds = None
+
+
+def fresh_challenges():
+    """Return the pooled challenges with enough time left to be solved."""
+    minimum_expiration = timezone.now() + timedelta(
+        minutes=int(captcha_settings.CAPTCHA_GET_FROM_POOL_TIMEOUT))
+    return CaptchaStore.objects.filter(expiration__gt=minimum_expiration)
+
+
+def pool_bounds():
+    """Return the lowest fresh id and the highest id in the pool, or None.
+
+    They are looked up at most once every BOUNDS_SECONDS per process;
+    challenges created since are simply not picked until then.
+    """
+    global _bounds
+    now = time.monotonic()
+    if _bounds is None or now - _bounds[2] > BOUNDS_SECONDS:
+        low = fresh_challenges().order_by('id') \
+            .values_list('id', flat=True).first()
+        high = CaptchaStore.objects.order_by('-id') \
+            .values_list('id', flat=True).first()
+        _bounds = (low, high, now)
+    if _bounds[0] is None:
+        return None
+    return _bounds[:2]
+
+
+def pick_key():
+    """Return the key of a challenge to show.
+
+    Unlike ``CaptchaStore.pick()``, which sorts the whole table randomly,
+    this looks up a random id of the pool on the primary key.
+    """
+    if not captcha_settings.CAPTCHA_GET_FROM_POOL:
+        return CaptchaStore.generate_key()
+    bounds = pool_bounds()
+    if bounds is not None:
+        fresh = fresh_challenges().order_by('id')
+        key = fresh.filter(id__gte=random.randint(*bounds)) \
+            .values_list('hashkey', flat=True).first()
+        if key is None:
+            # Past the last fresh challenge; wrap around.
+            key = fresh.values_list('hashkey', flat=True).first()
+        if key is not None:
+            return key
+    # The pool ran dry; the next refill will catch up.
+    return CaptchaStore.generate_key()
+
+
+def refill_pool(size):
+    """Top the pool up to ``size`` fresh challenges, and return how many
+    were created. If the image cache is shared, their images are drawn now
+    rather than on request."""
+    missing = size - fresh_challenges().count()
+    if missing <= 0:
+        return 0
+    with transaction.atomic():
+        keys = [CaptchaStore.generate_key() for i in range(missing)]
+    if not is_local_cache(image_cache_alias()):
+        for key in keys:
+            cache_image(key)
+    return missing
+
+
+def purge_expired(batch_size=1000, pause=0.1, stdout=None):
+    """Delete expired challenges, and return how many were deleted."""
+    expired = CaptchaStore.objects.filter(expiration__lte=timezone.now()) \
+        .order_by('id')
+    return delete_in_batches(expired, batch_size, pause, stdout,
+                             label='expired captchas')
+
+
+def image_cache_alias():
+    return getattr(settings, 'BLOGS_CAPTCHA_IMAGE_CACHE', 'default')
+
+
+def image_cache():
+    return caches[image_cache_alias()]
+
+
+def cache_image(key, scale=1):
+    """Return the PNG of a challenge, drawing and caching it if needed, or
+    None if there is no such challenge."""
+    cache = image_cache()
+    cache_key = 'blogs:captcha-image:%s:%d' % (key, scale)
+    png = cache.get(cache_key)
+    if png is None:
+        response = captcha_image(None, key, scale)
+        if response.status_code != 200:
+            return None
+        png = response.content
+        cache.set(cache_key, png,
+                  int(captcha_settings.CAPTCHA_TIMEOUT) * 60)
+    return png
+
+
+def cached_captcha_image(request, key, scale=1):
+    """Serve a captcha image, drawing each one once."""
+    if scale == 2 and not captcha_settings.CAPTCHA_2X_IMAGE:
+        raise Http404
+    png = cache_image(key, scale)
+    if png is None:
+        # As captcha_image does, so crawlers drop the URL.
+        return HttpResponse(status=410)
+    response = HttpResponse(png, content_type='image/png')
+    response['Content-Length'] = len(png)
+    return response
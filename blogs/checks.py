@@ -0,0 +1,45 @@
+"""System checks for settings that only work in a single process.
+
+Local-memory caches are private to each process. Features that rely on a
+cache being seen by every process are flagged when they are pointed at
+one, since the site then misbehaves only once it runs several workers.
+"""
+from django.conf import settings
+from django.core.checks import Warning, register
+
+LOCAL_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+CACHED_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+def is_local_cache(alias):
+    return settings.CACHES.get(alias, {}).get('BACKEND') == LOCAL_CACHE
+
+
+@register()
+def check_session_cache(app_configs, **kwargs):
+    if settings.SESSION_ENGINE in CACHED_SESSION_ENGINES and \
+            is_local_cache(settings.SESSION_CACHE_ALIAS):
+        return [Warning(
+            'Sessions are cached in a local-memory cache.',
+            hint="A logout in one process leaves the session valid in the "
+                 "others. Point the '%s' cache at a shared cache, or set "
+                 "BLOGS_SESSION_MODE to 'db'." % settings.SESSION_CACHE_ALIAS,
+            id='blogs.W001')]
+    return []
+
+
+@register()
+def check_user_cache(app_configs, **kwargs):
+    alias = getattr(settings, 'BLOGS_USER_CACHE', None)
+    if alias is not None and is_local_cache(alias):
+        return [Warning(
+            'Signed-in users are cached in a local-memory cache.',
+            hint="A password change or deactivation in one process leaves "
+                 "the user signed in to the others. Point the '%s' cache "
+                 "at a shared cache, or set BLOGS_USER_CACHE to None."
+                 % alias,
+            id='blogs.W002')]
+    return []
@@ -0,0 +1,212 @@
+r"""Pre-render the public pages of the blog to static files.
+
+The feed and every post page are rendered as an anonymous reader sees them
+and written under an export directory, each with precompressed ``.gz``
+and, when the ``brotli`` package is installed, ``.br`` siblings:
+
+    index.html                   first page of the home feed
+    feed/<cursor>.html           the feed page at ``/?before=<cursor>``
+    post/<id>/index.html         the page at ``/post/<id>/``
+
+nginx can then serve anonymous readers without reaching Django; requests
+carrying a session cookie, other feed orderings, feed pages that were not
+exported, and further pages of comments still go to Django::
+
+    location = / {
+        if ($http_cookie ~ "sessionid") { proxy_pass http://django; }
+        if ($arg_sort) { proxy_pass http://django; }
+        set $page /index.html;
+        if ($arg_before) { set $page /feed/$arg_before.html; }
+        gzip_static on;
+        try_files $page @django;
+    }
+    location ~ ^/post/\d+/$ {
+        if ($http_cookie ~ "sessionid") { proxy_pass http://django; }
+        if ($arg_before) { proxy_pass http://django; }
+        gzip_static on;
+        try_files $uri/index.html @django;
+    }
+
+A manifest records what each post page was rendered from, so an
+incremental export re-renders only posts whose ``last_date`` or comments
+changed. Saves and deletes also append the post id to a pending file,
+through the ``enqueue`` task (see ``blogs.signals``), which catches
+same-day edits the manifest cannot see; the next incremental export
+re-renders those posts too.
+"""
+import gzip
+import json
+import os
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from blogs.models import Post
+from blogs.pagination import KeysetPaginator
+from blogs.rendering import render_url
+from blogs.tasks import task
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MANIFEST_NAME = '.export-manifest.json'
+PENDING_NAME = '.pending'
+
+
+def export_dir():
+    """Return the directory named by BLOGS_STATIC_EXPORT_DIR, or None."""
+    return getattr(settings, 'BLOGS_STATIC_EXPORT_DIR', None)
+
+
+@task
+def enqueue(post_id):
+    """Ask the next incremental export to re-render a post."""
+    directory = export_dir()
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    # Appends of a single short line are atomic, so concurrent writers
+    # never interleave.
+    with open(os.path.join(directory, PENDING_NAME), 'a') as pending:
+        pending.write('%d\n' % post_id)
+
+
+def post_stamp(post):
+    """Return what a post page depends on, as stored in the manifest."""
+    return '%s/%d/%s' % (post.last_date.isoformat(), post.comment_count,
+                         post.last_activity.isoformat())
+
+
+def write_file(path, content):
+    """Write ``content`` and its compressed siblings atomically."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    variants = [(path, content),
+                (path + '.gz', gzip.compress(content, compresslevel=9))]
+    if brotli is not None:
+        variants.append((path + '.br', brotli.compress(content)))
+    for variant_path, data in variants:
+        tmp_path = variant_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, variant_path)
+
+
+def remove_file(path):
+    for variant_path in [path, path + '.gz', path + '.br']:
+        if os.path.exists(variant_path):
+            os.remove(variant_path)
+
+
+class StaticExporter:
+    """Render pages to ``output_dir`` as an anonymous reader sees them."""
+
+    def __init__(self, output_dir, stdout=None):
+        self.output_dir = output_dir
+        self.stdout = stdout
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def render(self, url):
+        """Return the body of an anonymous GET of ``url``."""
+        response = render_url(url)
+        if response.status_code != 200:
+            raise RuntimeError('GET %s returned %d' % (url,
+                                                       response.status_code))
+        return response.content
+
+    def manifest_path(self):
+        return os.path.join(self.output_dir, MANIFEST_NAME)
+
+    def read_manifest(self):
+        try:
+            with open(self.manifest_path()) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'posts': {}}
+
+    def write_manifest(self, manifest):
+        tmp_path = self.manifest_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path())
+
+    def take_pending(self):
+        """Return the post ids queued by saves and empty the queue."""
+        path = os.path.join(self.output_dir, PENDING_NAME)
+        taken_path = path + '.taken'
+        try:
+            os.replace(path, taken_path)
+        except FileNotFoundError:
+            return set()
+        with open(taken_path) as f:
+            post_ids = {int(line) for line in f if line.strip()}
+        os.remove(taken_path)
+        return post_ids
+
+    def post_path(self, post_id):
+        return os.path.join(self.output_dir, 'post', str(post_id),
+                            'index.html')
+
+    def export_feed(self):
+        """Render every page of the home feed."""
+        # Cursors move as posts come and go, so start from an empty folder.
+        feed_dir = os.path.join(self.output_dir, 'feed')
+        if os.path.isdir(feed_dir):
+            for name in os.listdir(feed_dir):
+                os.remove(os.path.join(feed_dir, name))
+
+        paginator = KeysetPaginator(Post.objects.only('create_date', 'id'),
+                                    getattr(settings, 'BLOGS_PAGE_SIZE', 20))
+        url = reverse('index')
+        write_file(os.path.join(self.output_dir, 'index.html'),
+                   self.render(url))
+        pages = 1
+        page = paginator.get_page()
+        while page.has_next:
+            cursor = page.next_cursor
+            write_file(os.path.join(self.output_dir, 'feed',
+                                    '%s.html' % cursor),
+                       self.render('%s?%s' % (url,
+                                              urlencode({'before': cursor}))))
+            page = paginator.get_page(cursor)
+            pages += 1
+        self.log('Rendered %d feed pages' % pages)
+
+    def export(self, incremental=False):
+        """Render the feed and the post pages that need it.
+
+        Return the number of post pages rendered.
+        """
+        manifest = self.read_manifest()
+        pending = self.take_pending()
+        exported = manifest['posts']
+
+        stamps = {
+            str(post.id): post_stamp(post) for post in
+            Post.objects.only('id', 'last_date', 'comment_count',
+                              'last_activity').iterator()
+        }
+        stale = [post_id for post_id, stamp in stamps.items()
+                 if not incremental or exported.get(post_id) != stamp
+                 or int(post_id) in pending]
+        removed = [post_id for post_id in exported if post_id not in stamps]
+
+        for post_id in removed:
+            remove_file(self.post_path(int(post_id)))
+            del exported[post_id]
+        for post_id in stale:
+            write_file(self.post_path(int(post_id)),
+                       self.render(reverse('post', args=[int(post_id)])))
+            exported[post_id] = stamps[post_id]
+        self.log('Rendered %d post pages, removed %d' % (len(stale),
+                                                         len(removed)))
+
+        if stale or removed or not incremental:
+            self.export_feed()
+        self.write_manifest(manifest)
+        return len(stale)
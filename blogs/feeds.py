@@ -0,0 +1,88 @@
+import datetime
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.feedgenerator import Atom1Feed
+
+from blogs.cache import attach_rendered_content
+from blogs.models import Post
+
+
+def start_of_day(date):
+    """Return the first moment of ``date`` in the current time zone."""
+    return timezone.make_aware(
+        datetime.datetime.combine(date, datetime.time.min))
+
+
+class LatestPostsFeed(Feed):
+    """RSS feed of the newest posts of the whole site.
+
+    Only the newest ``BLOGS_FEED_SIZE`` posts are included, and their
+    bodies come from the rendered fragment cache, so a new post renders
+    just its own body and the rest of the feed is reassembled from cache.
+    """
+    title = '博客'
+    description = '博客的最新文章'
+
+    def link(self):
+        return reverse('index')
+
+    def get_posts(self, obj):
+        return Post.objects.select_related('owner')
+
+    def items(self, obj):
+        posts = self.get_posts(obj).order_by('-create_date', '-id')
+        return attach_rendered_content(
+            posts[:getattr(settings, 'BLOGS_FEED_SIZE', 20)])
+
+    def item_title(self, item):
+        return item.subject
+
+    def item_description(self, item):
+        return item.content_html
+
+    def item_link(self, item):
+        return reverse('post', args=[item.id])
+
+    def item_author_name(self, item):
+        return item.owner.username
+
+    def item_pubdate(self, item):
+        return start_of_day(item.create_date)
+
+    def item_updateddate(self, item):
+        return start_of_day(item.last_date)
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    """Atom feed of the newest posts of the whole site."""
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    """RSS feed of the newest posts of a single author."""
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return '%s 的博客' % obj.username
+
+    def description(self, obj):
+        return '%s 的最新文章' % obj.username
+
+    def get_posts(self, obj):
+        return super().get_posts(obj).filter(owner=obj)
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    """Atom feed of the newest posts of a single author."""
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
@@ -1,10 +1,25 @@
 from captcha.fields import CaptchaField, CaptchaTextInput
+from captcha.models import CaptchaStore
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django import forms
 
+from blogs.captchas import pick_key
 from blogs.models import Post, Comment
 
 
+class PooledCaptchaTextInput(CaptchaTextInput):
+    """Show a challenge from the pool of blogs.captchas."""
+
+    def fetch_captcha_store(self, name, value, attrs=None, generator=None):
+        if generator is None:
+            key = pick_key()
+        else:
+            key = CaptchaStore.generate_key(generator)
+        self._value = [key, '']
+        self._key = key
+        self.id_ = self.build_attrs(attrs).get('id', None)
+
+
 class PostForm(forms.ModelForm):
     """Create a post form with subject and content."""
     class Meta:
@@ -22,13 +37,13 @@ class CommentForm(forms.ModelForm):
 class CaptchaUserCreationForm(UserCreationForm):
     """Create a user signup form with captcha."""
     captcha = CaptchaField(
-        widget=CaptchaTextInput(attrs={'placeholder': '验证码'}))
+        widget=PooledCaptchaTextInput(attrs={'placeholder': '验证码'}))
 
 
 class CaptchaAuthenticationForm(AuthenticationForm):
     """Create a user login form with captcha."""
     captcha = CaptchaField(
-        widget=CaptchaTextInput(attrs={'placeholder': '验证码'}))
+        widget=PooledCaptchaTextInput(attrs={'placeholder': '验证码'}))
 
 
 class CaptchaAjaxForm(forms.Form):
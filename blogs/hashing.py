@@ -0,0 +1,81 @@
+"""Bounding the CPU spent on password hashing.
+
+Every login, signup and password change runs PBKDF2 for tens of
+milliseconds of CPU, and Django's login view hashes even for unknown
+usernames. A flood of logins would otherwise take every core from the
+readers of the site.
+
+``BoundedPBKDF2PasswordHasher`` lets at most ``BLOGS_HASHING_CONCURRENCY``
+hashes run at once in each process, by default half the cores, and any
+number if it is 0. A request that cannot get a slot
+within ``BLOGS_HASHING_WAIT`` seconds raises ``HashingBusy``, which
+``HashingBusyMiddleware`` answers with a 503 and a Retry-After header.
+
+``BLOGS_PASSWORD_ITERATIONS`` sets the PBKDF2 work factor. Lowering it
+makes logins cheaper at the cost of faster offline guessing of a leaked
+hash. Stored hashes are re-encoded at the new count on each user's next
+login.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+_slots = None
+_slots_lock = threading.Lock()
+
+
+class HashingBusy(Exception):
+    """No hashing slot became free in time."""
+
+
+def default_concurrency():
+    """Return the bound used when BLOGS_HASHING_CONCURRENCY is None."""
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+def hashing_slots():
+    """Return the semaphore bounding hashes in this process, or None if
+    they are not bounded."""
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            concurrency = getattr(settings, 'BLOGS_HASHING_CONCURRENCY',
+                                  None)
+            if concurrency is None:
+                concurrency = default_concurrency()
+            _slots = threading.BoundedSemaphore(concurrency) \
+                if concurrency else False
+    return _slots or None
+
+
+@receiver(setting_changed)
+def reset_slots(setting, **kwargs):
+    global _slots
+    if setting == 'BLOGS_HASHING_CONCURRENCY':
+        _slots = None
+
+
+class BoundedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 with SHA256, as Django's default hasher, run in a bounded
+    number of slots and with a configurable number of iterations."""
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'BLOGS_PASSWORD_ITERATIONS', None) or \
+            PBKDF2PasswordHasher.iterations
+
+    def encode(self, password, salt, iterations=None):
+        slots = hashing_slots()
+        if slots is None:
+            return super().encode(password, salt, iterations)
+        if not slots.acquire(
+                timeout=getattr(settings, 'BLOGS_HASHING_WAIT', 1.0)):
+            raise HashingBusy
+        try:
+            return super().encode(password, salt, iterations)
+        finally:
+            slots.release()
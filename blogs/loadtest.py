@@ -0,0 +1,377 @@
+"""A synthetic dataset, and a benchmark of every route of ``blogs.urls``.
+
+``seed`` fills the database with users, posts and comments from the
+seeded generator of ``blogs.transfer``, so the same options give the same
+rows. A share of the comments can go to a few "hot" posts, as on a real
+site, where pages with thousands of comments are the ones that hurt.
+
+``RouteBenchmark`` then requests each route a number of times and records
+throughput, latency percentiles and database queries per request. Write
+routes run as a dedicated benchmark user whose posts, comments and signups
+are removed afterwards. Requests go either through the test client, in
+this process, or over HTTP to a WSGI server started on a local port; both
+count the queries the server side runs.
+
+Rate limits are off while the benchmark runs and captchas are in test
+mode, so logins and signups reach the password hasher.
+"""
+import json
+import random
+import subprocess
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from http.cookies import SimpleCookie
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import HTTPRedirectHandler, ProxyHandler, Request, \
+    build_opener
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+from captcha.conf import settings as captcha_settings
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.servers.basehttp import get_internal_wsgi_application
+from django.db import connections
+from django.middleware.csrf import CSRF_ALLOWED_CHARS
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from blogs import transfer
+from blogs.bench import summarize
+from blogs.models import Post, Comment
+from blogs.rendering import request_host
+from blogs.transfer import paragraphs, sentence
+
+BENCH_USERNAME = 'bench-routes-user'
+BENCH_PASSWORD = 'bench-Password-1'
+SIGNUP_PREFIX = 'bench-signup-'
+
+
+def seed(users=50, posts=500, comments_per_post=10, hot_posts=0.01,
+         hot_share=0.5, random_seed=0, batch_size=1000):
+    """Add a synthetic dataset, and return how many rows of each kind.
+
+    ``hot_share`` of the comments go to the first ``hot_posts`` fraction
+    of the posts; the rest are spread evenly over all posts.
+    """
+    counts = dict.fromkeys(transfer.MODELS, 0)
+
+    def counted(records):
+        for record in records:
+            counts[record['model']] += 1
+            yield record
+
+    transfer.import_records(counted(transfer.generate(
+        users=users, posts=posts, comments_per_post=comments_per_post,
+        hot_posts=hot_posts, hot_share=hot_share, random_seed=random_seed)),
+        batch_size=batch_size)
+    return {'users': counts['user'], 'posts': counts['post'],
+            'comments': counts['comment']}
+
+
+class QueryCounter:
+    """Count the queries run on the current thread's connections."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def counting(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+
+class InProcessTransport:
+    """Requests through the test client, with every middleware."""
+    name = 'inprocess'
+
+    def __init__(self):
+        self.client = Client(HTTP_HOST=request_host())
+
+    def request(self, method, path, data, cookies):
+        self.client.cookies = SimpleCookie(cookies)
+        counter = QueryCounter()
+        with counter.counting():
+            if method == 'GET':
+                response = self.client.get(path, data)
+            else:
+                response = self.client.post(path, data)
+        return response.status_code, counter.count
+
+    def close(self):
+        pass
+
+
+class _QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _NoRedirects(HTTPRedirectHandler):
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class WSGITransport:
+    """Requests over HTTP to the project's WSGI application, served from
+    a thread of this process on a free local port."""
+    name = 'wsgi'
+
+    def __init__(self):
+        self.queries = 0
+        application = get_internal_wsgi_application()
+
+        def counting_application(environ, start_response):
+            counter = QueryCounter()
+            with counter.counting():
+                result = application(environ, start_response)
+            self.queries = counter.count
+            return result
+
+        self.server = make_server('127.0.0.1', 0, counting_application,
+                                  handler_class=_QuietHandler)
+        self.url = 'http://127.0.0.1:%d' % self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.opener = build_opener(ProxyHandler({}), _NoRedirects)
+
+    def request(self, method, path, data, cookies):
+        url = self.url + path
+        body = None
+        if method == 'GET':
+            if data:
+                url += '?' + urlencode(data)
+        else:
+            body = urlencode(data).encode()
+        request = Request(url, data=body, method=method, headers={
+            'Host': request_host(),
+            'Cookie': '; '.join('%s=%s' % item for item in cookies.items()),
+        })
+        try:
+            with self.opener.open(request) as response:
+                response.read()
+                status = response.status
+        except HTTPError as error:
+            error.read()
+            status = error.code
+        return status, self.queries
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+TRANSPORTS = {
+    InProcessTransport.name: InProcessTransport,
+    WSGITransport.name: WSGITransport,
+}
+
+
+class RouteBenchmark:
+    """Request every route ``requests`` times and summarize each."""
+
+    def __init__(self, transport, requests=100, random_seed=0):
+        self.transport = transport
+        self.requests = requests
+        self.rng = random.Random(random_seed)
+
+    def routes(self):
+        """Return ``(name, method, prepare, signed in, expected status)``
+        of each route; ``prepare(i)`` returns the path and data of the
+        i-th request, creating whatever it acts on beforehand."""
+        return [
+            ('index', 'GET', self.index, False, 200),
+            ('post', 'GET', self.post, False, 200),
+            ('post (hot)', 'GET', self.hot_post, False, 200),
+            ('new_post', 'POST', self.new_post, True, 302),
+            ('edit_post', 'POST', self.edit_post, True, 302),
+            ('delete_post', 'POST', self.delete_post, True, 302),
+            ('new_comment', 'POST', self.new_comment, True, 302),
+            ('edit_comment', 'POST', self.edit_comment, True, 302),
+            ('delete_comment', 'POST', self.delete_comment, True, 302),
+            ('login', 'POST', self.login, False, 302),
+            ('signup', 'POST', self.signup, False, 302),
+        ]
+
+    def index(self, i):
+        return reverse('index'), {}
+
+    def post(self, i):
+        return reverse('post', args=[self.rng.choice(self.post_ids)]), {}
+
+    def hot_post(self, i):
+        return reverse('post', args=[self.hot_post_id]), {}
+
+    def new_post(self, i):
+        return reverse('new_post'), {'subject': sentence(self.rng, 6),
+                                     'content': paragraphs(self.rng, 3)}
+
+    def edit_post(self, i):
+        return reverse('edit_post', args=[self.own_post.id]), {
+            'subject': sentence(self.rng, 6),
+            'content': paragraphs(self.rng, 3)}
+
+    def delete_post(self, i):
+        post = Post.objects.create(subject='delete me', content='delete me',
+                                   owner=self.user)
+        return reverse('delete_post', args=[post.id]), {}
+
+    def new_comment(self, i):
+        return reverse('new_comment', args=[self.hot_post_id]), {
+            'content': sentence(self.rng, 20)}
+
+    def edit_comment(self, i):
+        return reverse('edit_comment', args=[self.hot_post_id,
+                                             self.own_comment.id]), {
+            'content': sentence(self.rng, 20)}
+
+    def delete_comment(self, i):
+        comment = Comment.objects.create(content='delete me', owner=self.user,
+                                         comment_post_id=self.hot_post_id)
+        return reverse('delete_comment', args=[self.hot_post_id,
+                                               comment.id]), {}
+
+    def login(self, i):
+        return reverse('login'), self.captcha({
+            'username': BENCH_USERNAME, 'password': BENCH_PASSWORD})
+
+    def signup(self, i):
+        return reverse('signup'), self.captcha({
+            'username': '%s%d' % (SIGNUP_PREFIX, i),
+            'password1': BENCH_PASSWORD, 'password2': BENCH_PASSWORD})
+
+    def captcha(self, data):
+        return dict(data, captcha_0='bench', captcha_1='PASSED')
+
+    def setup(self):
+        self.user = User.objects.create_user(BENCH_USERNAME,
+                                             password=BENCH_PASSWORD)
+        self.post_ids = list(Post.objects.values_list('id', flat=True))
+        if not self.post_ids:
+            raise ValueError('There are no posts; run seed_blog first.')
+        self.hot_post_id = Post.objects.order_by('-comment_count', 'id') \
+            .values_list('id', flat=True).first()
+        self.own_post = Post.objects.create(subject='edit me',
+                                            content='edit me',
+                                            owner=self.user)
+        self.own_comment = Comment.objects.create(
+            content='edit me', owner=self.user,
+            comment_post_id=self.hot_post_id)
+
+        csrf_token = get_random_string(32, CSRF_ALLOWED_CHARS)
+        self.anonymous = {settings.CSRF_COOKIE_NAME: csrf_token}
+        client = Client()
+        client.force_login(self.user)
+        self.signed_in = dict(self.anonymous, **{
+            settings.SESSION_COOKIE_NAME:
+                client.cookies[settings.SESSION_COOKIE_NAME].value})
+        self.csrf_token = csrf_token
+
+    def teardown(self):
+        User.objects.filter(username__startswith=SIGNUP_PREFIX).delete()
+        self.user.delete()
+        Post.objects.filter(id=self.hot_post_id).update(
+            comment_count=Comment.objects.filter(
+                comment_post_id=self.hot_post_id).count())
+
+    def run_route(self, method, prepare, signed_in, expected):
+        cookies = self.signed_in if signed_in else self.anonymous
+        samples, queries, errors = [], 0, 0
+        elapsed = 0.0
+        for i in range(self.requests):
+            path, data = prepare(i)
+            if method == 'POST':
+                data['csrfmiddlewaretoken'] = self.csrf_token
+            start = time.perf_counter()
+            status, count = self.transport.request(method, path, data,
+                                                   cookies)
+            sample = time.perf_counter() - start
+            elapsed += sample
+            samples.append(sample)
+            queries += count
+            if status != expected:
+                errors += 1
+        summary = summarize(samples, elapsed)
+        summary['queries'] = queries / self.requests
+        summary['errors'] = errors
+        return summary
+
+    def run(self, stdout=None):
+        """Return the summary of each route, by name."""
+        results = {}
+        test_mode = captcha_settings.CAPTCHA_TEST_MODE
+        captcha_settings.CAPTCHA_TEST_MODE = True
+        self.setup()
+        try:
+            with override_settings(BLOGS_RATELIMIT_ENABLED=False):
+                for name, method, prepare, signed_in, expected \
+                        in self.routes():
+                    results[name] = self.run_route(method, prepare,
+                                                   signed_in, expected)
+                    if stdout is not None:
+                        stdout.write(format_route(name, results[name]))
+        finally:
+            captcha_settings.CAPTCHA_TEST_MODE = test_mode
+            self.teardown()
+        return results
+
+
+def format_route(name, summary):
+    """Return the summary of a route as one line of a report."""
+    return ('%-16s %6.1f/s  p50 %7.2fms  p95 %7.2fms  p99 %7.2fms  '
+            '%5.1f queries  %d errors' % (
+                name, summary['per_second'], summary['p50_ms'],
+                summary['p95_ms'], summary['p99_ms'], summary['queries'],
+                summary['errors']))
+
+
+def current_commit():
+    """Return the commit checked out, or None outside a git checkout."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            check=True).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(path, transport, requests, routes):
+    """Write a benchmark run to ``path`` as JSON."""
+    with open(path, 'w') as f:
+        json.dump({
+            'commit': current_commit(),
+            'date': timezone.now().isoformat(),
+            'transport': transport,
+            'requests': requests,
+            'dataset': {'users': User.objects.count(),
+                        'posts': Post.objects.count(),
+                        'comments': Comment.objects.count()},
+            'routes': routes,
+        }, f, indent=2, sort_keys=True)
+
+
+def compare_results(old, new):
+    """Yield ``(route, key, old value, new value, change in percent)``
+    for the latencies and query counts of two runs."""
+    for name, summary in new['routes'].items():
+        before = old['routes'].get(name)
+        if before is None:
+            continue
+        for key in ['p50_ms', 'p95_ms', 'p99_ms', 'queries']:
+            change = None
+            if before[key]:
+                change = 100.0 * (summary[key] - before[key]) / before[key]
+            yield name, key, before[key], summary[key], change
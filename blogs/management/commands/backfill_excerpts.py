@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blogs.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Render the stored feed excerpt of existing posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Posts updated per transaction.')
+        parser.add_argument('--all', action='store_true',
+                            help='Re-render every excerpt, not only the '
+                                 'missing ones.')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.only('id', 'content').order_by('id')
+        if not options['all']:
+            posts = posts.filter(excerpt='')
+
+        last_id = 0
+        updated = 0
+        while True:
+            batch = list(posts.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            with transaction.atomic():
+                for post in batch:
+                    # update() leaves last_date alone, unlike save().
+                    Post.objects.filter(id=post.id) \
+                        .update(excerpt=post.render_excerpt())
+            last_id = batch[-1].id
+            updated += len(batch)
+            self.stdout.write('Updated %d posts' % updated)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Backfilled %d excerpts.' % updated))
@@ -0,0 +1,61 @@
+import re
+import time
+
+from captcha.conf import settings as captcha_settings
+from captcha.models import CaptchaStore
+from captcha.views import captcha_image
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.urls import reverse
+
+from blogs import captchas
+from blogs.bench import summarize, format_summary
+from blogs.rendering import render_url
+
+
+class Command(BaseCommand):
+    help = ('Measure login page renders per second, each followed by the '
+            'request for its captcha image, with and without the captcha '
+            'pool and image cache. Challenges are created in the configured '
+            'database and deleted afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--pool-size', type=int, default=500)
+
+    def run(self, label, func):
+        samples = []
+        start = time.perf_counter()
+        for i in range(self.requests):
+            request_start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - request_start)
+        self.stdout.write(format_summary(
+            label, summarize(samples, time.perf_counter() - start)))
+
+    def login_with_image(self, image_view):
+        html = render_url(self.login_url).content.decode()
+        key = re.search(r'captcha/image/(\w+)/', html).group(1)
+        image_view(self.request, key)
+
+    def handle(self, *args, **options):
+        self.requests = options['requests']
+        self.login_url = reverse('login')
+        self.request = RequestFactory().get('/')
+        pool = captcha_settings.CAPTCHA_GET_FROM_POOL
+        existing = set(CaptchaStore.objects.values_list('id', flat=True))
+        captchas.refill_pool(options['pool_size'])
+        try:
+            # pick_key() reads the setting on every call. The pool runs
+            # first, before challenges it did not draw join it.
+            captcha_settings.CAPTCHA_GET_FROM_POOL = True
+            self.run('login, pool and cache', lambda: self.login_with_image(
+                captchas.cached_captcha_image))
+            self.run('pooled challenge', captchas.pick_key)
+            captcha_settings.CAPTCHA_GET_FROM_POOL = False
+            self.run('login, no pool',
+                     lambda: self.login_with_image(captcha_image))
+            self.run('new challenge', CaptchaStore.generate_key)
+        finally:
+            captcha_settings.CAPTCHA_GET_FROM_POOL = pool
+            CaptchaStore.objects.exclude(id__in=existing).delete()
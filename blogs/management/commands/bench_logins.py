@@ -0,0 +1,107 @@
+import threading
+import time
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+
+from blogs.bench import summarize, format_summary
+from blogs.hashing import HashingBusy
+from blogs.models import Post
+from blogs.rendering import render_url
+
+USERNAME = 'bench-login-user'
+PASSWORD = 'bench-login-password'
+
+
+class Command(BaseCommand):
+    help = ('Measure logins per second and the latency of concurrent reads '
+            'of the home page and a post, with password hashing unbounded '
+            'and bounded. A user is created in the configured database and '
+            'deleted afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=3.0,
+                            help='Duration of each run.')
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--logins', type=int, default=8,
+                            help='Threads logging in as fast as they can.')
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Hashing slots of the bounded runs.')
+        parser.add_argument('--iterations', type=int,
+                            help='Also run bounded with this many PBKDF2 '
+                                 'iterations.')
+
+    def loop(self, func, deadline, samples, failures):
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    func()
+                except HashingBusy:
+                    failures.append(1)
+                else:
+                    samples.append(time.perf_counter() - start)
+        finally:
+            connection.close()
+
+    def read(self):
+        for url in self.read_urls:
+            render_url(url)
+
+    def login(self):
+        if authenticate(username=USERNAME, password=PASSWORD) is None:
+            raise RuntimeError('The benchmark user could not log in.')
+
+    def run(self, label, logins, **settings):
+        reads, logged_in, shed = [], [], []
+        deadline = time.perf_counter() + self.seconds
+        threads = [threading.Thread(target=self.loop, args=(
+            self.read, deadline, reads, []))
+            for i in range(self.readers)]
+        threads += [threading.Thread(target=self.loop, args=(
+            self.login, deadline, logged_in, shed))
+            for i in range(logins)]
+        with override_settings(**settings):
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+        self.stdout.write(format_summary('%s, reads' % label,
+                                         summarize(reads, elapsed)))
+        if logins:
+            self.stdout.write(format_summary('%s, logins' % label,
+                                             summarize(logged_in, elapsed)))
+            self.stdout.write('%-24s %8d' % ('%s, shed' % label, len(shed)))
+
+    def handle(self, *args, **options):
+        self.seconds = options['seconds']
+        self.readers = options['readers']
+        self.read_urls = [reverse('index')]
+        post_id = Post.objects.values_list('id', flat=True).last()
+        if post_id is not None:
+            self.read_urls.append(reverse('post', args=[post_id]))
+
+        user = User.objects.create_user(USERNAME, password=PASSWORD)
+        try:
+            self.run('idle', 0)
+            self.run('unbounded', options['logins'],
+                     BLOGS_HASHING_CONCURRENCY=0)
+            self.run('bounded', options['logins'],
+                     BLOGS_HASHING_CONCURRENCY=options['concurrency'])
+            if options['iterations']:
+                # Rehash now, so every login runs the lower count.
+                with override_settings(
+                        BLOGS_PASSWORD_ITERATIONS=options['iterations']):
+                    user.set_password(PASSWORD)
+                    user.save(update_fields=['password'])
+                self.run('fewer iterations', options['logins'],
+                         BLOGS_HASHING_CONCURRENCY=options['concurrency'],
+                         BLOGS_PASSWORD_ITERATIONS=options['iterations'])
+        finally:
+            user.delete()
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.templatetags.static import static
+from django.urls import reverse
+
+from blogs.links import fast_reverse, fast_static
+
+
+class Command(BaseCommand):
+    help = ('Compare reverse() and static() with fast_reverse() and '
+            'fast_static() on the links repeated for every comment.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000,
+                            help='Links computed by each contender.')
+
+    def measure(self, func, rows):
+        start = time.perf_counter()
+        for i in range(rows):
+            func(i)
+        return time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        contenders = [
+            ('edit_comment', lambda i: reverse(
+                'edit_comment', args=[7, i]), lambda i: fast_reverse(
+                'edit_comment', args=[7, i])),
+            ('post', lambda i: reverse('post', args=[i]),
+             lambda i: fast_reverse('post', args=[i])),
+            ('static', lambda i: static('blogs/images/compose.svg'),
+             lambda i: fast_static('blogs/images/compose.svg')),
+        ]
+        for label, stock, fast in contenders:
+            # Warm both up before timing.
+            stock(1)
+            fast(1)
+            stock_seconds = self.measure(stock, rows)
+            fast_seconds = self.measure(fast, rows)
+            self.stdout.write(
+                '%-14s stock %7.2fus  fast %7.2fus  %5.1fx' % (
+                    label, stock_seconds / rows * 1e6,
+                    fast_seconds / rows * 1e6,
+                    stock_seconds / fast_seconds))
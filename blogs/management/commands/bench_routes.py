@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from blogs import loadtest
+
+
+class Command(BaseCommand):
+    help = ('Measure throughput, latency and queries per request of every '
+            'route, in this process or over HTTP to a local WSGI server. '
+            'Run seed_blog first; the rows the write routes create are '
+            'deleted afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transport', choices=sorted(
+            loadtest.TRANSPORTS), default='inprocess')
+        parser.add_argument('--requests', type=int, default=100,
+                            help='Requests per route.')
+        parser.add_argument('--random-seed', type=int, default=0)
+        parser.add_argument('--output', metavar='FILE',
+                            help='Write the results to FILE as JSON.')
+        parser.add_argument('--compare', metavar='FILE',
+                            help='Show changes from the results in FILE.')
+
+    def handle(self, *args, **options):
+        transport = loadtest.TRANSPORTS[options['transport']]()
+        try:
+            routes = loadtest.RouteBenchmark(
+                transport, requests=options['requests'],
+                random_seed=options['random_seed']).run(stdout=self.stdout)
+        finally:
+            transport.close()
+
+        if options['output']:
+            loadtest.save_results(options['output'], transport.name,
+                                  options['requests'], routes)
+        if options['compare']:
+            with open(options['compare']) as f:
+                old = json.load(f)
+            self.stdout.write('Changes from %s (%s):' % (
+                old.get('commit'), old.get('transport')))
+            for name, key, before, after, change in loadtest.compare_results(
+                    old, {'routes': routes}):
+                self.stdout.write('%-16s %-8s %9.2f -> %9.2f  %s' % (
+                    name, key, before, after,
+                    '%+.1f%%' % change if change is not None else ''))
@@ -0,0 +1,60 @@
+import random
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from blogs.bench import summarize, format_summary
+
+
+class Command(BaseCommand):
+    help = ('Measure the per-request cost of loading, and sometimes saving, '
+            'a session in each session mode. Sessions are created in the '
+            'configured database and deleted afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=200,
+                            help='Distinct sessions requests pick from.')
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--write-ratio', type=float, default=0.1,
+                            help='Share of requests that modify the session.')
+
+    def handle(self, *args, **options):
+        for mode, engine in settings.BLOGS_SESSION_ENGINES.items():
+            store_class = import_module(engine).SessionStore
+            keys = []
+            for i in range(options['sessions']):
+                store = store_class()
+                store['_auth_user_id'] = str(i)
+                store.save()
+                keys.append(store.session_key)
+
+            samples = []
+            queries = []
+
+            def count_query(execute, sql, params, many, context):
+                queries.append(sql)
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(count_query):
+                start = time.perf_counter()
+                for i in range(options['requests']):
+                    index = random.randrange(len(keys))
+                    request_start = time.perf_counter()
+                    store = store_class(keys[index])
+                    store.get('_auth_user_id')
+                    if random.random() < options['write_ratio']:
+                        store['last_seen'] = i
+                        store.save()
+                        # A signed cookie changes with its content.
+                        keys[index] = store.session_key
+                    samples.append(time.perf_counter() - request_start)
+                elapsed = time.perf_counter() - start
+
+            self.stdout.write('%s  %5.2f queries/request' % (
+                format_summary(mode, summarize(samples, elapsed)),
+                len(queries) / options['requests']))
+            for key in keys:
+                store_class(key).delete()
@@ -0,0 +1,118 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.backends.sqlite3.base import DEFAULT_PRAGMAS, apply_pragmas
+from blogs.bench import summarize, format_summary
+
+
+class Command(BaseCommand):
+    help = ('Measure SQLite read throughput while writers are active, with '
+            'the stock settings and with blog.backends.sqlite3 pragmas.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=5.0,
+                            help='Seconds each configuration runs.')
+        parser.add_argument('--rows', type=int, default=10000,
+                            help='Rows seeded before measuring.')
+
+    def handle(self, *args, **options):
+        configurations = [
+            ('stock', {}, 0),
+            ('tuned', DEFAULT_PRAGMAS, 20),
+        ]
+        for label, pragmas, timeout in configurations:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                self.seed(path, options['rows'])
+                reads, writes, errors, elapsed = self.run(
+                    path, pragmas, timeout, options)
+            self.stdout.write(format_summary(
+                '%s reads' % label, summarize(reads, elapsed)))
+            self.stdout.write(format_summary(
+                '%s writes' % label, summarize(writes, elapsed)))
+            self.stdout.write('%-24s %8d' % ('%s locked errors' % label,
+                                             errors))
+
+    def seed(self, path, rows):
+        conn = sqlite3.connect(path)
+        conn.execute('CREATE TABLE post (id INTEGER PRIMARY KEY, '
+                     'subject TEXT, content TEXT)')
+        conn.executemany('INSERT INTO post (subject, content) VALUES (?, ?)',
+                         (('subject', 'content ' * 50)
+                          for _ in range(rows)))
+        conn.commit()
+        conn.close()
+
+    def run(self, path, pragmas, timeout, options):
+        """Run readers and writers for a while; return their latencies."""
+        reads = []
+        writes = []
+        errors = [0]
+        lock = threading.Lock()
+        stop = threading.Event()
+
+        def connect():
+            # The stock timeout is sqlite3's default of five seconds, which
+            # is what Django uses when OPTIONS does not set one.
+            conn = sqlite3.connect(path, timeout=timeout or 5.0,
+                                   check_same_thread=False)
+            apply_pragmas(conn, pragmas)
+            return conn
+
+        def reader():
+            conn = connect()
+            samples = []
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    conn.execute('SELECT subject, content FROM post '
+                                 'WHERE id = ?',
+                                 (random.randint(1, options['rows']),)) \
+                        .fetchall()
+                except sqlite3.OperationalError:
+                    with lock:
+                        errors[0] += 1
+                    continue
+                samples.append(time.perf_counter() - start)
+            conn.close()
+            with lock:
+                reads.extend(samples)
+
+        def writer():
+            conn = connect()
+            samples = []
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    with conn:
+                        conn.execute('INSERT INTO post (subject, content) '
+                                     'VALUES (?, ?)', ('subject', 'content'))
+                except sqlite3.OperationalError:
+                    with lock:
+                        errors[0] += 1
+                    continue
+                samples.append(time.perf_counter() - start)
+            conn.close()
+            with lock:
+                writes.extend(samples)
+
+        threads = [threading.Thread(target=reader)
+                   for _ in range(options['readers'])]
+        threads += [threading.Thread(target=writer)
+                    for _ in range(options['writers'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return reads, writes, errors[0], time.perf_counter() - start
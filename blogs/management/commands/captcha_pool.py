@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blogs import captchas
+
+
+class Command(BaseCommand):
+    help = ('Top the captcha pool up to BLOGS_CAPTCHA_POOL_SIZE fresh '
+            'challenges and delete expired ones in batches, once or every '
+            '--watch seconds.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int,
+                            default=getattr(settings,
+                                            'BLOGS_CAPTCHA_POOL_SIZE', 500),
+                            help='Fresh challenges to keep in the pool.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Expired rows deleted by each statement.')
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help='Seconds to wait between batches.')
+        parser.add_argument('--watch', type=float, metavar='SECONDS',
+                            help='Keep refilling every SECONDS seconds.')
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = captchas.purge_expired(
+                batch_size=options['batch_size'], pause=options['pause'],
+                stdout=self.stdout)
+            created = captchas.refill_pool(options['size'])
+            self.stdout.write(self.style.SUCCESS(
+                'Created %d captchas, deleted %d expired.'
+                % (created, deleted)))
+            if not options['watch']:
+                break
+            time.sleep(options['watch'])
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from blogs import transfer
+
+
+class Command(BaseCommand):
+    help = ('Write every user, post and comment to a JSON Lines file, or to '
+            'a directory of CSV files, a batch at a time.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Output file, '-' for standard "
+                                         "output, or directory for CSV.")
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            default='jsonl')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows read per query.')
+        parser.add_argument('--checkpoint', metavar='FILE',
+                            help='Record progress in FILE, and resume from '
+                                 'it if it exists.')
+
+    def handle(self, *args, **options):
+        stdout = None if options['path'] == '-' else self.stdout
+        written = transfer.export(options['path'], format=options['format'],
+                                  batch_size=options['batch_size'],
+                                  checkpoint=options['checkpoint'],
+                                  stdout=stdout)
+        if stdout is not None:
+            self.stdout.write(self.style.SUCCESS(
+                'Exported %d records.' % written))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blogs.export import StaticExporter, export_dir
+
+
+class Command(BaseCommand):
+    help = ('Render the home feed and every post page to static HTML, '
+            'with precompressed copies, for nginx or a CDN to serve.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output',
+                            help='Directory to write to. Defaults to '
+                                 'BLOGS_STATIC_EXPORT_DIR.')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Only render posts changed or queued since '
+                                 'the last export.')
+        parser.add_argument('--watch', type=float, metavar='SECONDS',
+                            help='Keep running an incremental export every '
+                                 'SECONDS seconds.')
+
+    def handle(self, *args, **options):
+        output = options['output'] or export_dir()
+        if not output:
+            raise CommandError('Pass --output or set BLOGS_STATIC_EXPORT_DIR.')
+
+        exporter = StaticExporter(output, stdout=self.stdout)
+        exporter.export(incremental=options['incremental'])
+        while options['watch']:
+            time.sleep(options['watch'])
+            exporter.export(incremental=True)
+        self.stdout.write(self.style.SUCCESS('Exported to %s.' % output))
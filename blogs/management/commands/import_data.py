@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blogs import transfer
+
+
+class Command(BaseCommand):
+    help = ('Insert users, posts and comments from a JSON Lines file or a '
+            'directory of CSV files, as written by export_data, or from '
+            'the synthetic generator, with bulk inserts in batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?',
+                            help="Input file, '-' for standard input, or "
+                                 "directory for CSV.")
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            default='jsonl')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows inserted per statement.')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processes inserting batches.')
+        parser.add_argument('--checkpoint', metavar='FILE',
+                            help='Record progress in FILE, and skip the '
+                                 'records it counts if it exists.')
+        parser.add_argument('--ignore-conflicts', action='store_true',
+                            help='Skip rows whose id already exists, such '
+                                 'as the last batch before an interruption.')
+        parser.add_argument('--no-reindex', action='store_false',
+                            dest='reindex',
+                            help='Do not rebuild the search index.')
+
+        generator = parser.add_argument_group('synthetic data')
+        generator.add_argument('--generate', action='store_true',
+                               help='Insert generated rows instead of '
+                                    'reading PATH.')
+        generator.add_argument('--users', type=int, default=50)
+        generator.add_argument('--posts', type=int, default=500)
+        generator.add_argument('--comments-per-post', type=int, default=10)
+        generator.add_argument('--hot-posts', type=float, default=0.01,
+                               help='Fraction of posts that are hot.')
+        generator.add_argument('--hot-share', type=float, default=0.5,
+                               help='Fraction of comments on hot posts.')
+        generator.add_argument('--days', type=int, default=365,
+                               help='Days back that dates spread over.')
+        generator.add_argument('--random-seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        state = None
+        if options['generate']:
+            # Resume with the ids of the interrupted run, which its rows
+            # would otherwise move.
+            saved = transfer.Checkpoint(options['checkpoint']).load() or {}
+            state = {'first_ids': saved.get('first_ids') or
+                     transfer.first_free_ids()}
+            records = transfer.generate(
+                users=options['users'], posts=options['posts'],
+                comments_per_post=options['comments_per_post'],
+                hot_posts=options['hot_posts'],
+                hot_share=options['hot_share'], days=options['days'],
+                random_seed=options['random_seed'],
+                first_ids=state['first_ids'])
+        elif options['path']:
+            records = transfer.read_records(options['path'],
+                                            options['format'])
+        else:
+            raise CommandError('Give a PATH to read, or --generate.')
+
+        inserted = transfer.import_records(
+            records, batch_size=options['batch_size'],
+            workers=options['workers'], checkpoint=options['checkpoint'],
+            ignore_conflicts=options['ignore_conflicts'],
+            reindex=options['reindex'], stdout=self.stdout, state=state)
+        self.stdout.write(self.style.SUCCESS(
+            'Imported %d records.' % inserted))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from blogs import metrics
+
+
+class Command(BaseCommand):
+    help = ('Show the request metrics counted by every process sharing '
+            'BLOGS_METRICS_CACHE, by route. Latency percentiles are '
+            'estimated from the histogram buckets.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prometheus', action='store_true',
+                            help='Print the Prometheus text format, as '
+                                 'served at /metrics.')
+        parser.add_argument('--reset', action='store_true',
+                            help='Zero the counters afterwards.')
+
+    def handle(self, *args, **options):
+        values = metrics.read()
+        if options['prometheus']:
+            self.stdout.write(metrics.exposition(values), ending='')
+        else:
+            routes, caches = metrics.snapshot(values)
+            self.stdout.write('%-16s %8s %6s %8s %8s %8s %8s %8s %8s %6s' % (
+                'route', 'requests', '5xx', 'mean ms', 'p50 ms', 'p95 ms',
+                'queries', 'db ms', 'tmpl ms', 'slow'))
+            for route, stats in routes.items():
+                self.stdout.write(
+                    '%-16s %8d %6d %8.2f %8.2f %8.2f %8.1f %8.2f %8.2f %6d' % (
+                        route, stats['requests'], stats['errors'],
+                        stats['mean_ms'], stats['p50_ms'], stats['p95_ms'],
+                        stats['queries'], stats['query_ms'],
+                        stats['template_ms'], stats['slow_queries']))
+            for cache, outcomes in caches.items():
+                self.stdout.write('%s cache: %s' % (cache, ', '.join(
+                    '%d %s' % (count, outcome)
+                    for outcome, count in outcomes.items())))
+        if options['reset']:
+            metrics.reset()
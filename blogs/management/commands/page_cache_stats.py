@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from blogs.cache import page_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit and miss counters of the anonymous page cache.'
+
+    def handle(self, *args, **options):
+        stats = page_cache_stats()
+        served = stats['hit'] + stats['miss']
+        for outcome in ['hit', 'miss', 'not_modified']:
+            self.stdout.write('%-13s %d' % (outcome, stats[outcome]))
+        if served:
+            self.stdout.write('%-13s %.1f%%' % (
+                'hit ratio', 100.0 * stats['hit'] / served))
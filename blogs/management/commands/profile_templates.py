@@ -0,0 +1,57 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from blogs.models import Post
+from blogs.rendering import RenderProfile, profiling, render_url
+
+
+class Command(BaseCommand):
+    help = ('Render pages repeatedly and report which templates, blocks, '
+            '{% url %} and {% static %} tags take the most time. Pages are '
+            'rendered for a signed-in user, so the page cache never answers.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*', metavar='url',
+                            help='Paths to render. Defaults to the home '
+                                 'page and the post with most comments.')
+        parser.add_argument('--user',
+                            help='Username to render as. Defaults to the '
+                                 'author of the post rendered.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Number of entries to show.')
+
+    def handle(self, *args, **options):
+        post = Post.objects.select_related('owner') \
+            .order_by('-comment_count').first()
+        urls = options['urls']
+        if not urls:
+            if post is None:
+                raise CommandError('There are no posts to render.')
+            urls = [reverse('index'), reverse('post', args=[post.id])]
+
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError('No user named %r.' % options['user'])
+        elif post is not None:
+            user = post.owner
+        else:
+            raise CommandError('Pass --user.')
+
+        total = RenderProfile()
+        for url in urls:
+            # The first render fills caches; it is not counted.
+            render_url(url, user)
+            with profiling() as profile:
+                for i in range(options['repeat']):
+                    render_url(url, user)
+            total.merge(profile)
+
+        self.stdout.write('%-56s %8s %10s %10s' % (
+            'template or tag', 'renders', 'total ms', 'each ms'))
+        for key, count, seconds in total.top(options['limit']):
+            self.stdout.write('%-56s %8d %10.2f %10.4f' % (
+                key[:56], count, seconds * 1000, seconds * 1000 / count))
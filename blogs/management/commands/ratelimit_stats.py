@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from blogs.ratelimit import limited_routes, ratelimit_stats
+
+
+class Command(BaseCommand):
+    help = 'Show allowed and limited counters of the rate limited routes.'
+
+    def handle(self, *args, **options):
+        self.stdout.write('%-13s %9s %9s' % ('route', 'allowed', 'limited'))
+        for name, stats in ratelimit_stats(limited_routes()).items():
+            self.stdout.write('%-13s %9d %9d' % (
+                name, stats['allowed'], stats['limited']))
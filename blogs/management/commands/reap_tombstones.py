@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blogs import tombstones
+
+
+class Command(BaseCommand):
+    help = ('Delete tombstoned comments, posts and users in bounded '
+            'batches, once or every --watch seconds.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows deleted by each statement.')
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help='Seconds to wait between batches.')
+        parser.add_argument('--watch', type=float, metavar='SECONDS',
+                            help='Keep reaping every SECONDS seconds.')
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = tombstones.reap(batch_size=options['batch_size'],
+                                      pause=options['pause'],
+                                      stdout=self.stdout)
+            self.stdout.write(self.style.SUCCESS(
+                'Deleted %d rows.' % deleted))
+            if not options['watch']:
+                break
+            time.sleep(options['watch'])
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from blogs import search
+
+
+class Command(BaseCommand):
+    help = ('Recreate the full-text search table with the configured '
+            'tokenizer and index every post and comment.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Rows read and indexed at a time.')
+
+    def handle(self, *args, **options):
+        search.rebuild(batch_size=options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS('Rebuilt the search index.'))
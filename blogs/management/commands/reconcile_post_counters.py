@@ -0,0 +1,62 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from blogs.models import Post, Comment
+
+
+class Command(BaseCommand):
+    help = ('Recount comment_count and last_activity of posts from their '
+            'comments, fixing any drift.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Posts checked per transaction.')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.only('id', 'create_date', 'comment_count',
+                                  'last_activity').order_by('id')
+        last_id = 0
+        checked = 0
+        fixed = 0
+        while True:
+            batch = list(posts.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            with transaction.atomic():
+                fixed += self.reconcile(batch)
+            last_id = batch[-1].id
+            checked += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Checked %d posts, fixed %d.' % (checked, fixed)))
+
+    def reconcile(self, posts):
+        """Fix the counters of posts and return how many changed."""
+        stats = {
+            row['comment_post_id']: row for row in
+            Comment.objects.filter(comment_post__in=posts)
+            .values('comment_post_id')
+            .annotate(count=Count('id'), latest=Max('create_date'))
+        }
+        fixed = 0
+        for post in posts:
+            row = stats.get(post.id, {'count': 0, 'latest': None})
+            latest = max(date for date in [post.create_date, row['latest']]
+                         if date is not None)
+
+            # Only dates survive in the rows, so last_activity is kept when
+            # it falls on the latest day anything was posted.
+            updates = {}
+            if post.comment_count != row['count']:
+                updates['comment_count'] = row['count']
+            if timezone.localdate(post.last_activity) != latest:
+                updates['last_activity'] = timezone.make_aware(
+                    datetime.datetime.combine(latest, datetime.time.min))
+            if updates:
+                Post.objects.filter(id=post.id).update(**updates)
+                fixed += 1
+        return fixed
@@ -0,0 +1,55 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from blogs import tasks
+
+
+class Command(BaseCommand):
+    help = ('Run queued tasks in one or more worker processes, until '
+            'stopped or, with --burst, until none are due.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Worker processes.')
+        parser.add_argument('--batch-size', type=int, default=10,
+                            help='Tasks claimed by a worker at a time.')
+        parser.add_argument('--poll', type=float, default=1.0,
+                            help='Seconds an idle worker waits between '
+                                 'looks at the queue.')
+        parser.add_argument('--burst', action='store_true',
+                            help='Stop once no task is due.')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='First queue the tasks that ran out of '
+                                 'attempts again.')
+        parser.add_argument('--stats', action='store_true',
+                            help='Only show how many tasks are queued.')
+
+    def work(self, options):
+        ran = tasks.work(batch_size=options['batch_size'],
+                         poll=options['poll'], burst=options['burst'],
+                         stdout=self.stdout if options['verbosity'] > 1
+                         else None)
+        self.stdout.write(self.style.SUCCESS('Ran %d tasks.' % ran))
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for state, count in tasks.queue_stats().items():
+                self.stdout.write('%-8s %8d' % (state, count))
+            return
+        if options['retry_failed']:
+            self.stdout.write('Queued %d failed tasks again.'
+                              % tasks.retry_failed())
+        if options['workers'] == 1:
+            self.work(options)
+            return
+        # Children must not share the parent's database connections.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=self.work, args=(options,))
+                   for i in range(options['workers'])]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
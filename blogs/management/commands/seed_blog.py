@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from blogs import loadtest, transfer
+
+
+class Command(BaseCommand):
+    help = ('Add a synthetic dataset of users, posts and comments for '
+            'benchmarks. The same options add the same rows; seeded users '
+            'have the password %r.' % transfer.SEED_PASSWORD)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=500)
+        parser.add_argument('--comments-per-post', type=int, default=10)
+        parser.add_argument('--hot-posts', type=float, default=0.01,
+                            help='Fraction of posts that are hot.')
+        parser.add_argument('--hot-share', type=float, default=0.5,
+                            help='Fraction of comments on hot posts.')
+        parser.add_argument('--random-seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows inserted per statement.')
+
+    def handle(self, *args, **options):
+        counts = loadtest.seed(
+            users=options['users'], posts=options['posts'],
+            comments_per_post=options['comments_per_post'],
+            hot_posts=options['hot_posts'], hot_share=options['hot_share'],
+            random_seed=options['random_seed'],
+            batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            'Added %(users)d users, %(posts)d posts and %(comments)d '
+            'comments.' % counts))
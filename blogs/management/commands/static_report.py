@@ -0,0 +1,38 @@
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from blogs.export import StaticExporter
+from blogs.models import Post
+from blogs.staticfiles import PipelineStorage, asset_savings
+
+
+class Command(BaseCommand):
+    help = ('Report, for each kind of page, the static requests and bytes '
+            'saved by the collectstatic pipeline. Run with DEBUG off, after '
+            'collectstatic.')
+
+    def handle(self, *args, **options):
+        if not isinstance(staticfiles_storage, PipelineStorage):
+            raise CommandError('STATICFILES_STORAGE is not the pipeline '
+                               'storage; run with DEBUG off.')
+        if not staticfiles_storage.hashed_files:
+            raise CommandError('No manifest found; run collectstatic first.')
+
+        pages = [('home', reverse('index')), ('login', reverse('login')),
+                 ('search', reverse('search'))]
+        post = Post.objects.only('id').first()
+        if post is not None:
+            pages.append(('post', reverse('post', args=[post.id])))
+
+        exporter = StaticExporter(None)
+        self.stdout.write('%-8s %18s %22s %8s' % (
+            'page', 'requests', 'bytes', 'saved'))
+        for name, url in pages:
+            html = exporter.render(url).decode()
+            requests_before, bytes_before, requests_after, bytes_after = \
+                asset_savings(html)
+            self.stdout.write('%-8s %8d -> %-6d %10d -> %-8d %7.1f%%' % (
+                name, requests_before, requests_after, bytes_before,
+                bytes_after,
+                100.0 * (bytes_before - bytes_after) / (bytes_before or 1)))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blogs import sessions
+
+
+class Command(BaseCommand):
+    help = ('Delete expired sessions in bounded batches, once or every '
+            '--watch seconds.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows deleted by each statement.')
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help='Seconds to wait between batches.')
+        parser.add_argument('--watch', type=float, metavar='SECONDS',
+                            help='Keep sweeping every SECONDS seconds.')
+
+    def handle(self, *args, **options):
+        if sessions.session_model() is None:
+            self.stdout.write('The session engine keeps no table.')
+            return
+        while True:
+            deleted = sessions.sweep(batch_size=options['batch_size'],
+                                     pause=options['pause'],
+                                     stdout=self.stdout)
+            self.stdout.write(self.style.SUCCESS(
+                'Deleted %d expired sessions.' % deleted))
+            if not options['watch']:
+                break
+            time.sleep(options['watch'])
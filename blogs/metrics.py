@@ -0,0 +1,359 @@
+"""Request metrics: latency, database queries, template time and cache
+hits, by route.
+
+``MetricsMiddleware`` times each request and, while the view runs, counts
+the queries of every database connection through an execute wrapper and
+times the templates it renders. A query slower than
+``BLOGS_SLOW_QUERY_SECONDS`` is logged with its SQL and the view that ran
+it. Template time includes queries run by querysets the template
+evaluates. The page and fragment caches of ``blogs.cache`` report their
+hits and misses with ``count_cache``.
+
+Each process adds to counters in memory and, at most every
+``BLOGS_METRICS_FLUSH_INTERVAL`` seconds, adds them to counters in the
+cache named by ``BLOGS_METRICS_CACHE``. As with the rate limit counters,
+they only add up across processes if that is a shared cache. Times are
+stored as integer microseconds so that the cache can increment them.
+
+Routes are the URL names of ``blogs.urls``; any other request, such as the
+admin or a 404, counts under ``other``. The ``/metrics`` view serves the
+counters in the Prometheus text format to scrapers holding
+``BLOGS_METRICS_TOKEN`` or, without a token, connecting directly from
+``BLOGS_METRICS_ALLOWED_IPS``, and the ``metrics_snapshot`` command shows
+them.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the latency histogram buckets.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+INF = '+Inf'
+STATUS_CLASSES = ('1xx', '2xx', '3xx', '4xx', '5xx')
+OTHER = 'other'
+CACHE_OUTCOMES = {
+    'pages': ('hit', 'miss', 'not_modified'),
+    'fragments': ('hit', 'miss'),
+}
+
+_local = threading.local()
+_lock = threading.Lock()
+_pending = defaultdict(int)
+_last_flush = time.monotonic()
+
+
+def metrics_cache():
+    """Return the cache holding the counters of every process."""
+    return caches[getattr(settings, 'BLOGS_METRICS_CACHE', 'default')]
+
+
+def _key(*parts):
+    return 'blogs:metrics:%s' % ':'.join(str(part) for part in parts)
+
+
+def _micros(seconds):
+    return int(round(seconds * 1000000))
+
+
+def add(key, amount=1):
+    """Add ``amount`` to a counter of this process."""
+    if amount:
+        with _lock:
+            _pending[key] += amount
+
+
+def flush():
+    """Add the counters of this process to those in the cache."""
+    global _last_flush
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    cache = metrics_cache()
+    for key, amount in pending.items():
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            # Evicted between add() and incr().
+            cache.set(key, amount, None)
+
+
+def maybe_flush():
+    """Flush if the last flush is older than the flush interval."""
+    interval = getattr(settings, 'BLOGS_METRICS_FLUSH_INTERVAL', 5)
+    if time.monotonic() - _last_flush >= interval:
+        flush()
+
+
+def count_cache(cache, outcome, amount=1):
+    """Add ``amount`` lookups with ``outcome`` to the counter of
+    ``cache``, a key of CACHE_OUTCOMES."""
+    add(_key('cache', cache, outcome), amount)
+
+
+@lru_cache(maxsize=None)
+def routes():
+    """Return the route names requests are counted under."""
+    from blogs.urls import urlpatterns
+
+    return tuple(pattern.name for pattern in urlpatterns if pattern.name) + \
+        (OTHER,)
+
+
+def route_of(request):
+    """Return the route ``request`` is counted under."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None or match.namespace or match.url_name not in routes():
+        return OTHER
+    return match.url_name
+
+
+def view_of(request):
+    """Return the dotted path of the view handling ``request``."""
+    match = getattr(request, 'resolver_match', None)
+    return match._func_path if match is not None else request.path
+
+
+class RequestMetrics:
+    """What the current request spent on queries and templates."""
+
+    def __init__(self, request):
+        self.request = request
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.slow_queries = 0
+        self.template_seconds = 0.0
+        self.rendering = False
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            seconds = time.perf_counter() - start
+            self.queries += 1
+            self.query_seconds += seconds
+            if seconds >= getattr(settings, 'BLOGS_SLOW_QUERY_SECONDS', 0.1):
+                self.slow_queries += 1
+                logger.warning('Slow query (%.1fms) in %s: %s',
+                               seconds * 1000, view_of(self.request), sql)
+
+
+def _timed_render(render):
+    @wraps(render)
+    def inner(self, context):
+        current = getattr(_local, 'current', None)
+        # Included templates are part of the time of the outermost one.
+        if current is None or current.rendering:
+            return render(self, context)
+        current.rendering = True
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            current.template_seconds += time.perf_counter() - start
+            current.rendering = False
+    inner.measured = True
+    return inner
+
+
+def install():
+    """Wrap the render method of templates, once."""
+    if not getattr(Template.render, 'measured', False):
+        Template.render = _timed_render(Template.render)
+
+
+@contextmanager
+def measuring(request):
+    """Collect the RequestMetrics of ``request`` while it is handled by
+    this thread."""
+    current = RequestMetrics(request)
+    _local.current = current
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(current))
+            yield current
+    finally:
+        _local.current = None
+
+
+def record_request(route, status, seconds, current):
+    """Add a request handled in ``seconds`` to the counters of ``route``."""
+    add(_key('requests', route, '%dxx' % (status // 100)))
+    add(_key('duration_count', route))
+    add(_key('duration_sum', route), _micros(seconds))
+    bucket = next((le for le in BUCKETS if seconds <= le), INF)
+    add(_key('duration_bucket', route, bucket))
+    add(_key('queries', route), current.queries)
+    add(_key('query_time', route), _micros(current.query_seconds))
+    add(_key('slow_queries', route), current.slow_queries)
+    add(_key('template_time', route), _micros(current.template_seconds))
+
+
+def _route_keys(route):
+    yield _key('duration_count', route)
+    yield _key('duration_sum', route)
+    for le in BUCKETS + (INF,):
+        yield _key('duration_bucket', route, le)
+    for status in STATUS_CLASSES:
+        yield _key('requests', route, status)
+    for name in ('queries', 'query_time', 'slow_queries', 'template_time'):
+        yield _key(name, route)
+
+
+def _all_keys():
+    keys = [key for route in routes() for key in _route_keys(route)]
+    keys += [_key('cache', cache, outcome)
+             for cache, outcomes in CACHE_OUTCOMES.items()
+             for outcome in outcomes]
+    return keys
+
+
+def read():
+    """Return the counters of every process, by key, flushing this one
+    first. Counters never added to are left out."""
+    flush()
+    return metrics_cache().get_many(_all_keys())
+
+
+def reset():
+    """Zero the counters of this process and in the cache."""
+    with _lock:
+        _pending.clear()
+    metrics_cache().delete_many(_all_keys())
+
+
+def histogram_quantile(q, counts):
+    """Estimate the ``q`` quantile of a latency histogram, given the count
+    of each of BUCKETS and the overflow bucket, as Prometheus does."""
+    total = sum(counts)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    lower = 0.0
+    for upper, count in zip(BUCKETS, counts):
+        if count and seen + count >= rank:
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+        lower = upper
+    # In the overflow bucket, which has no upper bound.
+    return BUCKETS[-1]
+
+
+def snapshot(values=None):
+    """Return a summary of each route that saw requests, and the cache
+    counters."""
+    values = read() if values is None else values
+    summary = {}
+    for route in routes():
+        count = values.get(_key('duration_count', route), 0)
+        if not count:
+            continue
+        counts = [values.get(_key('duration_bucket', route, le), 0)
+                  for le in BUCKETS + (INF,)]
+        summary[route] = {
+            'requests': count,
+            'errors': values.get(_key('requests', route, '5xx'), 0),
+            'mean_ms': values.get(_key('duration_sum', route), 0)
+            / count / 1000,
+            'p50_ms': histogram_quantile(0.5, counts) * 1000,
+            'p95_ms': histogram_quantile(0.95, counts) * 1000,
+            'queries': values.get(_key('queries', route), 0) / count,
+            'query_ms': values.get(_key('query_time', route), 0)
+            / count / 1000,
+            'template_ms': values.get(_key('template_time', route), 0)
+            / count / 1000,
+            'slow_queries': values.get(_key('slow_queries', route), 0),
+        }
+    caches_summary = {
+        cache: {outcome: values.get(_key('cache', cache, outcome), 0)
+                for outcome in outcomes}
+        for cache, outcomes in CACHE_OUTCOMES.items()}
+    return summary, caches_summary
+
+
+def _labels(**labels):
+    return '{%s}' % ','.join('%s="%s"' % item for item in labels.items())
+
+
+def _seconds(micros):
+    return '%.6f' % (micros / 1000000)
+
+
+# Counters of each route: name, help, cache key name, whether a time.
+ROUTE_COUNTERS = [
+    ('blogs_db_queries_total', 'Database queries run by views.',
+     'queries', False),
+    ('blogs_db_query_seconds_total', 'Time spent in database queries.',
+     'query_time', True),
+    ('blogs_slow_queries_total', 'Queries slower than the slow query '
+     'threshold.', 'slow_queries', False),
+    ('blogs_template_render_seconds_total', 'Time spent rendering '
+     'templates.', 'template_time', True),
+]
+
+
+def exposition(values=None):
+    """Return the counters in the Prometheus text format."""
+    values = read() if values is None else values
+    active = [route for route in routes()
+              if values.get(_key('duration_count', route))]
+    lines = [
+        '# HELP blogs_requests_total Requests handled, by route and status.',
+        '# TYPE blogs_requests_total counter',
+    ]
+    for route in active:
+        for status in STATUS_CLASSES:
+            count = values.get(_key('requests', route, status))
+            if count:
+                lines.append('blogs_requests_total%s %d' % (
+                    _labels(route=route, status=status), count))
+
+    lines += [
+        '# HELP blogs_request_duration_seconds Time to respond, by route.',
+        '# TYPE blogs_request_duration_seconds histogram',
+    ]
+    for route in active:
+        cumulative = 0
+        for le in BUCKETS + (INF,):
+            cumulative += values.get(_key('duration_bucket', route, le), 0)
+            lines.append('blogs_request_duration_seconds_bucket%s %d' % (
+                _labels(route=route, le=le), cumulative))
+        lines.append('blogs_request_duration_seconds_sum%s %s' % (
+            _labels(route=route),
+            _seconds(values.get(_key('duration_sum', route), 0))))
+        lines.append('blogs_request_duration_seconds_count%s %d' % (
+            _labels(route=route), cumulative))
+
+    for metric, description, name, is_time in ROUTE_COUNTERS:
+        lines += ['# HELP %s %s' % (metric, description),
+                  '# TYPE %s counter' % metric]
+        for route in active:
+            value = values.get(_key(name, route), 0)
+            lines.append('%s%s %s' % (metric, _labels(route=route),
+                                      _seconds(value) if is_time
+                                      else value))
+
+    lines += [
+        '# HELP blogs_cache_requests_total Cache lookups, by outcome.',
+        '# TYPE blogs_cache_requests_total counter',
+    ]
+    for cache, outcomes in CACHE_OUTCOMES.items():
+        for outcome in outcomes:
+            lines.append('blogs_cache_requests_total%s %d' % (
+                _labels(cache=cache, outcome=outcome),
+                values.get(_key('cache', cache, outcome), 0)))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,123 @@
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.utils.functional import SimpleLazyObject
+
+from blogs import metrics
+from blogs.auth import get_user
+from blogs.hashing import HashingBusy
+from blogs.rendering import profiling
+from blogs.routers import pin_to_primary, unpin
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class MetricsMiddleware:
+    """Count the latency, queries and template time of each request.
+
+    Only installed when BLOGS_METRICS_ENABLED is on; see blogs.metrics.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'BLOGS_METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        metrics.install()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with metrics.measuring(request) as current:
+            response = self.get_response(request)
+        metrics.record_request(metrics.route_of(request),
+                               response.status_code,
+                               time.perf_counter() - start, current)
+        metrics.maybe_flush()
+        return response
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """Set ``request.user`` from the user cache of ``blogs.auth``."""
+
+    def process_request(self, request):
+        assert hasattr(request, 'session'), (
+            'CachedAuthenticationMiddleware requires SessionMiddleware to '
+            'be installed before it.')
+        request.user = SimpleLazyObject(lambda: get_user(request))
+
+
+class HashingBusyMiddleware:
+    """Answer requests that found every password hashing slot taken with
+    503 Service Unavailable, so clients retry later."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, HashingBusy):
+            logger.warning('Password hashing is busy; shed %s %s',
+                           request.method, request.path)
+            response = HttpResponse('The server is busy, try again later.\n',
+                                    content_type='text/plain', status=503)
+            response['Retry-After'] = 1
+            return response
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """Pin a user's reads to the primary database just after they write.
+
+    A request with an unsafe method is pinned for its whole duration and
+    sets a cookie that pins the same browser's requests for the next
+    ``BLOGS_REPLICA_PIN_SECONDS``, long enough for replicas to catch up.
+    """
+    cookie_name = 'blogs_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        writing = request.method not in SAFE_METHODS
+        if writing or self.cookie_name in request.COOKIES:
+            pin_to_primary()
+        try:
+            response = self.get_response(request)
+        finally:
+            unpin()
+
+        if writing:
+            response.set_cookie(
+                self.cookie_name, '1', httponly=True,
+                max_age=getattr(settings, 'BLOGS_REPLICA_PIN_SECONDS', 10))
+        return response
+
+
+class TemplateProfileMiddleware:
+    """Time the templates and tags each request renders.
+
+    Only installed when BLOGS_TEMPLATE_PROFILE is on. The slowest entries
+    go to a Server-Timing header, shown by browser developer tools, and
+    to the debug log.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'BLOGS_TEMPLATE_PROFILE', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with profiling() as profile:
+            response = self.get_response(request)
+        response['Server-Timing'] = profile.server_timing()
+        for key, count, seconds in profile.top(10):
+            logger.debug('%s %s: %d renders, %.2fms', request.path, key,
+                         count, seconds * 1000)
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['create_date', 'id'], name='blogs_post_feed_idx'),
+        ),
+    ]
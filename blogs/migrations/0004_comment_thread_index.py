@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0003_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['comment_post', 'create_date', 'id'], name='blogs_comment_thread_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:45
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+from django.utils import timezone
+import django.utils.timezone
+
+
+def backfill_counters(apps, schema_editor):
+    # As reconcile_post_counters does: only dates survive in the rows, so
+    # last_activity is the start of the day of the latest comment.
+    Post = apps.get_model('blogs', 'Post')
+    Comment = apps.get_model('blogs', 'Comment')
+    db = schema_editor.connection.alias
+    stats = {
+        row['comment_post_id']: row for row in
+        Comment.objects.using(db).values('comment_post_id')
+        .annotate(count=Count('id'), latest=Max('create_date'))
+    }
+    posts = Post.objects.using(db).values_list('id', 'create_date')
+    for post_id, create_date in posts.iterator():
+        row = stats.get(post_id, {'count': 0, 'latest': None})
+        latest = max(date for date in [create_date, row['latest']]
+                     if date is not None)
+        Post.objects.using(db).filter(id=post_id).update(
+            comment_count=row['count'],
+            last_activity=timezone.make_aware(
+                datetime.datetime.combine(latest, datetime.time.min)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0004_comment_thread_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_activity',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['last_activity', 'id'], name='blogs_post_activity_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE blogs_search USING fts5("
+    "subject, content, post_id UNINDEXED, "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+
+
+def create_search_table(apps, schema_editor):
+    # Full-text search needs SQLite's FTS5; run rebuild_search_index to
+    # fill the table from existing posts and comments.
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(CREATE_SQL)
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS blogs_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0005_post_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
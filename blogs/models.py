@@ -1,19 +1,68 @@
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+# Number of characters of a post shown on the home feed.
+EXCERPT_LENGTH = 300
+
+
+class LiveManager(models.Manager):
+    """Rows that are not tombstoned. See blogs.tombstones."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
 
 
 class Post(models.Model):
     """A article the user is writing about"""
     subject = models.CharField(max_length=200)
     content = models.TextField()
+    # Rendered HTML of the start of content, maintained by save().
+    excerpt = models.TextField(blank=True, editable=False)
     create_date = models.DateField(auto_now_add=True)
     last_date = models.DateField(auto_now=True)
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Maintained by the comment views, see reconcile_post_counters.
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    last_activity = models.DateTimeField(default=timezone.now,
+                                         editable=False)
+    # Set when the post is deleted; reap_tombstones removes the row later.
+    deleted_at = models.DateTimeField(null=True, editable=False)
+
+    objects = LiveManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            # Backs the keyset-paginated home feed.
+            models.Index(fields=['create_date', 'id'],
+                         name='blogs_post_feed_idx'),
+            # Backs the home feed sorted by recent activity.
+            models.Index(fields=['last_activity', 'id'],
+                         name='blogs_post_activity_idx'),
+            # Finds the tombstones to reap; live rows are not indexed.
+            models.Index(fields=['deleted_at'],
+                         name='blogs_post_tombstone_idx',
+                         condition=Q(deleted_at__isnull=False)),
+        ]
 
     def __str__(self):
         """Return a string representation of model."""
         return self.subject
 
+    def render_excerpt(self):
+        """Return the start of content rendered as HTML paragraphs."""
+        content = Truncator(self.content).chars(EXCERPT_LENGTH)
+        return linebreaks(content, autoescape=True)
+
+    def save(self, *args, **kwargs):
+        """Keep the excerpt in step with content."""
+        self.excerpt = self.render_excerpt()
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     """Something specific comment about a article."""
@@ -22,7 +71,56 @@ class Comment(models.Model):
     last_date = models.DateField(auto_now=True)
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     comment_post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    # Set when the comment's owner is deleted; reaped as posts are.
+    deleted_at = models.DateTimeField(null=True, editable=False)
+
+    objects = LiveManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            # Backs the keyset-paginated comments of a post.
+            models.Index(fields=['comment_post', 'create_date', 'id'],
+                         name='blogs_comment_thread_idx'),
+            models.Index(fields=['deleted_at'],
+                         name='blogs_comment_tombstone_idx',
+                         condition=Q(deleted_at__isnull=False)),
+        ]
 
     def __str__(self):
         """Return a string representation of model."""
         return self.content
+
+
+class UserTombstone(models.Model):
+    """A user being deleted, with their posts and comments, by the reaper."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+
+class Task(models.Model):
+    """A call of a task function waiting to run. See blogs.tasks."""
+    name = models.CharField(max_length=200)
+    # The positional arguments, as a JSON list.
+    args = models.TextField(default='[]')
+    key = models.CharField(max_length=255)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    # Set while a worker runs the task; a worker that dies lets it go
+    # once this passes.
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    failed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # The tasks workers pick up, soonest first.
+            models.Index(fields=['run_at', 'id'], name='blogs_task_due_idx',
+                         condition=Q(failed_at__isnull=True)),
+            models.Index(fields=['key'], name='blogs_task_key_idx'),
+        ]
+
+    def __str__(self):
+        return '%s(%s)' % (self.name, self.args[1:-1])
@@ -0,0 +1,101 @@
+"""Keyset (cursor) pagination for querysets shown newest first.
+
+A page boundary is expressed as a ``WHERE`` on the ordering keys instead of
+an ``OFFSET``, so the database seeks straight to it through the composite
+index on those keys and page 10,000 costs the same as page 1.
+"""
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+MAX_PAGE_SIZE = 100
+
+CURSOR_SEPARATOR = '_'
+
+
+class InvalidCursor(Exception):
+    """The cursor does not decode to values of the ordering keys."""
+
+
+class KeysetPage:
+    """A single page of results and the cursor of the page after it."""
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """Paginate a queryset in descending order of ``keys``.
+
+    The last key must be unique (normally ``id``) so that rows sharing the
+    leading keys still have a strict order.
+    """
+
+    def __init__(self, queryset, per_page, keys=('create_date', 'id')):
+        self.keys = tuple(keys)
+        self.fields = [queryset.model._meta.get_field(key)
+                       for key in self.keys]
+        self.per_page = max(1, min(int(per_page), MAX_PAGE_SIZE))
+        self.queryset = queryset.order_by(*['-' + key for key in self.keys])
+
+    def encode_cursor(self, obj):
+        """Return the cursor pointing just after ``obj``."""
+        values = []
+        for key in self.keys:
+            value = getattr(obj, key)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append(str(value))
+        return CURSOR_SEPARATOR.join(values)
+
+    def decode_cursor(self, cursor):
+        """Return the ordering key values encoded in ``cursor``."""
+        parts = cursor.split(CURSOR_SEPARATOR)
+        if len(parts) != len(self.fields):
+            raise InvalidCursor(cursor)
+        try:
+            values = [field.to_python(part)
+                      for field, part in zip(self.fields, parts)]
+        except ValidationError:
+            raise InvalidCursor(cursor)
+        if any(value is None for value in values):
+            raise InvalidCursor(cursor)
+        return values
+
+    def filter_after(self, queryset, values):
+        """Restrict ``queryset`` to the rows ordered after ``values``."""
+        # (k1 < v1) OR (k1 = v1 AND k2 < v2) OR ...; the leading
+        # ``k1 <= v1`` gives the planner a plain range to seek on.
+        condition = Q()
+        for i, key in enumerate(self.keys):
+            term = Q(**{key + '__lt': values[i]})
+            for prev_key, prev_value in zip(self.keys[:i], values[:i]):
+                term &= Q(**{prev_key: prev_value})
+            condition |= term
+        return queryset.filter(**{self.keys[0] + '__lte': values[0]}) \
+            .filter(condition)
+
+    def get_page(self, cursor=None):
+        """Return the page following ``cursor``, or the first page."""
+        queryset = self.queryset
+        if cursor:
+            queryset = self.filter_after(queryset,
+                                         self.decode_cursor(cursor))
+
+        # Fetch one extra row to learn whether another page exists.
+        rows = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            next_cursor = self.encode_cursor(rows[-1])
+        return KeysetPage(rows, next_cursor)
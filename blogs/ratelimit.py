@@ -0,0 +1,232 @@
+"""Token-bucket rate limits for the login, signup and write routes.
+
+Each limited route in ``blogs.urls`` is wrapped with ``ratelimit``, which
+gives every client address and every user a bucket of ``count`` tokens
+that refills at ``count`` per period. A request with an empty bucket gets
+a 429 with a Retry-After header before the view runs, so a burst of
+guessed passwords costs no form validation and no password hashing.
+
+For anonymous requests the user is the posted ``username`` together with
+the client address, so one address guessing passwords is slowed down on
+each account it tries without anyone being able to lock an account out
+by failing its logins on purpose. Guesses spread over many addresses are
+bounded by the per-address limits and the login captcha.
+
+Buckets live in the store named by ``BLOGS_RATELIMIT_STORE``:
+``CacheStore`` shares them between processes through the cache named by
+``BLOGS_RATELIMIT_CACHE``, ``LocalStore`` keeps them in the process, which
+multiplies the effective limit by the number of processes. Allowed and
+limited requests are counted per route in that cache too; see the
+``ratelimit_stats`` command.
+"""
+import hashlib
+import math
+import re
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+OUTCOMES = ['allowed', 'limited']
+
+_store = None
+
+
+class Rate:
+    """``count`` requests per ``seconds``, written as '10/m' or '5/15m'."""
+
+    def __init__(self, rate):
+        match = re.fullmatch(r'(\d+)/(\d*)([smhd])', rate)
+        if match is None:
+            raise ValueError('Invalid rate %r.' % rate)
+        count, multiplier, unit = match.groups()
+        self.count = int(count)
+        self.seconds = int(multiplier or 1) * PERIODS[unit]
+        self.rate = rate
+
+    def refill(self, tokens, elapsed):
+        """Return the tokens in a bucket ``elapsed`` seconds later."""
+        return min(self.count,
+                   tokens + elapsed * self.count / self.seconds)
+
+    def wait(self, tokens):
+        """Return the seconds until a bucket holding ``tokens`` has one."""
+        return (1 - tokens) * self.seconds / self.count
+
+    def __repr__(self):
+        return '<Rate %s>' % self.rate
+
+
+class LocalStore:
+    """Buckets of this process only."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, key, rate, now):
+        """Take a token from bucket ``key``. Return 0 if there was one,
+        or else the seconds until there is."""
+        with self.lock:
+            tokens, stamp = self.buckets.get(key, (rate.count, now))
+            tokens = rate.refill(tokens, now - stamp)
+            if tokens < 1:
+                self.buckets[key] = (tokens, now)
+                return rate.wait(tokens)
+            self.buckets[key] = (tokens - 1, now)
+            return 0
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class CacheStore:
+    """Buckets in the rate limit cache, shared between processes.
+
+    A bucket is read and written back without a lock, so requests racing
+    for the last token may all get it; the overshoot is bounded by the
+    number of concurrent requests. A bucket expires once it would be full
+    again, as a missing bucket is.
+    """
+
+    def take(self, key, rate, now):
+        cache = ratelimit_cache()
+        tokens, stamp = cache.get(key, (rate.count, now))
+        tokens = rate.refill(tokens, now - stamp)
+        wait = 0 if tokens >= 1 else rate.wait(tokens)
+        if not wait:
+            tokens -= 1
+        cache.set(key, (tokens, now), math.ceil(rate.seconds))
+        return wait
+
+    def clear(self):
+        ratelimit_cache().clear()
+
+
+def ratelimit_cache():
+    """Return the cache holding shared buckets and the counters."""
+    return caches[getattr(settings, 'BLOGS_RATELIMIT_CACHE', 'default')]
+
+
+def get_store():
+    """Return the store named by the BLOGS_RATELIMIT_STORE setting."""
+    global _store
+    if _store is None:
+        _store = import_string(getattr(settings, 'BLOGS_RATELIMIT_STORE',
+                                       'blogs.ratelimit.CacheStore'))()
+    return _store
+
+
+@receiver(setting_changed)
+def reset_store(setting, **kwargs):
+    global _store
+    if setting == 'BLOGS_RATELIMIT_STORE':
+        _store = None
+
+
+def client_ip(request):
+    """Return the address of the client.
+
+    Behind a proxy, set BLOGS_RATELIMIT_IP_META to the header it adds,
+    such as 'HTTP_X_FORWARDED_FOR'; its last entry is the one the proxy
+    saw.
+    """
+    meta = getattr(settings, 'BLOGS_RATELIMIT_IP_META', 'REMOTE_ADDR')
+    return request.META.get(meta, '').split(',')[-1].strip()
+
+
+def client_user(request):
+    """Return the signed-in user's id, or the username being tried with
+    the client address."""
+    if request.user.is_authenticated:
+        return 'id:%s' % request.user.pk
+    username = request.POST.get('username', '').strip().lower()
+    if not username:
+        return None
+    # Not the username alone, which would let anyone lock its owner out.
+    return 'name:%s@%s' % (username, client_ip(request))
+
+
+def bucket_key(name, kind, value):
+    return 'blogs:ratelimit:%s:%s:%s' % (
+        name, kind, hashlib.md5(value.encode()).hexdigest())
+
+
+def count_request(name, outcome):
+    """Add one to the counter of ``outcome`` for route ``name``."""
+    cache = ratelimit_cache()
+    key = 'blogs:ratelimit-stats:%s:%s' % (name, outcome)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr().
+        cache.set(key, 1, None)
+
+
+def ratelimit_stats(names):
+    """Return the allowed and limited counters of each route in ``names``."""
+    keys = {'blogs:ratelimit-stats:%s:%s' % (name, outcome): (name, outcome)
+            for name in names for outcome in OUTCOMES}
+    found = ratelimit_cache().get_many(keys)
+    stats = {name: dict.fromkeys(OUTCOMES, 0) for name in names}
+    for key, (name, outcome) in keys.items():
+        stats[name][outcome] = found.get(key, 0)
+    return stats
+
+
+def limited_routes():
+    """Return the names of the rate limited routes of ``blogs.urls``."""
+    from blogs.urls import urlpatterns
+
+    return [pattern.callback.ratelimit_name for pattern in urlpatterns
+            if hasattr(pattern.callback, 'ratelimit_name')]
+
+
+def too_many_requests(wait):
+    response = HttpResponse('Too many requests, try again later.\n',
+                            content_type='text/plain', status=429)
+    response['Retry-After'] = max(1, math.ceil(wait))
+    return response
+
+
+def ratelimit(name, ip=None, user=None, methods=('POST',)):
+    """Limit the requests to a view by client address and by user.
+
+    ``ip`` and ``user`` are rates such as '10/m'; either may be None.
+    Only requests with one of ``methods`` are limited.
+    """
+    limits = [(kind, Rate(rate), key) for kind, rate, key in [
+        ('ip', ip, client_ip), ('user', user, client_user)] if rate]
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def inner(request, *args, **kwargs):
+            if request.method not in methods or \
+                    not getattr(settings, 'BLOGS_RATELIMIT_ENABLED', True):
+                return view_func(request, *args, **kwargs)
+
+            store = get_store()
+            now = time.time()
+            for kind, rate, key in limits:
+                value = key(request)
+                if not value:
+                    continue
+                wait = store.take(bucket_key(name, kind, value), rate, now)
+                if wait:
+                    count_request(name, 'limited')
+                    return too_many_requests(wait)
+            count_request(name, 'allowed')
+            return view_func(request, *args, **kwargs)
+        inner.ratelimit_name = name
+        return inner
+    return decorator
@@ -0,0 +1,166 @@
+"""Rendering pages outside the request cycle, template warm-up, and
+render-time profiling.
+
+With DEBUG off, templates are compiled once by the cached loader and kept
+for the life of the process. ``warm_templates``, called from
+``blog.wsgi``, compiles the templates of the app at startup so the first
+requests do not pay for parsing.
+
+``profiling()`` times every template, ``{% block %}``, ``{% url %}`` and
+``{% static %}`` rendered by the current thread while it is active. The
+timing wrappers are installed on first use and cost one attribute lookup
+when no profile is active. Template and block times include everything
+rendered inside them.
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from urllib.parse import unquote, urlsplit
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpRequest, QueryDict
+from django.template.base import Template
+from django.template.defaulttags import URLNode
+from django.template.loader import get_template
+from django.template.loader_tags import BlockNode
+from django.templatetags.static import StaticNode
+from django.urls import resolve
+
+_local = threading.local()
+
+
+def request_host():
+    """Return a host name that ALLOWED_HOSTS accepts."""
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    # Accepted while DEBUG is on and ALLOWED_HOSTS is empty.
+    return 'localhost'
+
+
+def render_url(url, user=None):
+    """Return the rendered response of a GET of ``url`` by ``user``.
+
+    The view is called directly, without middleware.
+    """
+    parts = urlsplit(url)
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = unquote(parts.path)
+    request.META = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': request.path_info,
+        'QUERY_STRING': parts.query,
+        'HTTP_HOST': request_host(),
+        'SERVER_NAME': request_host(),
+        'SERVER_PORT': '80',
+    }
+    request.GET = QueryDict(parts.query)
+    request.user = user or AnonymousUser()
+    match = resolve(request.path_info)
+    response = match.func(request, *match.args, **match.kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+def warm_templates():
+    """Load every template of the blogs app, and return how many."""
+    root = os.path.join(apps.get_app_config('blogs').path, 'templates')
+    count = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith('.html'):
+                path = os.path.relpath(os.path.join(dirpath, filename), root)
+                get_template(path.replace(os.sep, '/'))
+                count += 1
+    return count
+
+
+class RenderProfile:
+    """Number of renders and total seconds of each template and tag."""
+
+    def __init__(self):
+        self.timings = defaultdict(lambda: [0, 0.0])
+
+    def add(self, key, seconds):
+        timing = self.timings[key]
+        timing[0] += 1
+        timing[1] += seconds
+
+    def merge(self, other):
+        for key, (count, seconds) in other.timings.items():
+            timing = self.timings[key]
+            timing[0] += count
+            timing[1] += seconds
+
+    def top(self, limit=None):
+        """Return ``(key, count, seconds)`` tuples, slowest first."""
+        rows = sorted(((key, count, seconds) for key, (count, seconds)
+                       in self.timings.items()),
+                      key=lambda row: row[2], reverse=True)
+        return rows[:limit]
+
+    def server_timing(self, limit=5):
+        """Return the slowest entries as a Server-Timing header value."""
+        return ', '.join(
+            't%d;desc="%s (%d)";dur=%.2f' % (i, key, count, seconds * 1000)
+            for i, (key, count, seconds) in enumerate(self.top(limit)))
+
+
+def _literal(expression):
+    return expression.token.strip('\'"')
+
+
+def _template_key(template):
+    return 'template %s' % (template.origin.template_name or
+                            template.origin.name)
+
+
+# What is timed, and the key each render is counted under.
+INSTRUMENTED = [
+    (Template, '_render', _template_key),
+    (BlockNode, 'render', lambda node: 'block %s' % node.name),
+    (URLNode, 'render', lambda node: 'url %s' % _literal(node.view_name)),
+    (StaticNode, 'render', lambda node: 'static %s' % _literal(node.path)),
+]
+
+
+def _timed(render, key):
+    @wraps(render)
+    def inner(self, context):
+        profile = getattr(_local, 'profile', None)
+        if profile is None:
+            return render(self, context)
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            profile.add(key(self), time.perf_counter() - start)
+    inner.profiled = True
+    return inner
+
+
+def install():
+    """Wrap the render methods of INSTRUMENTED, once."""
+    for cls, name, key in INSTRUMENTED:
+        render = getattr(cls, name)
+        if not getattr(render, 'profiled', False):
+            setattr(cls, name, _timed(render, key))
+
+
+@contextmanager
+def profiling():
+    """Collect a RenderProfile of what this thread renders meanwhile."""
+    install()
+    profile = RenderProfile()
+    _local.profile = profile
+    try:
+        yield profile
+    finally:
+        _local.profile = None
@@ -0,0 +1,59 @@
+"""Send reads of the blogs app to read replicas.
+
+Replica aliases are listed in the ``BLOGS_READ_REPLICAS`` setting. Writes,
+and reads made while the current request is pinned to the primary, go to
+``default``. ``blogs.middleware.ReplicaPinningMiddleware`` pins requests
+that write and, through a short-lived cookie, the requests that follow
+them, so users read their own writes.
+"""
+import random
+import threading
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+_state = threading.local()
+
+
+def pin_to_primary():
+    """Send the reads of the current thread to the primary."""
+    _state.pinned = True
+
+
+def unpin():
+    """Let the reads of the current thread go to replicas again."""
+    _state.pinned = False
+
+
+def is_pinned():
+    """Return whether the reads of the current thread go to the primary."""
+    return getattr(_state, 'pinned', False)
+
+
+class PrimaryReplicaRouter:
+    """Route reads of the blogs app to a random replica."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'blogs':
+            return None
+        replicas = getattr(settings, 'BLOGS_READ_REPLICAS', [])
+        if not replicas or is_pinned():
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label != 'blogs':
+            return None
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold copies of the primary, so objects from any of them
+        # may be related.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive their schema through replication.
+        if db in getattr(settings, 'BLOGS_READ_REPLICAS', []):
+            return False
+        return None
@@ -0,0 +1,335 @@
+"""Full-text search over posts and comments with SQLite FTS5.
+
+Posts and comments are indexed in the ``blogs_search`` virtual table, one
+row each. The row id tells them apart without an indexed lookup column:
+a post is stored at ``2 * id`` and a comment at ``2 * id + 1``. The
+receivers in ``blogs.signals`` keep the table in step with saves and
+deletes through the ``reindex_post`` and ``reindex_comment`` tasks, and
+the ``rebuild_search_index`` command fills it from scratch.
+
+How text is split into tokens is pluggable through the
+``BLOGS_SEARCH_TOKENIZER`` setting, which names a ``Tokenizer`` subclass.
+The default, ``CJKTokenizer``, makes every CJK character its own token so
+that Chinese text, which has no spaces between words, can be searched.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections, router
+from django.utils.functional import cached_property
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from blogs.models import Post, Comment
+from blogs.pagination import InvalidCursor
+from blogs.tasks import task
+
+TABLE = 'blogs_search'
+
+MAX_PAGE_SIZE = 50
+
+# Markers put around matches by FTS5, swapped for <mark> after escaping.
+_MATCH_START = '\x02'
+_MATCH_END = '\x03'
+
+# Kana, CJK ideographs and Hangul.
+CJK_CHARACTERS = ('\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff'
+                  '\uf900-\ufaff\uac00-\ud7af')
+
+
+class Tokenizer:
+    """How documents and queries are prepared for FTS5."""
+    # The tokenize option of the virtual table.
+    fts_tokenize = 'unicode61 remove_diacritics 2'
+
+    def prepare_document(self, text):
+        """Return ``text`` as it should be stored in the index."""
+        return text
+
+    def restore_document(self, text):
+        """Undo ``prepare_document`` on text returned by the index."""
+        return text
+
+    def build_query(self, query):
+        """Return an FTS5 query matching every term of ``query``."""
+        terms = self.prepare_document(query).split()
+        # Quote each term so user input is never read as query syntax.
+        return ' '.join('"%s"' % term.replace('"', '""') for term in terms)
+
+
+class CJKTokenizer(Tokenizer):
+    """Index each CJK character as a token of its own.
+
+    A zero width space, which unicode61 treats as a separator, is put
+    before and after every CJK character, so that Latin words and digits
+    next to one are tokens of their own. A query for a word then becomes a
+    phrase of its characters, which matches them only when adjacent.
+    """
+    separator = '\u200b'
+    pattern = re.compile('([%s])' % CJK_CHARACTERS)
+
+    def prepare_document(self, text):
+        return self.pattern.sub(r'%s\1%s' % (self.separator, self.separator),
+                                text)
+
+    def restore_document(self, text):
+        return text.replace(self.separator, '')
+
+
+class TrigramTokenizer(Tokenizer):
+    """Match any substring of three or more characters, in any script."""
+    fts_tokenize = 'trigram'
+
+
+def get_tokenizer():
+    """Return the tokenizer named by the BLOGS_SEARCH_TOKENIZER setting."""
+    path = getattr(settings, 'BLOGS_SEARCH_TOKENIZER',
+                   'blogs.search.CJKTokenizer')
+    return import_string(path)()
+
+
+def post_rowid(post_id):
+    return 2 * post_id
+
+
+def comment_rowid(comment_id):
+    return 2 * comment_id + 1
+
+
+def comment_of_rowid(rowid):
+    return (rowid - 1) // 2
+
+
+def _write_connection():
+    return connections[router.db_for_write(Post)]
+
+
+def create_table(tokenizer=None):
+    """Create an empty search table for ``tokenizer``.
+
+    An existing table already using the same FTS5 tokenizer is emptied
+    rather than dropped and created again.
+    """
+    tokenizer = tokenizer or get_tokenizer()
+    definition = (
+        "CREATE VIRTUAL TABLE %s USING fts5(subject, content, "
+        "post_id UNINDEXED, tokenize='%s')" % (TABLE, tokenizer.fts_tokenize))
+    with _write_connection().cursor() as cursor:
+        cursor.execute('SELECT sql FROM sqlite_master WHERE name = %s',
+                       [TABLE])
+        row = cursor.fetchone()
+        if row is not None and row[0] == definition:
+            cursor.execute('DELETE FROM %s' % TABLE)
+            return
+        cursor.execute('DROP TABLE IF EXISTS %s' % TABLE)
+        cursor.execute(definition)
+
+
+def _replace_rows(rows):
+    tokenizer = get_tokenizer()
+    with _write_connection().cursor() as cursor:
+        # FTS5 ignores OR REPLACE, so drop the old rows first.
+        cursor.executemany('DELETE FROM %s WHERE rowid = %%s' % TABLE,
+                           [(row[0],) for row in rows])
+        cursor.executemany(
+            'INSERT INTO %s (rowid, subject, content, post_id) '
+            'VALUES (%%s, %%s, %%s, %%s)' % TABLE,
+            [(rowid, tokenizer.prepare_document(subject),
+              tokenizer.prepare_document(content), post_id)
+             for rowid, subject, content, post_id in rows])
+
+
+def index_posts(posts):
+    """Add or update the index rows of ``posts``."""
+    _replace_rows([(post_rowid(post.id), post.subject, post.content, post.id)
+                   for post in posts])
+
+
+def index_comments(comments):
+    """Add or update the index rows of ``comments``."""
+    _replace_rows([(comment_rowid(comment.id), '', comment.content,
+                    comment.comment_post_id) for comment in comments])
+
+
+def _remove_rows(rowids):
+    with _write_connection().cursor() as cursor:
+        cursor.executemany('DELETE FROM %s WHERE rowid = %%s' % TABLE,
+                           [(rowid,) for rowid in rowids])
+
+
+def remove_posts(post_ids):
+    """Remove the index rows of posts."""
+    _remove_rows([post_rowid(post_id) for post_id in post_ids])
+
+
+def remove_comments(comment_ids):
+    """Remove the index rows of comments."""
+    _remove_rows([comment_rowid(comment_id) for comment_id in comment_ids])
+
+
+def remove_post(post_id):
+    """Remove the index row of a post."""
+    remove_posts([post_id])
+
+
+def remove_comment(comment_id):
+    """Remove the index row of a comment."""
+    remove_comments([comment_id])
+
+
+@task
+def reindex_post(post_id):
+    """Bring the index row of a post in step with the database."""
+    post = Post.objects.filter(id=post_id).first()
+    if post is None:
+        remove_post(post_id)
+    else:
+        index_posts([post])
+
+
+@task
+def reindex_comment(comment_id):
+    """Bring the index row of a comment in step with the database."""
+    comment = Comment.objects.filter(
+        id=comment_id, comment_post__deleted_at__isnull=True).first()
+    if comment is None:
+        remove_comment(comment_id)
+    else:
+        index_comments([comment])
+
+
+class SearchResult:
+    """A matching post or comment, with its matches highlighted."""
+
+    def __init__(self, rowid, post, title, snippet):
+        self.rowid = rowid
+        self.post = post
+        self.title = title
+        self.snippet = snippet
+
+    @property
+    def is_comment(self):
+        return self.rowid % 2 == 1
+
+
+class SearchPage:
+    """A page of ranked results and the cursor of the page after it."""
+
+    def __init__(self, results, next_cursor):
+        self.results = results
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+
+class Search:
+    """Ranked, cursor-paginated search of posts and comments.
+
+    Results are ordered by bm25 score, subject matches weighing more than
+    content matches, then by row id. The cursor holds the score and row id
+    of the last result on a page.
+    """
+
+    def __init__(self, query, per_page=20, tokenizer=None):
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.match = self.tokenizer.build_query(query)
+        self.per_page = max(1, min(int(per_page), MAX_PAGE_SIZE))
+
+    @cached_property
+    def connection(self):
+        return connections[router.db_for_read(Post)]
+
+    def decode_cursor(self, cursor):
+        try:
+            score, rowid = cursor.split('_')
+            return float(score), int(rowid)
+        except ValueError:
+            raise InvalidCursor(cursor)
+
+    def highlight(self, text):
+        """Return index text as HTML with matches in <mark>."""
+        text = escape(self.tokenizer.restore_document(text))
+        return mark_safe(text.replace(_MATCH_START, '<mark>')
+                         .replace(_MATCH_END, '</mark>'))
+
+    def get_page(self, cursor=None):
+        """Return the page of results following ``cursor``."""
+        if not self.match:
+            return SearchPage([], None)
+
+        sql = (
+            'SELECT rowid, post_id, score, title, snippet FROM ('
+            ' SELECT rowid, post_id, bm25({table}, 10.0, 1.0) AS score,'
+            ' highlight({table}, 0, %s, %s) AS title,'
+            ' snippet({table}, 1, %s, %s, %s, 24) AS snippet'
+            ' FROM {table} WHERE {table} MATCH %s)'
+        ).format(table=TABLE)
+        params = [_MATCH_START, _MATCH_END, _MATCH_START, _MATCH_END, '…',
+                  self.match]
+        if cursor:
+            sql += ' WHERE (score, rowid) > (%s, %s)'
+            params += list(self.decode_cursor(cursor))
+        sql += ' ORDER BY score, rowid LIMIT %s'
+        params.append(self.per_page + 1)
+
+        with self.connection.cursor() as db_cursor:
+            db_cursor.execute(sql, params)
+            rows = db_cursor.fetchall()
+
+        next_cursor = None
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            next_cursor = '%r_%d' % (rows[-1][2], rows[-1][0])
+
+        posts = Post.objects.select_related('owner') \
+            .defer('content').in_bulk({row[1] for row in rows})
+        comment_ids = {comment_of_rowid(row[0]) for row in rows
+                       if row[0] % 2 == 1}
+        if comment_ids:
+            comment_ids = set(Comment.objects.filter(id__in=comment_ids)
+                              .values_list('id', flat=True))
+        results = []
+        for rowid, post_id, score, title, snippet in rows:
+            post = posts.get(post_id)
+            if post is None or (rowid % 2 == 1 and
+                                comment_of_rowid(rowid) not in comment_ids):
+                # Deleted or tombstoned since it was indexed.
+                continue
+            if rowid % 2 == 1:
+                title = escape(post.subject)
+            else:
+                title = self.highlight(title)
+            results.append(SearchResult(rowid, post, title,
+                                        self.highlight(snippet)))
+        return SearchPage(results, next_cursor)
+
+
+def rebuild(batch_size=500, stdout=None):
+    """Recreate the search table and index every post and comment."""
+    create_table()
+    # Comments of tombstoned posts are hidden, though not tombstoned.
+    live_comments = Comment.objects.filter(
+        comment_post__deleted_at__isnull=True)
+    for objects, index in [(Post.objects.order_by('id'), index_posts),
+                           (live_comments.order_by('id'), index_comments)]:
+        indexed = 0
+        last_id = 0
+        while True:
+            batch = list(objects.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            index(batch)
+            last_id = batch[-1].id
+            indexed += len(batch)
+            if stdout is not None:
+                stdout.write('Indexed %d %s' % (
+                    indexed, objects.model._meta.verbose_name_plural))
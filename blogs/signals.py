@@ -0,0 +1,73 @@
+import threading
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from blogs import export, search
+from blogs.auth import invalidate_user
+from blogs.models import Post, Comment
+
+
+_state = threading.local()
+
+
+@contextmanager
+def bulk_deletes():
+    """Queue no tasks for the posts and comments deleted by the current
+    thread meanwhile. The caller updates the search index and queues the
+    exports itself, once per batch rather than once per row."""
+    _state.bulk = True
+    try:
+        yield
+    finally:
+        _state.bulk = False
+
+
+def queues_tasks(signal):
+    return signal is not post_delete or not getattr(_state, 'bulk', False)
+
+
+# Indexing and export run as tasks once the write commits; see
+# blogs.tasks.
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def index_post(sender, instance, signal, **kwargs):
+    if queues_tasks(signal):
+        search.reindex_post.delay(instance.id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def index_comment(sender, instance, signal, **kwargs):
+    if queues_tasks(signal):
+        search.reindex_comment.delay(instance.id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def export_post(sender, instance, signal, **kwargs):
+    if export.export_dir() and queues_tasks(signal):
+        export.enqueue.delay(instance.id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def export_comment_post(sender, instance, signal, **kwargs):
+    if export.export_dir() and queues_tasks(signal):
+        export.enqueue.delay(instance.comment_post_id)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_saved_user(sender, instance, **kwargs):
+    # Covers password changes and deactivation.
+    invalidate_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def invalidate_logged_out_user(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate_user(user.pk)
@@ -5,4 +5,37 @@ $('.captcha').click(function () {
     });
 
 
-});
\ No newline at end of file
+});
+
+// Load further pages of comments as the reader nears the end of the page.
+var loadingComments = false;
+
+function loadMoreComments() {
+    var more = $('.comments-more');
+    if (loadingComments || !more.length) {
+        return;
+    }
+    loadingComments = true;
+    $.getJSON(more.data('url'), function (result) {
+        $('.comments').append(result['html']);
+        if (result['next']) {
+            more.data('url', result['next']);
+        } else {
+            more.remove();
+        }
+    }).always(function () {
+        loadingComments = false;
+    });
+}
+
+$('.comments-more').click(function (event) {
+    event.preventDefault();
+    loadMoreComments();
+});
+
+$(window).scroll(function () {
+    if ($(window).scrollTop() + $(window).height() >
+        $(document).height() - 400) {
+        loadMoreComments();
+    }
+});
@@ -0,0 +1,189 @@
+"""A small durable queue for the work that follows a write.
+
+Updating the search index and queueing static re-renders used to run
+inline in the write views, through the receivers in ``blogs.signals``.
+They now run as tasks: functions decorated with ``@task`` and called
+through their ``delay`` method, which stores the call in the ``Task``
+table once the surrounding transaction commits. A write view returns as
+soon as its rows are committed, and a write that rolls back queues
+nothing.
+
+Workers started by the ``run_tasks`` command claim due tasks with a
+conditional UPDATE, so no two workers run the same task, and hold them for
+``BLOGS_TASKS_LEASE`` seconds; the task of a worker that dies is picked up
+again once that passes. A task that raises is retried after a delay that
+doubles with each attempt, starting at ``BLOGS_TASKS_RETRY_DELAY``
+seconds, and is kept with its traceback after ``BLOGS_TASKS_MAX_ATTEMPTS``
+attempts. ``run_tasks --retry-failed`` queues those again.
+
+A task may run more than once, and ``delay`` skips the insert when a task
+with the same key, by default its name and arguments, is already waiting.
+Tasks must therefore be idempotent and read the current state of the rows
+they work on rather than be handed it. Arguments must survive a round trip
+through JSON.
+
+With ``BLOGS_TASKS_EAGER`` on, which it is by default while DEBUG is,
+``delay`` runs the task at once instead, so development needs no worker.
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from blogs.models import Task
+from blogs.routers import pin_to_primary
+
+logger = logging.getLogger(__name__)
+
+
+def task(func):
+    """Make ``func`` a task, queued with ``func.delay(*args)``."""
+    func.task_name = '%s.%s' % (func.__module__, func.__name__)
+    func.delay = partial(delay, func)
+    return func
+
+
+def _tasks():
+    # The queue is read where it is written, never on a lagging replica.
+    return Task.objects.using(router.db_for_write(Task))
+
+
+def is_eager():
+    return getattr(settings, 'BLOGS_TASKS_EAGER', settings.DEBUG)
+
+
+def delay(func, *args, key=None, countdown=0):
+    """Run ``func(*args)`` in a worker once the current transaction
+    commits, or at once if tasks are eager."""
+    if is_eager():
+        func(*args)
+        return
+    transaction.on_commit(partial(store, func.task_name, args, key,
+                                  countdown),
+                          using=router.db_for_write(Task))
+
+
+def store(name, args, key=None, countdown=0):
+    """Queue a call of the task ``name``, and return it, or None if the
+    same call is already waiting."""
+    encoded = json.dumps(list(args))
+    if key is None:
+        key = '%s:%s' % (name, hashlib.sha1(encoded.encode()).hexdigest())
+    if _tasks().filter(key=key, locked_until__isnull=True,
+                       failed_at__isnull=True).exists():
+        return None
+    return _tasks().create(
+        name=name, args=encoded, key=key,
+        run_at=timezone.now() + timedelta(seconds=countdown))
+
+
+def worker_name():
+    return '%s:%d' % (socket.gethostname(), os.getpid())
+
+
+def claim(worker, limit=10):
+    """Lock up to ``limit`` due tasks for ``worker`` and return them."""
+    now = timezone.now()
+    free = Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    due = _tasks().filter(free, failed_at__isnull=True, run_at__lte=now) \
+        .order_by('run_at', 'id')
+    lease = timedelta(seconds=getattr(settings, 'BLOGS_TASKS_LEASE', 300))
+    claimed = []
+    for task_id in due.values_list('id', flat=True)[:limit]:
+        # Of workers racing for a task, only one finds it still free.
+        if _tasks().filter(free, id=task_id).update(
+                locked_until=now + lease, locked_by=worker,
+                attempts=F('attempts') + 1):
+            claimed.append(task_id)
+    return list(_tasks().filter(id__in=claimed).order_by('run_at', 'id'))
+
+
+def retry_delay(attempts):
+    """Return the seconds to wait before the retry of a task that failed
+    ``attempts`` times."""
+    seconds = getattr(settings, 'BLOGS_TASKS_RETRY_DELAY', 2) * \
+        2 ** (attempts - 1)
+    seconds = min(seconds,
+                  getattr(settings, 'BLOGS_TASKS_MAX_RETRY_DELAY', 3600))
+    # Spread out the retries of tasks that failed together.
+    return seconds * random.uniform(1, 1.25)
+
+
+def run(task_row, worker):
+    """Run a task claimed by ``worker``, then delete it or schedule its
+    retry. Return whether it succeeded."""
+    mine = _tasks().filter(id=task_row.id, locked_by=worker)
+    try:
+        func = import_string(task_row.name)
+        if getattr(func, 'task_name', None) != task_row.name:
+            raise ValueError('%s is not a task.' % task_row.name)
+        func(*json.loads(task_row.args))
+    except Exception:
+        error = traceback.format_exc()
+    else:
+        mine.delete()
+        return True
+
+    now = timezone.now()
+    if task_row.attempts >= getattr(settings, 'BLOGS_TASKS_MAX_ATTEMPTS', 5):
+        logger.error('Task %s failed %d times:\n%s', task_row,
+                     task_row.attempts, error)
+        mine.update(failed_at=now, last_error=error, locked_until=None,
+                    locked_by='')
+    else:
+        logger.warning('Task %s failed, retrying:\n%s', task_row, error)
+        mine.update(
+            run_at=now + timedelta(seconds=retry_delay(task_row.attempts)),
+            last_error=error, locked_until=None, locked_by='')
+    return False
+
+
+def work(batch_size=10, poll=1.0, burst=False, stdout=None):
+    """Run due tasks, polling every ``poll`` seconds for more, or until
+    none are due if ``burst``. Return how many tasks were run."""
+    worker = worker_name()
+    pin_to_primary()
+    ran = 0
+    while True:
+        claimed = claim(worker, batch_size)
+        for task_row in claimed:
+            succeeded = run(task_row, worker)
+            ran += 1
+            if stdout is not None:
+                stdout.write('%s %s' % ('Ran' if succeeded else 'Failed',
+                                        task_row))
+        if not claimed:
+            if burst:
+                return ran
+            time.sleep(poll)
+
+
+def retry_failed():
+    """Queue the tasks that ran out of attempts again, and return how
+    many there were."""
+    return _tasks().filter(failed_at__isnull=False).update(
+        failed_at=None, attempts=0, run_at=timezone.now())
+
+
+def queue_stats():
+    """Return how many tasks are waiting, running and failed."""
+    now = timezone.now()
+    tasks = _tasks().filter(failed_at__isnull=True)
+    running = tasks.filter(locked_until__gte=now).count()
+    return {
+        'waiting': tasks.count() - running,
+        'running': running,
+        'failed': _tasks().filter(failed_at__isnull=False).count(),
+    }
@@ -0,0 +1,17 @@
+from django import template
+
+from blogs.links import fast_reverse, fast_static
+
+register = template.Library()
+
+
+@register.simple_tag
+def fast_url(viewname, *args, **kwargs):
+    """Like ``{% url %}``, for routes of the blogs app on every row."""
+    return fast_reverse(viewname, args=args or None, kwargs=kwargs or None)
+
+
+@register.simple_tag(name='fast_static')
+def fast_static_tag(path):
+    """Like ``{% static %}``, computing each URL once per process."""
+    return fast_static(path)
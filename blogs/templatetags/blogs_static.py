@@ -0,0 +1,57 @@
+import os
+import re
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from blogs.staticfiles import CSS_BUNDLE_NAME, PipelineStorage, minify_svg
+
+register = template.Library()
+
+
+def icon_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+@register.simple_tag
+def stylesheets():
+    """Link the CSS bundle when it was built, else each stylesheet."""
+    if isinstance(staticfiles_storage, PipelineStorage):
+        names = [CSS_BUNDLE_NAME]
+    else:
+        names = getattr(settings, 'BLOGS_CSS_BUNDLE', [])
+    return format_html_join('\n', '<link rel="stylesheet" href="{}">',
+                            ((static(name),) for name in names))
+
+
+@lru_cache()
+def build_sprite(paths):
+    symbols = []
+    for path in paths:
+        with open(finders.find(path), encoding='iso-8859-1') as f:
+            svg = minify_svg(f.read())
+        view_box = re.search(r'viewBox="([^"]*)"', svg).group(1)
+        body = re.search(r'<svg[^>]*>(.*)</svg>', svg, re.S).group(1)
+        symbols.append('<symbol id="icon-%s" viewBox="%s">%s</symbol>' % (
+            icon_name(path), view_box, body))
+    return mark_safe('<svg xmlns="http://www.w3.org/2000/svg" '
+                     'style="display:none">%s</svg>' % ''.join(symbols))
+
+
+@register.simple_tag
+def svg_sprite():
+    """Inline the icons of BLOGS_INLINE_SVGS, for ``{% icon %}`` to use."""
+    return build_sprite(tuple(getattr(settings, 'BLOGS_INLINE_SVGS', [])))
+
+
+@register.simple_tag
+def icon(name, css_class=''):
+    """Show an icon from the sprite of ``{% svg_sprite %}``."""
+    return format_html('<svg class="{}" aria-hidden="true">'
+                       '<use href="#icon-{}"></use></svg>', css_class, name)
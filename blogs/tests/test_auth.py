@@ -0,0 +1,115 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from blogs.auth import invalidate_user, load_user
+from blogs.checks import check_user_cache
+
+# The query django.contrib.auth makes to load the signed-in user.
+USER_QUERY = 'FROM "auth_user" WHERE "auth_user"."id"'
+
+
+def worker_caches(location):
+    """The caches of a process whose local-memory user cache is kept at
+    ``location``."""
+    return {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'users': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': location,
+        },
+    }
+
+
+@override_settings(BLOGS_USER_CACHE='default')
+class CachedUserTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser1',
+                                            password='1X<ISRUkw+tuK')
+
+    def setUp(self):
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [query['sql'] for query in queries
+                          if USER_QUERY in query['sql']]
+
+    def test_user_is_cached(self):
+        response, queries = self.user_queries(reverse('search'))
+        self.assertContains(response, 'testuser1')
+        self.assertEqual(len(queries), 1)
+        response, queries = self.user_queries(reverse('search'))
+        self.assertContains(response, 'testuser1')
+        self.assertEqual(queries, [])
+
+    def test_invalidate_user(self):
+        self.client.get(reverse('search'))
+        invalidate_user(self.user.pk)
+        response, queries = self.user_queries(reverse('search'))
+        self.assertEqual(len(queries), 1)
+
+    def test_password_change_ends_other_sessions(self):
+        other = Client()
+        other.login(username='testuser1', password='1X<ISRUkw+tuK')
+        self.assertContains(other.get(reverse('search')), 'testuser1')
+
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('new-2HJ1vRV0Z&3iD')
+        user.save()
+        response = other.get(reverse('search'))
+        self.assertNotContains(response, 'testuser1')
+
+    def test_deactivation_ends_sessions(self):
+        self.client.get(reverse('search'))
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        response = self.client.get(reverse('search'))
+        self.assertNotContains(response, 'testuser1')
+
+    def test_logout(self):
+        self.client.get(reverse('search'))
+        self.client.get(reverse('logout'))
+        response = self.client.get(reverse('search'))
+        self.assertNotContains(response, 'testuser1')
+
+
+class UserCacheSettingTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser1',
+                                            password='1X<ISRUkw+tuK')
+
+    def test_users_are_not_cached_by_default(self):
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        for i in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('search'))
+            self.assertEqual(len([query for query in queries
+                                  if USER_QUERY in query['sql']]), 1)
+
+    @override_settings(BLOGS_USER_CACHE='users')
+    def test_local_caches_miss_other_processes_invalidations(self):
+        backend = 'django.contrib.auth.backends.ModelBackend'
+        with self.settings(CACHES=worker_caches('first-worker')):
+            load_user(self.user.pk, backend)
+        with self.settings(CACHES=worker_caches('second-worker')):
+            invalidate_user(self.user.pk)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.settings(CACHES=worker_caches('first-worker')):
+            # Still the copy cached before the second process changed it.
+            self.assertTrue(load_user(self.user.pk, backend).is_active)
+            self.assertEqual([warning.id for warning in
+                              check_user_cache(None)], ['blogs.W002'])
+
+    def test_check(self):
+        self.assertEqual(check_user_cache(None), [])
@@ -0,0 +1,38 @@
+import sqlite3
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from blog.backends.sqlite3.base import apply_pragmas
+
+
+class SqliteBackendTest(TestCase):
+
+    def test_pragmas_are_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            # 1 is NORMAL.
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_busy_timeout_is_the_timeout_option(self):
+        timeout = connection.settings_dict['OPTIONS'].get('timeout', 5)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], timeout * 1000)
+
+    def test_pragmas_are_not_passed_to_connect(self):
+        connection.settings_dict['OPTIONS']['pragmas'] = {'cache_size': -1}
+        try:
+            self.assertNotIn('pragmas', connection.get_connection_params())
+        finally:
+            del connection.settings_dict['OPTIONS']['pragmas']
+
+
+class ApplyPragmasTest(SimpleTestCase):
+
+    def test_apply_pragmas(self):
+        conn = sqlite3.connect(':memory:')
+        apply_pragmas(conn, {'cache_size': -1234})
+        self.assertEqual(conn.execute('PRAGMA cache_size').fetchone()[0],
+                         -1234)
+        conn.close()
@@ -0,0 +1,225 @@
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from blogs.cache import attach_rendered_content, fragment_key, \
+    page_cache_stats
+from blogs.models import Post, Comment
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-fragments',
+        'OPTIONS': {'MAX_ENTRIES': 2, 'CULL_FREQUENCY': 2},
+    },
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-pages',
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-sessions',
+    },
+    'captchas': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-captchas',
+    },
+    'ratelimit': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-ratelimit',
+    },
+    'metrics': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-metrics',
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
+}
+
+
+class FragmentCacheMixin:
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user(username='testuser',
+                                                 password='1X<ISRUkw+tuK')
+        cls.test_post = Post.objects.create(subject='test_subject',
+                                            content='test_content',
+                                            owner=cls.test_user)
+        cls.test_comment = Comment.objects.create(content='test_comment',
+                                                  owner=cls.test_user,
+                                                  comment_post=cls.test_post)
+
+    def setUp(self):
+        caches['fragments'].clear()
+
+    def test_rendered_content_is_cached(self):
+        attach_rendered_content([self.test_post])
+        self.assertEqual(caches['fragments'].get(fragment_key(self.test_post)),
+                         '<p>test_content</p>')
+
+    def test_cached_content_is_used(self):
+        caches['fragments'].set(fragment_key(self.test_post), '<p>cached</p>')
+        post = attach_rendered_content([self.test_post])[0]
+        self.assertEqual(post.content_html, '<p>cached</p>')
+
+    def test_edit_post_invalidates(self):
+        self.client.login(username='testuser', password='1X<ISRUkw+tuK')
+        url = reverse('post', kwargs={'post_id': self.test_post.id})
+        self.assertContains(self.client.get(url), 'test_content')
+        self.client.post(
+            reverse('edit_post', kwargs={'post_id': self.test_post.id}),
+            {'subject': 'test_subject', 'content': 'test_edited'})
+        self.assertContains(self.client.get(url), 'test_edited')
+
+    def test_edit_comment_invalidates(self):
+        self.client.login(username='testuser', password='1X<ISRUkw+tuK')
+        url = reverse('post', kwargs={'post_id': self.test_post.id})
+        self.assertContains(self.client.get(url), 'test_comment')
+        self.client.post(
+            reverse('edit_comment', kwargs={'post_id': self.test_post.id,
+                                            'comment_id': self.test_comment.id}),
+            {'content': 'test_edited'})
+        self.assertContains(self.client.get(url), 'test_edited')
+
+    def test_delete_comment_invalidates(self):
+        self.client.login(username='testuser', password='1X<ISRUkw+tuK')
+        attach_rendered_content([self.test_comment])
+        self.client.post(
+            reverse('delete_comment', kwargs={'post_id': self.test_post.id,
+                                              'pk': self.test_comment.id}))
+        self.assertIsNone(
+            caches['fragments'].get(fragment_key(self.test_comment)))
+
+    def test_delete_post_invalidates(self):
+        self.client.login(username='testuser', password='1X<ISRUkw+tuK')
+        attach_rendered_content([self.test_post])
+        self.client.post(
+            reverse('delete_post', kwargs={'pk': self.test_post.id}))
+        self.assertIsNone(caches['fragments'].get(fragment_key(self.test_post)))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LocMemFragmentCacheTest(FragmentCacheMixin, TestCase):
+
+    def test_least_recently_used_fragment_is_evicted(self):
+        posts = [self.test_post] + [
+            Post.objects.create(subject='test_subject', content='test_content',
+                                owner=self.test_user) for _ in range(2)]
+        attach_rendered_content(posts[:2])
+        # Touch the first post so the second one is least recently used.
+        attach_rendered_content(posts[:1])
+        attach_rendered_content(posts[2:])
+        cache = caches['fragments']
+        self.assertIsNotNone(cache.get(fragment_key(posts[0])))
+        self.assertIsNone(cache.get(fragment_key(posts[1])))
+
+    @override_settings(BLOGS_FRAGMENT_MAX_SIZE=10)
+    def test_large_fragment_is_not_cached(self):
+        attach_rendered_content([self.test_post])
+        self.assertIsNone(caches['fragments'].get(fragment_key(self.test_post)))
+
+
+class FileBasedFragmentCacheTest(FragmentCacheMixin, TestCase):
+
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        settings_override = override_settings(CACHES=dict(
+            LOCMEM_CACHES, fragments={
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': cache_dir,
+            }))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        super().setUp()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AnonymousPageCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user = User.objects.create_user(username='testuser',
+                                             password='1X<ISRUkw+tuK')
+        cls.test_post1 = Post.objects.create(subject='test_subject1',
+                                             content='test_content1',
+                                             owner=test_user)
+        cls.test_post2 = Post.objects.create(subject='test_subject2',
+                                             content='test_content2',
+                                             owner=test_user)
+
+    def setUp(self):
+        caches['pages'].clear()
+        self.post1_url = reverse('post', kwargs={'post_id': self.test_post1.id})
+        self.post2_url = reverse('post', kwargs={'post_id': self.test_post2.id})
+
+    def test_second_anonymous_request_is_a_hit(self):
+        self.assertEqual(self.client.get(self.post1_url)['X-Page-Cache'],
+                         'miss')
+        self.assertEqual(self.client.get(self.post1_url)['X-Page-Cache'],
+                         'hit')
+        self.assertEqual(page_cache_stats()['hit'], 1)
+        self.assertEqual(page_cache_stats()['miss'], 1)
+
+    def test_authenticated_requests_are_not_cached(self):
+        self.client.login(username='testuser', password='1X<ISRUkw+tuK')
+        self.client.get(self.post1_url)
+        response = self.client.get(self.post1_url)
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertContains(response, 'testuser')
+
+    def test_conditional_get(self):
+        response = self.client.get(self.post1_url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        response = self.client.get(self.post1_url,
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(page_cache_stats()['not_modified'], 1)
+
+    def test_missing_post_is_not_cached(self):
+        url = reverse('post', kwargs={'post_id': 99})
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(page_cache_stats()['hit'], 0)
+
+    def test_new_comment_purges_its_post_and_feed(self):
+        index_url = reverse('index')
+        for url in [index_url, self.post1_url, self.post2_url]:
+            self.client.get(url)
+
+        self.client.login(username='testuser', password='1X<ISRUkw+tuK')
+        self.client.post(
+            reverse('new_comment', kwargs={'post_id': self.test_post1.id}),
+            {'content': 'test_comment'})
+        self.client.logout()
+
+        response = self.client.get(self.post1_url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'test_comment')
+        self.assertEqual(self.client.get(self.post2_url)['X-Page-Cache'],
+                         'hit')
+        self.assertContains(self.client.get(index_url), '1 条评论')
+
+    def test_edit_post_purges_post_and_feed(self):
+        index_url = reverse('index')
+        for url in [index_url, self.post1_url, self.post2_url]:
+            self.client.get(url)
+
+        self.client.login(username='testuser', password='1X<ISRUkw+tuK')
+        self.client.post(
+            reverse('edit_post', kwargs={'post_id': self.test_post1.id}),
+            {'subject': 'test_edited', 'content': 'test_edited'})
+        self.client.logout()
+
+        self.assertContains(self.client.get(index_url), 'test_edited')
+        self.assertContains(self.client.get(self.post1_url), 'test_edited')
+        self.assertEqual(self.client.get(self.post2_url)['X-Page-Cache'],
+                         'hit')
@@ -0,0 +1,101 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from captcha.models import CaptchaStore
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from blogs import captchas
+from blogs.tests.test_cache import LOCMEM_CACHES
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CaptchaPoolTest(TestCase):
+
+    def setUp(self):
+        captchas._bounds = None
+
+    def expire(self, count):
+        past = timezone.now() - timedelta(minutes=1)
+        for i in range(count):
+            CaptchaStore.objects.create(challenge='OLD', response='old',
+                                        expiration=past)
+
+    def test_refill_pool(self):
+        self.assertEqual(captchas.refill_pool(5), 5)
+        self.assertEqual(captchas.refill_pool(5), 0)
+        self.assertEqual(captchas.fresh_challenges().count(), 5)
+
+    def image_is_cached(self, key):
+        return caches['captchas'].get(
+            'blogs:captcha-image:%s:1' % key) is not None
+
+    def test_refill_leaves_local_images_to_the_web_processes(self):
+        captchas.refill_pool(1)
+        key = CaptchaStore.objects.get().hashkey
+        self.assertFalse(self.image_is_cached(key))
+
+    def test_refill_draws_images_into_a_shared_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        with self.settings(CACHES=dict(LOCMEM_CACHES, captchas={
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': cache_dir})):
+            captchas.refill_pool(1)
+            key = CaptchaStore.objects.get().hashkey
+            self.assertTrue(self.image_is_cached(key))
+
+    def test_pick_key_from_pool(self):
+        captchas.refill_pool(3)
+        keys = set(CaptchaStore.objects.values_list('hashkey', flat=True))
+        for i in range(10):
+            self.assertIn(captchas.pick_key(), keys)
+        self.assertEqual(CaptchaStore.objects.count(), 3)
+
+    def test_pick_key_skips_expired(self):
+        self.expire(3)
+        key = captchas.pick_key()
+        self.assertTrue(captchas.fresh_challenges().filter(
+            hashkey=key).exists())
+
+    def test_login_page_uses_pool(self):
+        captchas.refill_pool(3)
+        self.client.get(reverse('login'))
+        self.assertEqual(CaptchaStore.objects.count(), 3)
+
+    def test_purge_expired_in_batches(self):
+        self.expire(5)
+        captchas.refill_pool(1)
+        out = StringIO()
+        self.assertEqual(
+            captchas.purge_expired(batch_size=2, pause=0, stdout=out), 5)
+        self.assertEqual(CaptchaStore.objects.count(), 1)
+        self.assertEqual(out.getvalue().count('Deleted'), 3)
+
+    def test_command(self):
+        self.expire(2)
+        out = StringIO()
+        call_command('captcha_pool', '--size', '4', '--pause', '0',
+                     stdout=out)
+        self.assertIn('Created 4 captchas, deleted 2 expired.',
+                      out.getvalue())
+
+    def test_image_is_cached(self):
+        key = CaptchaStore.generate_key()
+        url = '/captcha/image/%s/' % key
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+        self.assertEqual(cached.content, response.content)
+
+    def test_image_of_unknown_key(self):
+        response = self.client.get('/captcha/image/%s/' % ('0' * 40))
+        self.assertEqual(response.status_code, 410)
@@ -0,0 +1,81 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from blogs.export import StaticExporter
+from blogs.models import Post, Comment
+
+
+# Queueing re-renders runs as a task; run it as the rows are saved.
+@override_settings(BLOGS_TASKS_EAGER=True)
+class StaticExportTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser1',
+                                            password='1X<ISRUkw+tuK')
+        for i in range(3):
+            Post.objects.create(subject='test_subject%d' % i,
+                                content='test_content%d' % i, owner=cls.user)
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output)
+        settings = override_settings(BLOGS_STATIC_EXPORT_DIR=self.output,
+                                     BLOGS_PAGE_SIZE=2)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def read(self, *path):
+        with open(os.path.join(self.output, *path), 'rb') as f:
+            return f.read()
+
+    def test_full_export(self):
+        call_command('export_static', stdout=StringIO())
+        index = self.read('index.html')
+        self.assertIn(b'test_subject2', index)
+        self.assertEqual(gzip.decompress(self.read('index.html.gz')), index)
+        self.assertEqual(len(os.listdir(os.path.join(self.output, 'feed'))),
+                         2)
+        for post in Post.objects.all():
+            page = self.read('post', str(post.id), 'index.html')
+            self.assertIn(post.content.encode(), page)
+
+    def test_incremental_export(self):
+        exporter = StaticExporter(self.output)
+        self.assertEqual(exporter.export(), 3)
+        self.assertEqual(exporter.export(incremental=True), 0)
+
+        post = Post.objects.first()
+        Comment.objects.create(content='new_comment', owner=self.user,
+                               comment_post=post)
+        self.assertEqual(exporter.export(incremental=True), 1)
+        self.assertIn(b'new_comment',
+                      self.read('post', str(post.id), 'index.html'))
+
+    def test_same_day_edit_is_queued(self):
+        exporter = StaticExporter(self.output)
+        exporter.export()
+        post = Post.objects.first()
+        post.content = 'edited_content'
+        post.save()
+        self.assertEqual(exporter.export(incremental=True), 1)
+        self.assertIn(b'edited_content',
+                      self.read('post', str(post.id), 'index.html'))
+
+    def test_deleted_post_is_removed(self):
+        exporter = StaticExporter(self.output)
+        exporter.export()
+        post = Post.objects.first()
+        post_id = post.id
+        post.delete()
+        exporter.export(incremental=True)
+        self.assertFalse(os.path.exists(
+            os.path.join(self.output, 'post', str(post_id), 'index.html')))
+        self.assertNotIn(post.subject.encode(), self.read('index.html'))
@@ -0,0 +1,83 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from blogs.models import Post
+from blogs.tests.test_cache import LOCMEM_CACHES
+
+
+class FeedTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user1 = User.objects.create_user(username='testuser1',
+                                              password='1X<ISRUkw+tuK')
+        test_user2 = User.objects.create_user(username='testuser2',
+                                              password='2HJ1vRV0Z&3iD')
+        Post.objects.create(subject='test_subject1', content='test_content1',
+                            owner=test_user1)
+        Post.objects.create(subject='test_subject2', content='test_content2',
+                            owner=test_user2)
+
+    def test_rss_feed(self):
+        response = self.client.get(reverse('rss_feed'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith(
+            'application/rss+xml'))
+        self.assertContains(response, 'test_subject1')
+        self.assertContains(response, '&lt;p&gt;test_content2&lt;/p&gt;')
+
+    def test_atom_feed(self):
+        response = self.client.get(reverse('atom_feed'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith(
+            'application/atom+xml'))
+        self.assertContains(response, '<name>testuser2</name>')
+
+    def test_author_feeds(self):
+        for name in ['author_rss_feed', 'author_atom_feed']:
+            response = self.client.get(
+                reverse(name, kwargs={'username': 'testuser1'}))
+            self.assertContains(response, 'test_subject1')
+            self.assertNotContains(response, 'test_subject2')
+
+    def test_author_feed_of_missing_user(self):
+        response = self.client.get(
+            reverse('author_rss_feed', kwargs={'username': 'nobody'}))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(BLOGS_FEED_SIZE=1)
+    def test_feed_window_is_bounded(self):
+        response = self.client.get(reverse('rss_feed'))
+        self.assertContains(response, '<item>', count=1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FeedCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user = User.objects.create_user(username='testuser',
+                                             password='1X<ISRUkw+tuK')
+        Post.objects.create(subject='test_subject1', content='test_content1',
+                            owner=test_user)
+
+    def setUp(self):
+        caches['pages'].clear()
+
+    def test_conditional_get(self):
+        response = self.client.get(reverse('atom_feed'))
+        response = self.client.get(
+            reverse('atom_feed'),
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_post_refreshes_feed(self):
+        self.client.get(reverse('rss_feed'))
+        self.client.login(username='testuser', password='1X<ISRUkw+tuK')
+        self.client.post(reverse('new_post'), {'subject': 'test_subject2',
+                                               'content': 'test_content2'})
+        self.client.logout()
+        self.assertContains(self.client.get(reverse('rss_feed')),
+                            'test_subject2')
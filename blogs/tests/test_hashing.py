@@ -0,0 +1,84 @@
+from io import StringIO
+
+from django.contrib.auth.hashers import check_password, get_hasher, \
+    make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, \
+    override_settings
+from django.urls import reverse
+
+from blogs.hashing import HashingBusy, default_concurrency, hashing_slots
+from blogs.tests.test_cache import LOCMEM_CACHES
+
+
+class BoundedHasherTest(SimpleTestCase):
+
+    def test_compatible_with_default_hasher(self):
+        encoded = get_hasher('default').encode('secret', 'salt', 1000)
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(check_password('secret', encoded))
+
+    @override_settings(BLOGS_PASSWORD_ITERATIONS=1000)
+    def test_iterations(self):
+        hasher = get_hasher('default')
+        self.assertTrue(make_password('secret').startswith(
+            'pbkdf2_sha256$1000$'))
+        self.assertTrue(hasher.must_update(
+            hasher.encode('secret', 'salt', 2000)))
+
+    @override_settings(BLOGS_HASHING_CONCURRENCY=1, BLOGS_HASHING_WAIT=0)
+    def test_busy(self):
+        slots = hashing_slots()
+        slots.acquire()
+        try:
+            with self.assertRaises(HashingBusy):
+                make_password('secret')
+        finally:
+            slots.release()
+        make_password('secret')
+
+    @override_settings(BLOGS_HASHING_CONCURRENCY=0)
+    def test_unbounded(self):
+        self.assertIsNone(hashing_slots())
+        make_password('secret')
+
+    @override_settings(BLOGS_HASHING_CONCURRENCY=None)
+    def test_default_bound(self):
+        slots = hashing_slots()
+        for i in range(default_concurrency()):
+            self.assertTrue(slots.acquire(blocking=False))
+        self.assertFalse(slots.acquire(blocking=False))
+        for i in range(default_concurrency()):
+            slots.release()
+
+
+@override_settings(CACHES=LOCMEM_CACHES, BLOGS_HASHING_CONCURRENCY=1,
+                   BLOGS_HASHING_WAIT=0)
+class HashingBusyViewTest(TestCase):
+
+    def test_login_is_shed(self):
+        User.objects.create_user('testuser', password='1X<ISRUkw+tuK')
+        slots = hashing_slots()
+        slots.acquire()
+        try:
+            with self.assertLogs('blogs.middleware', 'WARNING'):
+                response = self.client.post(reverse('login'), {
+                    'username': 'testuser', 'password': '1X<ISRUkw+tuK',
+                    'captcha_0': 'abc', 'captcha_1': 'PASSED'})
+        finally:
+            slots.release()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+@override_settings(BLOGS_PASSWORD_ITERATIONS=1000)
+class BenchLoginsTest(TransactionTestCase):
+
+    def test_command(self):
+        out = StringIO()
+        call_command('bench_logins', '--seconds', '0.2', '--readers', '1',
+                     '--logins', '1', '--iterations', '500', stdout=out)
+        self.assertIn('bounded, logins', out.getvalue())
+        self.assertIn('fewer iterations, reads', out.getvalue())
+        self.assertFalse(User.objects.exists())
@@ -0,0 +1,58 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.template import Context, Template
+from django.templatetags.static import static
+from django.test import SimpleTestCase
+from django.urls import NoReverseMatch, reverse, set_script_prefix, \
+    clear_script_prefix
+
+from blogs.links import fast_reverse, fast_static
+
+
+class FastReverseTest(SimpleTestCase):
+
+    def test_matches_reverse(self):
+        cases = [
+            ('index', None, None),
+            ('post', [12], None),
+            ('post', None, {'post_id': 12}),
+            ('edit_comment', [3, 45], None),
+            ('delete_comment', None, {'post_id': 3, 'pk': 45}),
+            ('author_rss_feed', ['a b'], None),
+            ('author_atom_feed', ['张三'], None),
+            ('admin:index', None, None),
+        ]
+        for viewname, args, kwargs in cases:
+            self.assertEqual(fast_reverse(viewname, args, kwargs),
+                             reverse(viewname, args=args, kwargs=kwargs))
+
+    def test_script_prefix(self):
+        set_script_prefix('/blog/')
+        self.addCleanup(clear_script_prefix)
+        self.assertEqual(fast_reverse('post', [1]), '/blog/post/1/')
+
+    def test_no_match(self):
+        with self.assertRaises(NoReverseMatch):
+            fast_reverse('post', ['abc'])
+        with self.assertRaises(NoReverseMatch):
+            fast_reverse('edit_comment', [1])
+        with self.assertRaises(NoReverseMatch):
+            fast_reverse('post', kwargs={'pk': 1})
+
+    def test_fast_static(self):
+        self.assertEqual(fast_static('blogs/css/style.css'),
+                         static('blogs/css/style.css'))
+
+    def test_tags(self):
+        html = Template(
+            "{% load blogs_links %}{% fast_url 'edit_comment' 1 2 %} "
+            "{% fast_url 'post' post_id=3 %} "
+            "{% fast_static 'blogs/js/script.js' %}").render(Context())
+        self.assertEqual(html, '/post/1/edit_comment/2/ /post/3/ '
+                               '/static/blogs/js/script.js')
+
+    def test_bench_reverse(self):
+        out = StringIO()
+        call_command('bench_reverse', '--rows', '10', stdout=out)
+        self.assertIn('edit_comment', out.getvalue())
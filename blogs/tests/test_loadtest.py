@@ -0,0 +1,80 @@
+import json
+import os
+import re
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from blogs import loadtest, transfer
+from blogs.models import Post, Comment
+from blogs.tests.test_cache import LOCMEM_CACHES
+
+
+class SeedTest(TestCase):
+
+    def test_seed(self):
+        counts = loadtest.seed(users=3, posts=20, comments_per_post=5,
+                               hot_posts=0.1, hot_share=0.5)
+        self.assertEqual(counts, {'users': 3, 'posts': 20, 'comments': 100})
+        self.assertEqual(Comment.objects.count(), 100)
+        for post in Post.objects.annotate(comments=Count('comment')):
+            self.assertEqual(post.comment_count, post.comments)
+        hot = Post.objects.order_by('id')[:2]
+        self.assertGreater(sum(post.comment_count for post in hot), 40)
+        self.assertTrue(self.client.login(username='seed-000001',
+                                          password=transfer.SEED_PASSWORD))
+
+    def test_seed_is_reproducible(self):
+        def contents():
+            return list(Post.objects.order_by('id')
+                        .values_list('subject', 'owner__username',
+                                     'comment_count'))
+
+        loadtest.seed(users=3, posts=10, comments_per_post=3)
+        first = contents()
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        loadtest.seed(users=3, posts=10, comments_per_post=3)
+        self.assertEqual(contents(), first)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, BLOGS_PASSWORD_ITERATIONS=1000)
+class BenchRoutesTest(TransactionTestCase):
+
+    def setUp(self):
+        call_command('seed_blog', '--users', '2', '--posts', '5',
+                     '--comments-per-post', '2', stdout=StringIO())
+        self.output = os.path.join(tempfile.mkdtemp(), 'results.json')
+        self.addCleanup(os.remove, self.output)
+
+    def bench(self, transport, *args):
+        out = StringIO()
+        call_command('bench_routes', '--transport', transport,
+                     '--requests', '2', *args, stdout=out)
+        return out.getvalue()
+
+    def test_inprocess(self):
+        out = self.bench('inprocess', '--output', self.output)
+        with open(self.output) as f:
+            results = json.load(f)
+        self.assertEqual(results['transport'], 'inprocess')
+        self.assertEqual(results['dataset']['posts'], 5)
+        self.assertEqual(len(results['routes']), 11)
+        for name, summary in results['routes'].items():
+            self.assertEqual(summary['errors'], 0, name)
+            self.assertGreater(summary['queries'], 0, name)
+        self.assertIn('delete_comment', out)
+        self.assertFalse(User.objects.filter(
+            username__startswith='bench-').exists())
+        self.assertEqual(Comment.objects.count(), 10)
+
+    def test_wsgi_compared(self):
+        self.bench('inprocess', '--output', self.output)
+        out = self.bench('wsgi', '--compare', self.output)
+        self.assertEqual(re.findall(r'(\d+) errors', out), ['0'] * 11)
+        self.assertIn('Changes from', out)
+        self.assertIn('signup           p95_ms', out)
@@ -0,0 +1,138 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from blogs import metrics
+from blogs.models import Post
+from blogs.tests.test_cache import LOCMEM_CACHES
+
+
+class HistogramTest(SimpleTestCase):
+
+    def test_quantiles_interpolate_within_buckets(self):
+        counts = [0] * (len(metrics.BUCKETS) + 1)
+        # Ten requests between 5 and 10 milliseconds.
+        counts[1] = 10
+        self.assertAlmostEqual(metrics.histogram_quantile(0.5, counts),
+                               0.0075)
+        self.assertAlmostEqual(metrics.histogram_quantile(1, counts), 0.01)
+
+    def test_empty_histograms_have_no_quantiles(self):
+        self.assertIsNone(metrics.histogram_quantile(
+            0.5, [0] * (len(metrics.BUCKETS) + 1)))
+
+    def test_the_metrics_cache_holds_every_counter(self):
+        for caches_setting in (settings.CACHES, LOCMEM_CACHES):
+            options = caches_setting['metrics'].get('OPTIONS', {})
+            self.assertGreater(options.get('MAX_ENTRIES', 300),
+                               len(metrics._all_keys()))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, BLOGS_METRICS_FLUSH_INTERVAL=0)
+class MetricsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user(username='testuser',
+                                                 password='1X<ISRUkw+tuK')
+        cls.test_post = Post.objects.create(
+            subject='test_subject', content='test_content',
+            owner=cls.test_user)
+
+    def setUp(self):
+        for alias in LOCMEM_CACHES:
+            caches[alias].clear()
+        metrics.reset()
+
+    def test_requests_are_counted_by_route(self):
+        self.client.get(reverse('index'))
+        self.client.get(reverse('post', args=[self.test_post.id]))
+        self.client.get('/no-such-page/')
+        routes, caches = metrics.snapshot()
+        self.assertEqual(set(routes), {'index', 'post', 'other'})
+        self.assertEqual(routes['index']['requests'], 1)
+        self.assertGreater(routes['index']['queries'], 0)
+        self.assertGreater(routes['index']['query_ms'], 0)
+        self.assertGreater(routes['index']['template_ms'], 0)
+        self.assertGreater(routes['index']['p50_ms'], 0)
+
+    def test_cache_lookups_are_counted(self):
+        self.client.get(reverse('post', args=[self.test_post.id]))
+        self.client.get(reverse('post', args=[self.test_post.id]))
+        routes, caches = metrics.snapshot()
+        self.assertEqual(caches['pages']['miss'], 1)
+        self.assertEqual(caches['pages']['hit'], 1)
+        # The post body, rendered for the first request only.
+        self.assertEqual(caches['fragments']['miss'], 1)
+
+    @override_settings(BLOGS_SLOW_QUERY_SECONDS=0)
+    def test_slow_queries_are_logged_with_their_view(self):
+        with self.assertLogs('blogs.metrics', 'WARNING') as logs:
+            self.client.get(reverse('index'))
+        self.assertIn('blogs.views.index', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+        routes, caches = metrics.snapshot()
+        self.assertEqual(routes['index']['slow_queries'], len(logs.output))
+
+    def test_metrics_are_served_to_local_scrapers(self):
+        self.client.get(reverse('index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('blogs_requests_total{route="index",status="2xx"} 1',
+                      body)
+        self.assertIn('blogs_request_duration_seconds_bucket'
+                      '{route="index",le="+Inf"} 1', body)
+        self.assertIn('blogs_request_duration_seconds_count'
+                      '{route="index"} 1', body)
+        self.assertIn('blogs_cache_requests_total'
+                      '{cache="pages",outcome="miss"} 1', body)
+
+    def test_metrics_are_hidden_from_other_addresses(self):
+        response = self.client.get(reverse('metrics'),
+                                   REMOTE_ADDR='203.0.113.7')
+        self.assertEqual(response.status_code, 404)
+
+    def test_metrics_are_hidden_from_proxied_requests(self):
+        # A proxy on the same host connects from a local address.
+        response = self.client.get(reverse('metrics'),
+                                   HTTP_X_FORWARDED_FOR='203.0.113.7')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(BLOGS_METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('metrics'),
+                                   REMOTE_ADDR='203.0.113.7',
+                                   HTTP_X_FORWARDED_FOR='203.0.113.7',
+                                   HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(BLOGS_METRICS_FLUSH_INTERVAL=3600)
+    def test_counters_reach_the_cache_when_flushed(self):
+        metrics.flush()
+        self.client.get(reverse('index'))
+        self.assertIsNone(metrics.metrics_cache().get(
+            'blogs:metrics:duration_count:index'))
+        metrics.flush()
+        self.assertEqual(metrics.metrics_cache().get(
+            'blogs:metrics:duration_count:index'), 1)
+
+    def test_snapshot_command(self):
+        self.client.get(reverse('index'))
+        out = StringIO()
+        call_command('metrics_snapshot', '--reset', stdout=out)
+        self.assertIn('index', out.getvalue())
+        self.assertEqual(metrics.snapshot()[0], {})
+
+        out = StringIO()
+        call_command('metrics_snapshot', '--prometheus', stdout=out)
+        self.assertIn('# TYPE blogs_request_duration_seconds histogram',
+                      out.getvalue())
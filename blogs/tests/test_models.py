@@ -1,5 +1,12 @@
+import datetime
+from io import StringIO
+
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
 
 from blogs.models import Post, Comment
 
@@ -48,6 +55,83 @@ class PostModelTest(TestCase):
         expected_object_name = post.subject
         self.assertEqual(expected_object_name, str(post))
 
+    def test_excerpt_is_rendered_on_save(self):
+        post = Post.objects.get(id=1)
+        self.assertEqual(post.excerpt, '<p>test_content</p>')
+        post.content = 'a<b>\n\n' + 'x' * 1000
+        post.save()
+        post.refresh_from_db()
+        self.assertTrue(post.excerpt.startswith('<p>a&lt;b&gt;</p>'))
+        self.assertLess(len(post.excerpt), 400)
+
+
+class BackfillExcerptsCommandTest(TestCase):
+
+    def test_missing_excerpts_are_backfilled(self):
+        test_user = User.objects.create_user(username='testuser',
+                                             password='1X<ISRUkw+tuK')
+        post = Post.objects.create(subject='test_subject',
+                                   content='test_content', owner=test_user)
+        Post.objects.filter(id=post.id).update(excerpt='')
+        call_command('backfill_excerpts', batch_size=1, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, '<p>test_content</p>')
+
+
+class ReconcilePostCountersCommandTest(TestCase):
+
+    def test_drifted_counters_are_fixed(self):
+        test_user = User.objects.create_user(username='testuser',
+                                             password='1X<ISRUkw+tuK')
+        post = Post.objects.create(subject='test_subject',
+                                   content='test_content', owner=test_user)
+        for _ in range(2):
+            Comment.objects.create(content='test_content', owner=test_user,
+                                   comment_post=post)
+        Post.objects.filter(id=post.id).update(
+            comment_count=7,
+            last_activity=timezone.now() - datetime.timedelta(days=30))
+        call_command('reconcile_post_counters', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 2)
+        self.assertEqual(timezone.localdate(post.last_activity),
+                         post.create_date)
+
+
+class PostCountersMigrationTest(TransactionTestCase):
+    before = [('blogs', '0004_comment_thread_index')]
+    after = [('blogs', '0005_post_counters')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_counters_are_backfilled(self):
+        apps = self.migrate(self.before)
+        user = apps.get_model('auth', 'User').objects.create(
+            username='testuser')
+        Post = apps.get_model('blogs', 'Post')
+        Comment = apps.get_model('blogs', 'Comment')
+        commented = Post.objects.create(subject='a', content='a', owner=user)
+        quiet = Post.objects.create(subject='b', content='b', owner=user)
+        for i in range(3):
+            Comment.objects.create(content='c', owner=user,
+                                   comment_post=commented)
+
+        Post = self.migrate(self.after).get_model('blogs', 'Post')
+        today = timezone.localdate()
+        for post_id, count in [(commented.id, 3), (quiet.id, 0)]:
+            post = Post.objects.get(id=post_id)
+            self.assertEqual(post.comment_count, count)
+            self.assertEqual(timezone.localtime(post.last_activity),
+                             timezone.make_aware(datetime.datetime.combine(
+                                 today, datetime.time.min)))
+
 
 class CommentModelTest(TestCase):
 
@@ -0,0 +1,56 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from blogs.models import Post
+from blogs.pagination import KeysetPaginator, InvalidCursor
+
+
+class KeysetPaginatorTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user = User.objects.create_user(username='testuser',
+                                             password='1X<ISRUkw+tuK')
+        for i in range(4):
+            Post.objects.create(subject='test_subject%d' % i,
+                                content='test_content', owner=test_user)
+        # Spread the posts over two days so both keys take part.
+        Post.objects.filter(subject__in=['test_subject0', 'test_subject3']) \
+            .update(create_date=datetime.date(2019, 1, 1))
+
+    def test_pages_follow_create_date_then_id(self):
+        paginator = KeysetPaginator(Post.objects.all(), 3)
+        page = paginator.get_page()
+        self.assertEqual([post.subject for post in page],
+                         ['test_subject2', 'test_subject1', 'test_subject3'])
+        page = paginator.get_page(page.next_cursor)
+        self.assertEqual([post.subject for post in page], ['test_subject0'])
+        self.assertFalse(page.has_next)
+
+    def test_cursor_round_trip(self):
+        paginator = KeysetPaginator(Post.objects.all(), 1)
+        post = Post.objects.get(subject='test_subject3')
+        cursor = paginator.encode_cursor(post)
+        self.assertEqual(cursor, '2019-01-01_%d' % post.id)
+        self.assertEqual(paginator.decode_cursor(cursor),
+                         [datetime.date(2019, 1, 1), post.id])
+
+    def test_pages_follow_datetime_key(self):
+        paginator = KeysetPaginator(Post.objects.all(), 2,
+                                    keys=('last_activity', 'id'))
+        page = paginator.get_page()
+        page = paginator.get_page(page.next_cursor)
+        self.assertEqual([post.subject for post in page],
+                         ['test_subject1', 'test_subject0'])
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPaginator(Post.objects.all(), 1)
+        for cursor in ['nonsense', '2019-13-01_1', '2019-01-01_x', '1_2_3']:
+            with self.assertRaises(InvalidCursor):
+                paginator.get_page(cursor)
+
+    def test_page_size_is_bounded(self):
+        paginator = KeysetPaginator(Post.objects.all(), 10 ** 6)
+        self.assertEqual(paginator.per_page, 100)
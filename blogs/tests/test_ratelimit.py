@@ -0,0 +1,121 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from blogs.ratelimit import LocalStore, Rate, get_store, ratelimit_stats
+from blogs.tests.test_cache import LOCMEM_CACHES
+
+
+class RateTest(SimpleTestCase):
+
+    def test_parse(self):
+        rate = Rate('5/15m')
+        self.assertEqual((rate.count, rate.seconds), (5, 900))
+        self.assertEqual(Rate('10/s').seconds, 1)
+        with self.assertRaises(ValueError):
+            Rate('10 per minute')
+
+    def test_bucket_refills(self):
+        store, rate = LocalStore(), Rate('2/m')
+        self.assertEqual(store.take('key', rate, 0), 0)
+        self.assertEqual(store.take('key', rate, 0), 0)
+        self.assertEqual(store.take('key', rate, 0), 30)
+        self.assertEqual(store.take('key', rate, 15), 15)
+        self.assertEqual(store.take('key', rate, 30), 0)
+        self.assertEqual(store.take('other', rate, 30), 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RateLimitTest(TestCase):
+    password = '1X<ISRUkw+tuK'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser',
+                                            password=cls.password)
+
+    def setUp(self):
+        get_store().clear()
+
+    def login(self, username, ip='127.0.0.1', **extra):
+        return self.client.post(reverse('login'), {
+            'username': username, 'password': 'wrong',
+            'captcha_0': 'abc', 'captcha_1': 'PASSED'}, REMOTE_ADDR=ip,
+            **extra)
+
+    def test_username_is_limited_before_hashing(self):
+        for i in range(5):
+            self.assertEqual(self.login('testuser').status_code, 200)
+        with mock.patch('django.contrib.auth.backends.ModelBackend.'
+                        'authenticate') as authenticate:
+            response = self.login('TestUser')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn(int(response['Retry-After']), range(1, 13))
+        authenticate.assert_not_called()
+        self.assertEqual(self.login('otheruser').status_code, 200)
+
+    def test_failed_logins_do_not_lock_the_account_out(self):
+        for i in range(6):
+            self.login('testuser', '10.0.0.1')
+        self.assertEqual(self.login('testuser', '10.0.0.1').status_code, 429)
+        response = self.client.post(reverse('login'), {
+            'username': 'testuser', 'password': self.password,
+            'captcha_0': 'abc', 'captcha_1': 'PASSED'},
+            REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 302)
+
+    def test_address_is_limited(self):
+        for i in range(20):
+            self.login('user%d' % i)
+        self.assertEqual(self.login('testuser').status_code, 429)
+        self.assertEqual(self.login('testuser', '10.0.0.1').status_code, 200)
+
+    def test_get_is_not_limited(self):
+        for i in range(6):
+            self.login('testuser')
+        self.assertEqual(self.client.get(reverse('login')).status_code, 200)
+
+    def test_signed_in_user_is_limited(self):
+        self.client.login(username='testuser', password=self.password)
+        for i in range(10):
+            self.client.post(reverse('new_post'), {'subject': 'test_subject',
+                                                   'content': 'test_content'},
+                             REMOTE_ADDR='10.0.0.%d' % i)
+        response = self.client.post(reverse('new_post'), {
+            'subject': 'test_subject', 'content': 'test_content'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.user.post_set.count(), 10)
+
+    @override_settings(BLOGS_RATELIMIT_STORE='blogs.ratelimit.LocalStore')
+    def test_local_store(self):
+        for i in range(5):
+            self.login('testuser')
+        self.assertEqual(self.login('testuser').status_code, 429)
+
+    @override_settings(BLOGS_RATELIMIT_ENABLED=False)
+    def test_disabled(self):
+        for i in range(6):
+            self.assertEqual(self.login('testuser').status_code, 200)
+
+    @override_settings(BLOGS_RATELIMIT_IP_META='HTTP_X_FORWARDED_FOR')
+    def test_address_behind_proxy(self):
+        for i in range(20):
+            self.login('user%d' % i,
+                       HTTP_X_FORWARDED_FOR='10.0.0.%d, 10.0.1.1' % i)
+        self.assertEqual(self.login(
+            'testuser', HTTP_X_FORWARDED_FOR='10.0.1.1').status_code, 429)
+        self.assertEqual(self.login(
+            'testuser', HTTP_X_FORWARDED_FOR='10.0.1.2').status_code, 200)
+
+    def test_counters(self):
+        for i in range(6):
+            self.login('testuser')
+        self.assertEqual(ratelimit_stats(['login'])['login'],
+                         {'allowed': 5, 'limited': 1})
+        out = StringIO()
+        call_command('ratelimit_stats', stdout=out)
+        self.assertIn('login                 5         1', out.getvalue())
@@ -0,0 +1,78 @@
+import glob
+import os
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from blogs.models import Post, Comment
+from blogs.rendering import profiling, render_url, warm_templates
+
+
+class ProfilingTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='testuser1',
+                                        password='1X<ISRUkw+tuK')
+        post = Post.objects.create(subject='test_subject',
+                                   content='test_content', owner=user)
+        for i in range(3):
+            Comment.objects.create(content='test_comment%d' % i, owner=user,
+                                   comment_post=post)
+        cls.post_id = post.id
+
+    def test_profiling_counts_tags(self):
+        template = Template("{% load static %}{% block body %}"
+                            "{% url 'index' %}{% static 'a.css' %}"
+                            "{% url 'index' %}{% endblock %}")
+        with profiling() as profile:
+            template.render(Context())
+        self.assertEqual(profile.timings['url index'][0], 2)
+        self.assertEqual(profile.timings['static a.css'][0], 1)
+        self.assertEqual(profile.timings['block body'][0], 1)
+
+    def test_nothing_recorded_outside_profiling(self):
+        with profiling() as profile:
+            pass
+        Template("{% url 'index' %}").render(Context())
+        self.assertEqual(len(profile.timings), 0)
+
+    def test_page_templates_are_profiled(self):
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        with profiling() as profile:
+            self.client.get(reverse('post', args=[self.post_id]))
+        self.assertIn('template blogs/post.html', profile.timings)
+        self.assertEqual(
+            profile.timings['template blogs/comment_list.html'][0], 1)
+        self.assertEqual(profile.timings['url edit_post'][0], 1)
+
+    @override_settings(BLOGS_TEMPLATE_PROFILE=True)
+    def test_middleware_sets_server_timing(self):
+        response = self.client.get(reverse('index'))
+        self.assertIn('template blogs/index.html', response['Server-Timing'])
+
+    def test_middleware_off_by_default(self):
+        response = self.client.get(reverse('index'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_profile_templates_command(self):
+        out = StringIO()
+        call_command('profile_templates', '--repeat', '2', stdout=out)
+        self.assertIn('template blogs/comment_list.html', out.getvalue())
+
+    def test_render_url_passes_the_query_string(self):
+        response = render_url(reverse('search') + '?q=test_subject')
+        self.assertContains(response, '<mark>test_subject</mark>')
+        self.assertNotContains(render_url(reverse('search')),
+                               '<mark>test_subject</mark>')
+
+    def test_warm_templates(self):
+        root = os.path.join(apps.get_app_config('blogs').path, 'templates')
+        templates = glob.glob(os.path.join(root, '**', '*.html'),
+                              recursive=True)
+        self.assertEqual(warm_templates(), len(templates))
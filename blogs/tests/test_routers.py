@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from blogs.models import Post, Comment
+from blogs.routers import PrimaryReplicaRouter, pin_to_primary, unpin
+
+
+@override_settings(BLOGS_READ_REPLICAS=['replica'])
+class PrimaryReplicaRouterTest(TestCase):
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.addCleanup(unpin)
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+
+    def test_pinned_reads_go_to_primary(self):
+        pin_to_primary()
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_other_apps_are_not_routed(self):
+        self.assertIsNone(self.router.db_for_read(User))
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'blogs'))
+        self.assertIsNone(self.router.allow_migrate('default', 'blogs'))
+
+    @override_settings(BLOGS_READ_REPLICAS=[])
+    def test_without_replicas_reads_go_to_primary(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+
+@override_settings(BLOGS_READ_REPLICAS=['replica'])
+class ReplicaPinningTest(TestCase):
+    """Route requests between the test database and a replica file."""
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.mkdtemp()
+        connections.databases['replica'] = {
+            'ENGINE': 'blog.backends.sqlite3',
+            'NAME': os.path.join(cls.replica_dir, 'replica.sqlite3'),
+        }
+        connections.ensure_defaults('replica')
+        with connections['replica'].schema_editor() as editor:
+            for model in [User, Post, Comment]:
+                editor.create_model(model)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+        shutil.rmtree(cls.replica_dir)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user(username='testuser',
+                                                 password='1X<ISRUkw+tuK')
+        cls.test_post = Post.objects.create(subject='primary_subject',
+                                            content='test_content',
+                                            owner=cls.test_user)
+        # The replica lags behind: it holds an older copy of the post.
+        User.objects.using('replica').create(id=cls.test_user.id,
+                                             username='testuser')
+        replica_post = Post(id=cls.test_post.id, subject='replica_subject',
+                            content='test_content', owner=cls.test_user)
+        replica_post.save(using='replica')
+
+    def test_anonymous_reads_go_to_replica(self):
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'replica_subject')
+
+    def test_reads_after_a_write_go_to_primary(self):
+        self.client.login(username='testuser', password='1X<ISRUkw+tuK')
+        self.client.post(
+            reverse('new_comment', kwargs={'post_id': self.test_post.id}),
+            {'content': 'test_comment'})
+        self.assertIn('blogs_primary', self.client.cookies)
+        response = self.client.get(
+            reverse('post', kwargs={'post_id': self.test_post.id}))
+        self.assertContains(response, 'primary_subject')
+        self.assertContains(response, 'test_comment')
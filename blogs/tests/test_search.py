@@ -0,0 +1,146 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, SimpleTestCase, TransactionTestCase, \
+    override_settings
+from django.urls import reverse
+
+from blogs.models import Post, Comment
+from blogs.search import Search, CJKTokenizer, Tokenizer, create_table
+
+
+class TokenizerTest(SimpleTestCase):
+
+    def test_cjk_characters_are_separated(self):
+        tokenizer = CJKTokenizer()
+        document = tokenizer.prepare_document('我的blog博客')
+        self.assertEqual(document, '\u200b我\u200b\u200b的\u200bblog'
+                                   '\u200b博\u200b\u200b客\u200b')
+        self.assertEqual(tokenizer.restore_document(document), '我的blog博客')
+
+    def test_query_terms_are_quoted(self):
+        self.assertEqual(Tokenizer().build_query('a "b" OR'),
+                         '"a" """b""" "OR"')
+
+
+# Indexing runs as a task; run it as the rows are saved.
+@override_settings(BLOGS_TASKS_EAGER=True)
+class SearchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.test_user = User.objects.create_user(username='testuser',
+                                                 password='1X<ISRUkw+tuK')
+        cls.test_post = Post.objects.create(
+            subject='我的博客', content='今天天气很好，我们去公园散步。',
+            owner=cls.test_user)
+        cls.test_comment = Comment.objects.create(
+            content='公园里的花<b>开</b>了', owner=cls.test_user,
+            comment_post=cls.test_post)
+
+    def search(self, query, **kwargs):
+        return list(Search(query, **kwargs).get_page())
+
+    def test_chinese_words_are_found(self):
+        results = self.search('博客')
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].title, '我的<mark>博客</mark>')
+
+    def test_words_next_to_chinese_are_found(self):
+        Post.objects.create(subject='用Python写教程',
+                            content='学习Django框架很有趣', owner=self.test_user)
+        for query in ('Python', 'Django', '框架', '学习Django'):
+            self.assertEqual(len(self.search(query)), 1, query)
+        self.assertEqual(self.search('Python')[0].title,
+                         '用<mark>Python</mark>写教程')
+
+    def test_characters_must_be_adjacent(self):
+        self.assertEqual(self.search('客博'), [])
+
+    def test_posts_and_comments_are_found(self):
+        results = self.search('公园')
+        self.assertEqual(len(results), 2)
+        comment = [result for result in results if result.is_comment][0]
+        self.assertEqual(comment.snippet,
+                         '<mark>公园</mark>里的花&lt;b&gt;开&lt;/b&gt;了')
+        self.assertEqual(comment.title, '我的博客')
+
+    def test_edits_are_reindexed(self):
+        post = Post.objects.get(id=self.test_post.id)
+        post.content = '下雨了'
+        post.save()
+        self.assertEqual([r.is_comment for r in self.search('公园')], [True])
+        self.assertEqual(len(self.search('下雨')), 1)
+
+    def test_deletes_are_unindexed(self):
+        Comment.objects.get(id=self.test_comment.id).delete()
+        self.assertEqual(len(self.search('花')), 0)
+        Post.objects.get(id=self.test_post.id).delete()
+        self.assertEqual(len(self.search('博客')), 0)
+
+    def test_results_are_paginated(self):
+        for i in range(3):
+            Post.objects.create(subject='test_subject', content='天气 %d' % i,
+                                owner=self.test_user)
+        search = Search('天气', per_page=3)
+        page = search.get_page()
+        rowids = [result.rowid for result in page]
+        page = search.get_page(page.next_cursor)
+        rowids += [result.rowid for result in page]
+        self.assertFalse(page.has_next)
+        self.assertEqual(len(set(rowids)), 4)
+
+    def test_rebuild_search_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM blogs_search')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.search('公园')), 2)
+
+
+# Indexing runs as a task; run it as the rows are saved.
+@override_settings(BLOGS_TASKS_EAGER=True)
+class SearchTokenizerChangeTest(TransactionTestCase):
+    """Changing the tokenizer recreates the table, which is not
+    transactional, so this runs outside of a test transaction."""
+
+    def tearDown(self):
+        create_table()
+
+    @override_settings(BLOGS_SEARCH_TOKENIZER='blogs.search.TrigramTokenizer')
+    def test_trigram_tokenizer(self):
+        test_user = User.objects.create_user(username='testuser',
+                                             password='1X<ISRUkw+tuK')
+        Post.objects.create(subject='test_subject',
+                            content='今天我们去公园散步', owner=test_user)
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(Search('去公园').get_page()), 1)
+
+
+# Indexing runs as a task; run it as the rows are saved.
+@override_settings(BLOGS_TASKS_EAGER=True)
+class SearchViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user = User.objects.create_user(username='testuser',
+                                             password='1X<ISRUkw+tuK')
+        Post.objects.create(subject='我的博客', content='test_content',
+                            owner=test_user)
+
+    def test_view_uses_correct_template(self):
+        response = self.client.get(reverse('search'), {'q': '博客'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'blogs/search.html')
+        self.assertContains(response, '我的<mark>博客</mark>')
+
+    def test_empty_query(self):
+        response = self.client.get(reverse('search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['results']), 0)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('search'),
+                                   {'q': '博客', 'after': 'nonsense'})
+        self.assertEqual(response.status_code, 404)
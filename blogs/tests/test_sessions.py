@@ -0,0 +1,85 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from blogs import sessions
+from blogs.checks import check_session_cache
+
+
+class SweepTest(TestCase):
+
+    def setUp(self):
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(session_key='expired%d' % i,
+                                   session_data='',
+                                   expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='current', session_data='',
+                               expire_date=now + timedelta(days=1))
+
+    def test_sweep_in_batches(self):
+        out = StringIO()
+        self.assertEqual(sessions.sweep(batch_size=2, pause=0, stdout=out), 5)
+        self.assertEqual(list(Session.objects.values_list('session_key',
+                                                          flat=True)),
+                         ['current'])
+        self.assertEqual(out.getvalue().count('Deleted'), 3)
+
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_nothing_to_sweep_with_signed_cookies(self):
+        self.assertIsNone(sessions.session_model())
+        self.assertEqual(sessions.sweep(), 0)
+        self.assertEqual(Session.objects.count(), 6)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('sweep_sessions', '--pause', '0', stdout=out)
+        self.assertIn('Deleted 5 expired sessions.', out.getvalue())
+
+
+class SessionModeTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user(username='testuser1',
+                                 password='1X<ISRUkw+tuK')
+
+    def login_and_get(self):
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        return self.client.get(reverse('index'))
+
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_db_reads_session_from_cache(self):
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        self.client.get(reverse('index'))
+        with self.assertNumQueries(0):
+            self.client.session.get('_auth_user_id')
+
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookies(self):
+        response = self.login_and_get()
+        self.assertContains(response, 'testuser1')
+        self.assertEqual(Session.objects.count(), 0)
+
+    def test_local_session_cache_is_flagged(self):
+        with self.settings(
+                SESSION_ENGINE='django.contrib.sessions.backends.cached_db'):
+            self.assertEqual([warning.id for warning in
+                              check_session_cache(None)], ['blogs.W001'])
+        self.assertEqual(check_session_cache(None), [])
+
+    def test_bench_sessions(self):
+        out = StringIO()
+        call_command('bench_sessions', '--sessions', '2', '--requests', '5',
+                     stdout=out)
+        self.assertIn('signed_cookies', out.getvalue())
+        self.assertEqual(Session.objects.count(), 0)
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from blogs.models import Post
+from blogs.staticfiles import CSS_BUNDLE_NAME, minify_css, minify_svg
+
+
+class MinifyTest(TestCase):
+
+    def test_minify_css(self):
+        css = '/* note */\n.a ,\n.b > p {\n  color : red;\n}\n.c :hover { }'
+        self.assertEqual(minify_css(css), '.a,.b>p{color :red}.c :hover{}')
+
+    def test_minify_svg(self):
+        svg = ('<?xml version="1.0"?>\n<!-- made by hand -->\n'
+               '<svg id="Capa_1" viewBox="0 0 1 1">\n  <g>\n  </g>\n'
+               '  <path id="p" d="M0 0"/>\n</svg>')
+        self.assertEqual(minify_svg(svg),
+                         '<svg viewBox="0 0 1 1"><path d="M0 0"/></svg>')
+
+
+class StaticTagsTest(TestCase):
+
+    def render(self, source):
+        return Template('{% load blogs_static %}' + source).render(Context())
+
+    def test_stylesheets_without_pipeline(self):
+        html = self.render('{% stylesheets %}')
+        self.assertIn('/static/blogs/css/normalize.css', html)
+        self.assertNotIn(CSS_BUNDLE_NAME, html)
+
+    def test_svg_sprite(self):
+        html = self.render('{% svg_sprite %}')
+        self.assertIn('<symbol id="icon-edit" viewBox="0 0 490.337 490.337">',
+                      html)
+        self.assertIn('id="icon-comment-bubble"', html)
+        self.assertNotIn('<?xml', html)
+
+    def test_icon(self):
+        self.assertHTMLEqual(
+            self.render("{% icon 'edit' 'edit-icon' %}"),
+            '<svg class="edit-icon" aria-hidden="true">'
+            '<use href="#icon-edit"></use></svg>')
+
+
+class PipelineStorageTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='testuser1',
+                                        password='1X<ISRUkw+tuK')
+        Post.objects.create(subject='test_subject', content='test_content',
+                            owner=user)
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings = override_settings(
+            STATIC_ROOT=self.root,
+            STATICFILES_STORAGE='blogs.staticfiles.PipelineStorage')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_bundle_is_hashed_and_compressed(self):
+        names = os.listdir(os.path.join(self.root, 'blogs', 'css'))
+        bundles = [name for name in names
+                   if name.startswith('bundle.') and name.endswith('.css')]
+        self.assertEqual(len(bundles), 2)
+        hashed = [name for name in bundles if name != 'bundle.css'][0]
+        self.assertIn(hashed + '.gz', names)
+
+    def test_pages_link_hashed_bundle(self):
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, '/static/blogs/css/bundle.')
+        self.assertNotContains(response, 'normalize')
+
+    def test_static_report(self):
+        out = StringIO()
+        call_command('static_report', stdout=out)
+        self.assertIn('home', out.getvalue())
+        self.assertIn('post', out.getvalue())
@@ -0,0 +1,150 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from blogs import tasks
+from blogs.models import Post, Task
+from blogs.search import Search, create_table
+
+calls = []
+
+
+@tasks.task
+def record(value):
+    calls.append(value)
+
+
+@tasks.task
+def explode():
+    raise RuntimeError('boom')
+
+
+def not_a_task():
+    pass
+
+
+@override_settings(BLOGS_TASKS_EAGER=False)
+class QueueTest(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_eager_tasks_run_at_once(self):
+        with self.settings(BLOGS_TASKS_EAGER=True):
+            record.delay(1)
+        self.assertEqual(calls, [1])
+        self.assertFalse(Task.objects.exists())
+
+    def test_identical_waiting_calls_are_stored_once(self):
+        self.assertIsNotNone(tasks.store(record.task_name, [1]))
+        self.assertIsNone(tasks.store(record.task_name, [1]))
+        self.assertIsNotNone(tasks.store(record.task_name, [2]))
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_running_calls_do_not_absorb_new_ones(self):
+        tasks.store(record.task_name, [1])
+        tasks.claim('worker')
+        self.assertIsNotNone(tasks.store(record.task_name, [1]))
+
+    def test_a_task_is_claimed_by_one_worker(self):
+        tasks.store(record.task_name, [1])
+        self.assertEqual(len(tasks.claim('first')), 1)
+        self.assertEqual(tasks.claim('second'), [])
+
+    def test_expired_claims_are_taken_over(self):
+        tasks.store(record.task_name, [1])
+        tasks.claim('first')
+        Task.objects.update(locked_until=timezone.now() - timedelta(1))
+        claimed = tasks.claim('second')
+        self.assertEqual(claimed[0].locked_by, 'second')
+        self.assertEqual(claimed[0].attempts, 2)
+
+    def test_tasks_not_yet_due_are_left(self):
+        tasks.store(record.task_name, [1], countdown=60)
+        self.assertEqual(tasks.claim('worker'), [])
+
+    def test_work_runs_and_deletes_due_tasks(self):
+        tasks.store(record.task_name, [1])
+        tasks.store(record.task_name, [2])
+        self.assertEqual(tasks.work(burst=True), 2)
+        self.assertEqual(calls, [1, 2])
+        self.assertFalse(Task.objects.exists())
+
+    def test_failed_tasks_are_retried_later(self):
+        tasks.store(explode.task_name, [])
+        with self.assertLogs('blogs.tasks', 'WARNING'):
+            self.assertEqual(tasks.work(burst=True), 1)
+        task = Task.objects.get()
+        self.assertEqual(task.attempts, 1)
+        self.assertIsNone(task.locked_until)
+        self.assertIsNone(task.failed_at)
+        self.assertIn('boom', task.last_error)
+        self.assertGreater(task.run_at,
+                           timezone.now() + timedelta(seconds=1))
+
+    def test_retry_delay_doubles_up_to_a_limit(self):
+        with self.settings(BLOGS_TASKS_RETRY_DELAY=2,
+                           BLOGS_TASKS_MAX_RETRY_DELAY=10):
+            self.assertTrue(2 <= tasks.retry_delay(1) <= 2.5)
+            self.assertTrue(8 <= tasks.retry_delay(3) <= 10)
+            self.assertTrue(10 <= tasks.retry_delay(5) <= 12.5)
+
+    @override_settings(BLOGS_TASKS_MAX_ATTEMPTS=2)
+    def test_tasks_are_kept_after_the_last_attempt(self):
+        tasks.store(explode.task_name, [])
+        with self.assertLogs('blogs.tasks', 'WARNING'):
+            tasks.work(burst=True)
+            Task.objects.update(run_at=timezone.now())
+            tasks.work(burst=True)
+        task = Task.objects.get()
+        self.assertIsNotNone(task.failed_at)
+        self.assertEqual(tasks.claim('worker'), [])
+        self.assertEqual(tasks.queue_stats(),
+                         {'waiting': 0, 'running': 0, 'failed': 1})
+
+        self.assertEqual(tasks.retry_failed(), 1)
+        self.assertEqual(len(tasks.claim('worker')), 1)
+
+    def test_only_tasks_are_run(self):
+        Task.objects.create(name='blogs.tests.test_tasks.not_a_task',
+                            key='x')
+        with self.assertLogs('blogs.tasks', 'WARNING') as logs:
+            tasks.work(burst=True)
+        self.assertIn('is not a task', logs.output[0])
+
+
+@override_settings(BLOGS_TASKS_EAGER=False)
+class OnCommitTest(TransactionTestCase):
+    """Tasks are stored on commit, which test transactions never reach."""
+
+    def tearDown(self):
+        create_table()
+
+    def test_tasks_are_stored_when_the_write_commits(self):
+        with transaction.atomic():
+            record.delay(1)
+            self.assertFalse(Task.objects.exists())
+        self.assertEqual(Task.objects.get().args, '[1]')
+
+    def test_rolled_back_writes_queue_nothing(self):
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                record.delay(1)
+                raise ValueError
+        self.assertFalse(Task.objects.exists())
+
+    def test_saved_posts_are_indexed_by_a_worker(self):
+        user = User.objects.create_user(username='testuser',
+                                        password='1X<ISRUkw+tuK')
+        post = Post.objects.create(subject='queued', content='text',
+                                   owner=user)
+        self.assertEqual(list(Search('queued').get_page()), [])
+        tasks.work(burst=True)
+        self.assertEqual(len(list(Search('queued').get_page())), 1)
+
+        post.delete()
+        tasks.work(burst=True)
+        self.assertEqual(list(Search('queued').get_page()), [])
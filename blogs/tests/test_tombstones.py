@@ -0,0 +1,179 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from blogs import tasks, tombstones
+from blogs.models import Post, Comment, Task, UserTombstone
+from blogs.search import Search, create_table, post_rowid
+from blogs.tests.test_cache import LOCMEM_CACHES
+from blogs.views import live_comments
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TombstoneTest(TestCase):
+    password = '1X<ISRUkw+tuK'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password=cls.password)
+        cls.reader = User.objects.create_user('reader', password=cls.password)
+        cls.hot_post = Post.objects.create(subject='hot_subject',
+                                           content='hot_content',
+                                           owner=cls.author)
+        cls.other_post = Post.objects.create(subject='other_subject',
+                                             content='other_content',
+                                             owner=cls.reader)
+        for i in range(5):
+            Comment.objects.create(content='hot_comment', owner=cls.reader,
+                                   comment_post=cls.hot_post)
+        Comment.objects.create(content='author_comment', owner=cls.author,
+                               comment_post=cls.other_post)
+        Post.objects.filter(id=cls.hot_post.id).update(comment_count=5)
+        Post.objects.filter(id=cls.other_post.id).update(comment_count=1)
+
+    def delete_hot_post(self):
+        self.client.login(username='author', password=self.password)
+        response = self.client.post(reverse('delete_post',
+                                            kwargs={'pk': self.hot_post.id}))
+        self.assertRedirects(response, reverse('index'))
+        self.client.logout()
+
+    def test_deleted_post_is_hidden_at_once(self):
+        self.client.get(reverse('index'))
+        self.delete_hot_post()
+        self.assertNotContains(self.client.get(reverse('index')),
+                               'hot_subject')
+        self.assertEqual(self.client.get(
+            reverse('post', args=[self.hot_post.id])).status_code, 404)
+        self.assertEqual(len(Search('hot_comment').get_page()), 0)
+        self.assertTrue(Post.all_objects.filter(id=self.hot_post.id).exists())
+        self.assertEqual(Comment.all_objects.filter(
+            comment_post=self.hot_post).count(), 5)
+
+    def test_hidden_matches_leave_no_gaps_in_search_pages(self):
+        self.delete_hot_post()
+        page = Search('hot_comment', per_page=2).get_page()
+        self.assertEqual(len(page), 0)
+        self.assertFalse(page.has_next)
+
+        tombstones.tombstone_user(self.author)
+        page = Search('author_comment', per_page=1).get_page()
+        self.assertEqual(len(page), 0)
+        self.assertFalse(page.has_next)
+
+    def test_comments_of_deleted_post_cannot_be_changed(self):
+        self.delete_hot_post()
+        comment = Comment.objects.filter(comment_post=self.hot_post).first()
+        self.assertFalse(live_comments().filter(id=comment.id).exists())
+        self.client.login(username='reader', password=self.password)
+        for url in [reverse('edit_comment', args=[self.hot_post.id,
+                                                  comment.id]),
+                    reverse('delete_comment', kwargs={
+                        'post_id': self.hot_post.id, 'pk': comment.id})]:
+            self.assertEqual(self.client.get(url).status_code, 404)
+            self.assertEqual(self.client.post(
+                url, {'content': 'changed'}).status_code, 404)
+        comment.refresh_from_db()
+        self.assertEqual(comment.content, 'hot_comment')
+
+    def test_reap_post_in_batches(self):
+        self.delete_hot_post()
+        out = StringIO()
+        self.assertEqual(tombstones.reap(batch_size=2, pause=0, stdout=out),
+                         6)
+        self.assertIn('Deleted 4 comments of post %d' % self.hot_post.id,
+                      out.getvalue())
+        self.assertIn('Deleted post %d' % self.hot_post.id, out.getvalue())
+        self.assertFalse(Post.all_objects.filter(
+            id=self.hot_post.id).exists())
+        self.assertFalse(Comment.all_objects.filter(
+            comment_post=self.hot_post.id).exists())
+        self.assertEqual(tombstones.reap(), 0)
+
+    @override_settings(BLOGS_SOFT_DELETE=False)
+    def test_hard_delete(self):
+        self.delete_hot_post()
+        self.assertFalse(Post.all_objects.filter(
+            id=self.hot_post.id).exists())
+        self.assertFalse(Comment.all_objects.filter(
+            comment_post=self.hot_post.id).exists())
+
+    def test_tombstone_user(self):
+        other_url = reverse('post', args=[self.other_post.id])
+        self.assertContains(self.client.get(other_url), 'author_comment')
+        tombstones.tombstone_user(self.author)
+
+        self.assertNotContains(self.client.get(other_url), 'author_comment')
+        self.assertNotContains(self.client.get(reverse('index')),
+                               'hot_subject')
+        self.assertEqual(len(Search('author_comment').get_page()), 0)
+        self.assertFalse(self.client.login(username='author',
+                                           password=self.password))
+
+        out = StringIO()
+        call_command('reap_tombstones', '--pause', '0', stdout=out)
+        self.assertIn('Deleted user author', out.getvalue())
+        self.assertIn('Deleted 9 rows.', out.getvalue())
+        self.assertFalse(User.objects.filter(username='author').exists())
+        self.assertFalse(UserTombstone.objects.exists())
+        self.assertEqual(Post.objects.get().comment_count, 0)
+
+    def test_admin_action(self):
+        User.objects.create_superuser('admin', 'admin@example.com',
+                                      self.password)
+        self.client.login(username='admin', password=self.password)
+        self.client.post(reverse('admin:auth_user_changelist'), {
+            'action': 'delete_in_background',
+            '_selected_action': [self.author.id]})
+        self.assertTrue(UserTombstone.objects.filter(
+            user=self.author).exists())
+        self.assertFalse(Post.objects.filter(owner=self.author).exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES, BLOGS_TASKS_EAGER=False)
+class ReapTasksTest(TransactionTestCase):
+    """Tasks are stored on commit, which test transactions never reach."""
+
+    def setUp(self):
+        export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_dir)
+        settings_override = self.settings(BLOGS_STATIC_EXPORT_DIR=export_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def tearDown(self):
+        create_table()
+
+    def test_reaping_queues_one_export_per_post(self):
+        author = User.objects.create_user('author')
+        reader = User.objects.create_user('reader')
+        hot_post = Post.objects.create(subject='hot_subject',
+                                       content='hot_content', owner=author)
+        other_post = Post.objects.create(subject='other_subject',
+                                         content='other_content',
+                                         owner=author)
+        for i in range(20):
+            Comment.objects.create(content='hot_comment', owner=reader,
+                                   comment_post=hot_post)
+            Comment.objects.create(content='reader_comment', owner=reader,
+                                   comment_post=other_post)
+        tasks.work(burst=True)
+        tombstones.tombstone_post(hot_post)
+        tombstones.tombstone_user(reader)
+        Task.objects.all().delete()
+
+        # 40 comments, a post, and the user with their tombstone.
+        self.assertEqual(tombstones.reap(batch_size=5, pause=0), 43)
+        self.assertEqual(sorted(Task.objects.values_list('args', flat=True)),
+                         ['[%d]' % hot_post.id, '[%d]' % other_post.id])
+        # The search rows went with the reaped rows, without a task.
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT rowid FROM blogs_search')
+            self.assertEqual(cursor.fetchall(),
+                             [(post_rowid(other_post.id),)])
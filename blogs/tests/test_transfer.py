@@ -0,0 +1,142 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from blogs import transfer
+from blogs.models import Post, Comment
+from blogs.search import Search
+
+
+class TransferTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('testuser',
+                                            password='1X<ISRUkw+tuK')
+        cls.post = Post.objects.create(subject='test_subject',
+                                       content='天气很好', owner=cls.user)
+        Comment.objects.create(content='test_comment', owner=cls.user,
+                               comment_post=cls.post)
+        Post.objects.filter(id=cls.post.id).update(
+            create_date=datetime.date(2019, 5, 1), comment_count=1)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def rows(self):
+        return [list(cls.objects.order_by('id').values_list(*columns))
+                for cls, columns in transfer.MODELS.values()]
+
+    def round_trip(self, path, format):
+        before = self.rows()
+        self.assertEqual(transfer.export(path, format), 3)
+        User.objects.all().delete()
+        self.assertEqual(
+            transfer.import_records(transfer.read_records(path, format)), 3)
+        self.assertEqual(self.rows(), before)
+        self.assertEqual(Post.objects.get().excerpt, '<p>天气很好</p>')
+        self.assertEqual(len(Search('天气').get_page()), 1)
+
+    def test_jsonl_round_trip(self):
+        self.round_trip(os.path.join(self.directory, 'blog.jsonl'), 'jsonl')
+
+    def test_csv_round_trip(self):
+        self.round_trip(self.directory, 'csv')
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         ['comments.csv', 'posts.csv', 'users.csv'])
+
+    def test_export_resumes(self):
+        path = os.path.join(self.directory, 'blog.jsonl')
+        checkpoint = os.path.join(self.directory, 'checkpoint')
+        with open(path, 'w') as f:
+            f.write(json.dumps({'model': 'user', 'id': self.user.id}) + '\n')
+        transfer.Checkpoint(checkpoint).save(
+            {'model': 'user', 'last_id': self.user.id})
+        self.assertEqual(transfer.export(path, checkpoint=checkpoint), 2)
+        with open(path) as f:
+            models = [json.loads(line)['model'] for line in f]
+        self.assertEqual(models, ['user', 'post', 'comment'])
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_import_resumes(self):
+        path = os.path.join(self.directory, 'blog.jsonl')
+        checkpoint = os.path.join(self.directory, 'checkpoint')
+        transfer.export(path)
+        Comment.objects.all().delete()
+        transfer.Checkpoint(checkpoint).save({'records': 2})
+        self.assertEqual(transfer.import_records(
+            transfer.read_records(path, 'jsonl'), checkpoint=checkpoint), 1)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_ignore_conflicts(self):
+        path = os.path.join(self.directory, 'blog.jsonl')
+        transfer.export(path)
+        Comment.objects.all().delete()
+        transfer.import_records(transfer.read_records(path, 'jsonl'),
+                                ignore_conflicts=True)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_generate(self):
+        records = list(transfer.generate(users=2, posts=4,
+                                         comments_per_post=3, days=10))
+        self.assertEqual(records, list(transfer.generate(
+            users=2, posts=4, comments_per_post=3, days=10)))
+        self.assertEqual([record['model'] for record in records],
+                         ['user'] * 2 + ['post'] * 4 + ['comment'] * 12)
+        self.assertEqual(records[0]['id'], self.user.id + 1)
+        for post in records[2:6]:
+            comments = [record for record in records[6:]
+                        if record['comment_post_id'] == post['id']]
+            self.assertEqual(post['comment_count'], len(comments))
+            for comment in comments:
+                self.assertGreaterEqual(comment['create_date'],
+                                        post['create_date'])
+
+    def test_generated_import_resumes(self):
+        checkpoint = os.path.join(self.directory, 'checkpoint')
+        arguments = ['import_data', '--generate', '--users', '2', '--posts',
+                     '3', '--comments-per-post', '2', '--batch-size', '2',
+                     '--checkpoint', checkpoint]
+        insert_batch = transfer.insert_batch
+        calls = []
+
+        def interrupted(batch):
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+            calls.append(batch)
+            return insert_batch(batch)
+
+        with mock.patch('blogs.transfer.insert_batch', interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command(*arguments, stdout=StringIO())
+        # The users and the three posts, in batches of 2, 2 and 1.
+        self.assertEqual(transfer.Checkpoint(checkpoint).load()['records'],
+                         5)
+
+        call_command(*arguments, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 4)
+        self.assertEqual(Comment.objects.count(), 7)
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_commands(self):
+        out = StringIO()
+        call_command('import_data', '--generate', '--users', '2',
+                     '--posts', '3', '--comments-per-post', '2',
+                     '--batch-size', '2', stdout=out)
+        self.assertIn('Imported 11 records.', out.getvalue())
+        self.assertEqual(Comment.objects.count(), 7)
+
+        path = os.path.join(self.directory, 'blog.jsonl')
+        out = StringIO()
+        call_command('export_data', path, stdout=out)
+        self.assertIn('Exported 14 records.', out.getvalue())
@@ -1,8 +1,13 @@
+from unittest import mock
+
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.db.models import F
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
+from blogs.forms import PostForm
 from blogs.models import Post, Comment
+from blogs.tests.utils import QueryCountMixin
 
 
 class IndexViewTest(TestCase):
@@ -21,6 +26,96 @@ class IndexViewTest(TestCase):
         self.assertTemplateUsed(response, 'blogs/index.html')
 
 
+class IndexQueryCountTest(QueryCountMixin, TestCase):
+
+    def test_authors_are_not_fetched_per_post(self):
+        def add_posts():
+            for _ in range(3):
+                test_user = User.objects.create(
+                    username='testuser%d' % User.objects.count())
+                Post.objects.create(subject='test_subject',
+                                    content='test_content', owner=test_user)
+
+        self.assertQueryCountFlat(reverse('index'), add_posts)
+
+
+@override_settings(BLOGS_PAGE_SIZE=2)
+class IndexPaginationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user = User.objects.create_user(username='testuser',
+                                             password='1X<ISRUkw+tuK')
+        for i in range(5):
+            Post.objects.create(subject='test_subject%d' % i,
+                                content='test_content', owner=test_user)
+
+    def test_first_page_shows_newest_posts(self):
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.status_code, 200)
+        posts = [post.subject for post in response.context['posts']]
+        self.assertEqual(posts, ['test_subject4', 'test_subject3'])
+        self.assertTrue(response.context['page'].has_next)
+
+    def test_follow_older_posts_links(self):
+        subjects = []
+        cursor = None
+        for _ in range(3):
+            data = {'before': cursor} if cursor else {}
+            response = self.client.get(reverse('index'), data)
+            page = response.context['page']
+            subjects += [post.subject for post in page]
+            cursor = page.next_cursor
+        self.assertIsNone(cursor)
+        self.assertEqual(subjects, ['test_subject%d' % i
+                                    for i in reversed(range(5))])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('index'), {'before': 'nonsense'})
+        self.assertEqual(response.status_code, 404)
+
+
+class IndexExcerptTest(TestCase):
+
+    def test_feed_renders_excerpt_not_full_content(self):
+        test_user = User.objects.create_user(username='testuser',
+                                             password='1X<ISRUkw+tuK')
+        Post.objects.create(subject='test_subject',
+                            content='start ' + 'x' * 1000 + ' end',
+                            owner=test_user)
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, '<p>start ')
+        self.assertNotContains(response, ' end')
+
+
+class IndexActivityTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user = User.objects.create_user(username='testuser',
+                                             password='1X<ISRUkw+tuK')
+        cls.test_post1 = Post.objects.create(subject='test_subject1',
+                                             content='test_content',
+                                             owner=test_user)
+        cls.test_post2 = Post.objects.create(subject='test_subject2',
+                                             content='test_content',
+                                             owner=test_user)
+
+    def test_sort_by_recent_activity(self):
+        self.client.login(username='testuser', password='1X<ISRUkw+tuK')
+        self.client.post(
+            reverse('new_comment', kwargs={'post_id': self.test_post1.id}),
+            {'content': 'test_comment'})
+        response = self.client.get(reverse('index'), {'sort': 'active'})
+        posts = [post.subject for post in response.context['posts']]
+        self.assertEqual(posts, ['test_subject1', 'test_subject2'])
+        self.assertContains(response, '1 条评论')
+
+    def test_unknown_sort(self):
+        response = self.client.get(reverse('index'), {'sort': 'nonsense'})
+        self.assertEqual(response.status_code, 404)
+
+
 class SignupViewTest(TestCase):
 
     def test_view_url_exists_at_desired_location(self):
@@ -73,6 +168,73 @@ class PostViewTest(TestCase):
         self.assertTemplateUsed(response, 'blogs/post.html')
 
 
+@override_settings(BLOGS_COMMENT_PAGE_SIZE=2)
+class PostCommentPaginationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        test_user = User.objects.create_user(username='testuser',
+                                             password='1X<ISRUkw+tuK')
+        cls.test_post = Post.objects.create(subject='test_subject',
+                                            content='test_content',
+                                            owner=test_user)
+        for i in range(5):
+            Comment.objects.create(content='test_comment%d' % i,
+                                   owner=test_user, comment_post=cls.test_post)
+
+    def test_first_page_is_rendered_with_post(self):
+        response = self.client.get(
+            reverse('post', kwargs={'post_id': self.test_post.id}))
+        comments = [c.content for c in response.context['post_comments']]
+        self.assertEqual(comments, ['test_comment4', 'test_comment3'])
+        self.assertContains(response, 'class="comments-more"')
+
+    def test_follow_comments_json(self):
+        response = self.client.get(
+            reverse('post', kwargs={'post_id': self.test_post.id}))
+        url = '%s?before=%s' % (
+            reverse('comments', kwargs={'post_id': self.test_post.id}),
+            response.context['comment_page'].next_cursor)
+        html = ''
+        while url:
+            data = self.client.get(url).json()
+            html += data['html']
+            url = data['next']
+        self.assertIn('test_comment2', html)
+        self.assertIn('test_comment0', html)
+        self.assertNotIn('test_comment3', html)
+
+    def test_comments_of_missing_post(self):
+        response = self.client.get(
+            reverse('comments', kwargs={'post_id': 99}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_comments_invalid_cursor(self):
+        response = self.client.get(
+            reverse('comments', kwargs={'post_id': self.test_post.id}),
+            {'before': 'nonsense'})
+        self.assertEqual(response.status_code, 404)
+
+
+class PostQueryCountTest(QueryCountMixin, TestCase):
+
+    def test_authors_are_not_fetched_per_comment(self):
+        test_post = Post.objects.create(
+            subject='test_subject', content='test_content',
+            owner=User.objects.create(username='testuser'))
+
+        def add_comments():
+            for _ in range(3):
+                test_user = User.objects.create(
+                    username='testuser%d' % User.objects.count())
+                Comment.objects.create(content='test_content',
+                                       owner=test_user,
+                                       comment_post=test_post)
+
+        self.assertQueryCountFlat(
+            reverse('post', kwargs={'post_id': test_post.id}), add_comments)
+
+
 class NewPostViewTest(TestCase):
 
     @classmethod
@@ -173,6 +335,24 @@ class EditPostViewTest(TestCase):
         self.assertEqual(response.status_code, 302)
         self.assertRedirects(response, '/post/1/')
 
+    def test_edit_keeps_comments_added_meanwhile(self):
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        clean = PostForm.clean
+
+        def comment_then_clean(form):
+            # A comment lands after the view loaded the post.
+            Post.objects.filter(id=1).update(
+                comment_count=F('comment_count') + 1)
+            return clean(form)
+
+        with mock.patch.object(PostForm, 'clean', comment_then_clean):
+            self.client.post(reverse('edit_post', kwargs={'post_id': 1}),
+                             {'subject': 'test_edit_subject',
+                              'content': 'test_edit_content'})
+        post = Post.objects.get(id=1)
+        self.assertEqual(post.subject, 'test_edit_subject')
+        self.assertEqual(post.comment_count, 1)
+
 
 class DeletePostViewTest(TestCase):
 
@@ -285,6 +465,12 @@ class NewCommentViewTest(TestCase):
         self.assertEqual(response.status_code, 302)
         self.assertRedirects(response, '/post/1/')
 
+    def test_comment_count_is_incremented(self):
+        self.client.login(username='testuser', password='1X<ISRUkw+tuK')
+        self.client.post(reverse('new_comment', kwargs={'post_id': 1}),
+                         {'content': 'test_new_content'})
+        self.assertEqual(Post.objects.get(id=1).comment_count, 1)
+
 
 class EditCommentViewTest(TestCase):
 
@@ -455,3 +641,10 @@ class DeleteCommentViewTest(TestCase):
             reverse('delete_comment', kwargs={'post_id': 1, 'pk': 1}))
         self.assertEqual(response.status_code, 302)
         self.assertRedirects(response, '/post/1/')
+
+    def test_comment_count_is_decremented(self):
+        Post.objects.filter(id=1).update(comment_count=1)
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        self.client.post(
+            reverse('delete_comment', kwargs={'post_id': 1, 'pk': 1}))
+        self.assertEqual(Post.objects.get(id=1).comment_count, 0)
@@ -0,0 +1,28 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountMixin:
+    """Assertions about how many queries a page costs."""
+
+    def count_queries(self, url):
+        """Return the number of queries a GET of ``url`` runs."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertQueryCountFlat(self, url, add_rows, batches=3):
+        """Fail if the queries for ``url`` grow as rows are added.
+
+        ``add_rows`` is called before each measurement and should add
+        rows that the page renders; any per-row query (an N+1) shows up
+        as a query count that differs between measurements.
+        """
+        counts = []
+        for _ in range(batches):
+            add_rows()
+            counts.append(self.count_queries(url))
+        self.assertEqual(len(set(counts)), 1,
+                         'Query count of %s grows with rows rendered: %s'
+                         % (url, counts))
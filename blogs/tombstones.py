@@ -0,0 +1,157 @@
+"""Deleting posts and users in the background.
+
+Deleting a post cascades to all of its comments, and deleting a user to
+all of their posts and comments. Django collects every one of those rows
+and deletes them in a single transaction, which on a hot post or a
+prolific user holds SQLite's write lock for seconds.
+
+With ``BLOGS_SOFT_DELETE`` on, ``PostDeleteView`` only sets the post's
+``deleted_at`` instead, and ``tombstone_user`` does the same for a user's
+posts and comments in a few UPDATEs. The default managers of ``Post`` and
+``Comment`` leave tombstoned rows out, so they disappear from every page
+at once; ``all_objects`` still sees them. Their search rows are removed
+at the same time, so that hidden matches do not take up places on a page
+of results.
+
+``reap`` then deletes the tombstoned rows through ``delete_in_batches``:
+first the comments, then each post's comments and the post, and finally
+the users, whose rows by then cascade to nothing. Comment counters of the
+posts that lose a comment this way are recounted as it goes; until then
+they still include the hidden comments. The reaper removes the search rows
+of each batch in one statement and queues one export per post, rather than
+letting the delete of every row queue tasks of its own.
+"""
+import time
+
+from django.db import transaction
+from django.utils import timezone
+
+from blogs import export, search
+from blogs.batches import delete_in_batches
+from blogs.cache import purge_feed_pages, purge_post_pages
+from blogs.models import Post, Comment, UserTombstone
+from blogs.signals import bulk_deletes
+
+
+def unindex(post_ids, comment_ids):
+    """Remove the search rows of posts, with all their comments, and of
+    other comments."""
+    search.remove_posts(post_ids)
+    search.remove_comments(
+        list(Comment.all_objects.filter(comment_post_id__in=post_ids)
+             .values_list('id', flat=True)) + list(comment_ids))
+
+
+def tombstone_post(post):
+    """Hide a post and its comments until the reaper deletes them."""
+    with transaction.atomic():
+        Post.objects.filter(id=post.id).update(deleted_at=timezone.now())
+        unindex([post.id], [])
+    if export.export_dir():
+        export.enqueue.delay(post.id)
+
+
+def tombstone_user(user):
+    """Deactivate a user and hide their posts and comments until the
+    reaper deletes them all."""
+    now = timezone.now()
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        UserTombstone.objects.update_or_create(user=user,
+                                               defaults={'deleted_at': now})
+        comments = Comment.objects.filter(owner=user)
+        commented = set(comments.values_list('comment_post_id', flat=True))
+        unindex(list(Post.objects.filter(owner=user)
+                     .values_list('id', flat=True)),
+                list(comments.values_list('id', flat=True)))
+        Post.objects.filter(owner=user).update(deleted_at=now)
+        Comment.objects.filter(owner=user).update(deleted_at=now)
+    for post_id in commented:
+        purge_post_pages(post_id)
+    purge_feed_pages()
+
+
+def recount_comments(post_ids):
+    """Set the comment counters of ``post_ids`` from their live comments."""
+    for post_id in post_ids:
+        Post.objects.filter(id=post_id).update(
+            comment_count=Comment.objects.filter(
+                comment_post_id=post_id).count())
+
+
+def reap_comments(touched, batch_size=1000, pause=0.1, stdout=None):
+    """Delete tombstoned comments, add the ids of their posts to the set
+    ``touched``, and return how many were deleted."""
+    comments = Comment.all_objects.filter(deleted_at__isnull=False) \
+        .order_by('id')
+    deleted = 0
+    while True:
+        batch = list(comments.values_list('id', 'comment_post_id')
+                     [:batch_size])
+        if not batch:
+            break
+        comment_ids = [comment_id for comment_id, post_id in batch]
+        post_ids = {post_id for comment_id, post_id in batch}
+        deleted += Comment.all_objects.filter(id__in=comment_ids).delete()[0]
+        search.remove_comments(comment_ids)
+        recount_comments(post_ids)
+        touched |= post_ids
+        if stdout is not None:
+            stdout.write('Deleted %d tombstoned comments' % deleted)
+        if len(batch) < batch_size:
+            break
+        time.sleep(pause)
+    return deleted
+
+
+def reap_posts(touched, batch_size=1000, pause=0.1, stdout=None):
+    """Delete tombstoned posts and their comments, add their ids to the set
+    ``touched``, and return how many rows were deleted."""
+    deleted = 0
+    post_ids = list(Post.all_objects.filter(deleted_at__isnull=False)
+                    .order_by('id').values_list('id', flat=True))
+    for post_id in post_ids:
+        deleted += delete_in_batches(
+            Comment.all_objects.filter(comment_post_id=post_id)
+            .order_by('id'), batch_size, pause, stdout,
+            label='comments of post %d' % post_id,
+            on_batch=search.remove_comments)
+        deleted += Post.all_objects.filter(id=post_id).delete()[0]
+        search.remove_post(post_id)
+        touched.add(post_id)
+        if stdout is not None:
+            stdout.write('Deleted post %d' % post_id)
+    return deleted
+
+
+def reap_users(stdout=None):
+    """Delete the users whose posts and comments are all reaped, and
+    return how many rows were deleted."""
+    deleted = 0
+    for tombstone in UserTombstone.objects.select_related('user'):
+        # Anything posted while the tombstone was being set is reaped on
+        # the next run.
+        late = Post.objects.filter(owner=tombstone.user_id).update(
+            deleted_at=tombstone.deleted_at)
+        late += Comment.objects.filter(owner=tombstone.user_id).update(
+            deleted_at=tombstone.deleted_at)
+        if late:
+            continue
+        deleted += tombstone.user.delete()[0]
+        if stdout is not None:
+            stdout.write('Deleted user %s' % tombstone.user.username)
+    return deleted
+
+
+def reap(batch_size=1000, pause=0.1, stdout=None):
+    """Delete every tombstoned comment, post and user, a batch at a time,
+    and return how many rows were deleted."""
+    touched = set()
+    with bulk_deletes():
+        deleted = reap_comments(touched, batch_size, pause, stdout)
+        deleted += reap_posts(touched, batch_size, pause, stdout)
+    if export.export_dir():
+        for post_id in sorted(touched):
+            export.enqueue.delay(post_id)
+    return deleted + reap_users(stdout)
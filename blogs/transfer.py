@@ -0,0 +1,411 @@
+"""Streaming users, posts and comments in and out, in bulk.
+
+Records are dictionaries with a ``model`` key (user, post or comment) and
+the model's columns, ids included, so foreign keys survive the round trip.
+They come in that order: users, then posts, then comments. JSON Lines puts
+them all in one file; CSV uses one file per model in a directory.
+
+Everything is streamed a batch at a time: ``export`` reads rows by
+keyset, ``import_records`` inserts with ``bulk_create``, so memory use
+does not grow with the data. Both record their progress in a checkpoint
+file after each batch, so an interrupted run can resume where it stopped.
+Import can spread the batches of each model over worker processes; this
+only pays off with a database that takes concurrent writes well.
+
+``generate`` produces a synthetic dataset from a seeded random generator
+in the same record format, for benchmarks. The same seed on the same
+database gives the same rows; dates are relative to the current day.
+
+``bulk_create`` sends no signals, so after an import the search index is
+rebuilt and the feed pages are purged. Imported rows keep their dates and
+counters as they were exported.
+"""
+import csv
+import json
+import multiprocessing
+import os
+import random
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from itertools import groupby, islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from blogs import search
+from blogs.cache import purge_feed_pages
+from blogs.models import Post, Comment
+
+SEED_PREFIX = 'seed-'
+SEED_PASSWORD = 'seed-Password-1'
+
+# The columns of each model, in the order models are streamed.
+MODELS = {
+    'user': (User, ['id', 'username', 'password', 'email', 'first_name',
+                    'last_name', 'is_active', 'is_staff', 'is_superuser',
+                    'date_joined', 'last_login']),
+    'post': (Post, ['id', 'subject', 'content', 'create_date', 'last_date',
+                    'owner_id', 'comment_count', 'last_activity',
+                    'deleted_at']),
+    'comment': (Comment, ['id', 'content', 'create_date', 'last_date',
+                          'owner_id', 'comment_post_id', 'deleted_at']),
+}
+
+FORMATS = ['jsonl', 'csv']
+
+WORDS = (
+    'django sqlite cache query index page post comment feed latency '
+    'worker thread python template render session login token keyset '
+    '博客 评论 文章 缓存 性能 数据库 索引 查询 页面 用户'
+).split()
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for i in range(words))
+
+
+def paragraphs(rng, count, words=40):
+    return '\n\n'.join(sentence(rng, words) for i in range(count))
+
+
+class Checkpoint:
+    """Progress of a run, kept in a JSON file replaced after each batch."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """Return the saved progress, or None if there is none."""
+        if self.path is None or not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            return json.load(f)
+
+    def save(self, progress):
+        if self.path is None:
+            return
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(progress, f)
+        os.replace(self.path + '.tmp', self.path)
+
+    def clear(self):
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _json_default(value):
+    # Unlike DjangoJSONEncoder, keep the microseconds.
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError('%r is not JSON serializable.' % (value,))
+
+
+def csv_path(directory, model):
+    return os.path.join(directory, '%ss.csv' % model)
+
+
+def read_records(path, format):
+    """Yield the records stored at ``path``, a file or '-' for standard
+    input in JSON Lines, a directory in CSV."""
+    if format == 'jsonl':
+        f = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        try:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            if f is not sys.stdin:
+                f.close()
+        return
+    for model in MODELS:
+        if not os.path.exists(csv_path(path, model)):
+            continue
+        with open(csv_path(path, model), newline='',
+                  encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                row['model'] = model
+                yield row
+
+
+class RecordWriter:
+    """Write records to a file or '-' in JSON Lines, or to a directory in
+    CSV. Files are appended to when resuming."""
+
+    def __init__(self, path, format, append=False):
+        self.path = path
+        self.format = format
+        self.append = append
+        self.files = {}
+        if format == 'csv':
+            os.makedirs(path, exist_ok=True)
+        elif path == '-':
+            self.files[None] = sys.stdout
+        else:
+            self.files[None] = open(path, 'a' if append else 'w',
+                                    encoding='utf-8')
+
+    def write(self, model, rows):
+        if self.format == 'jsonl':
+            f = self.files[None]
+            for row in rows:
+                f.write(json.dumps(dict(row, model=model),
+                                   default=_json_default,
+                                   ensure_ascii=False) + '\n')
+            f.flush()
+            return
+        if model not in self.files:
+            path = csv_path(self.path, model)
+            new = not (self.append and os.path.exists(path))
+            f = open(path, 'w' if new else 'a', newline='', encoding='utf-8')
+            writer = csv.DictWriter(f, MODELS[model][1])
+            if new:
+                writer.writeheader()
+            self.files[model] = (f, writer)
+        f, writer = self.files[model]
+        writer.writerows(rows)
+        f.flush()
+
+    def close(self):
+        for f in self.files.values():
+            if isinstance(f, tuple):
+                f = f[0]
+            if f is not sys.stdout:
+                f.close()
+
+
+def export(path, format='jsonl', batch_size=1000, checkpoint=None,
+           stdout=None):
+    """Write every user, post and comment to ``path``, and return how many
+    records were written. With a checkpoint from an earlier run, continue
+    after the last record it wrote."""
+    checkpoint = Checkpoint(checkpoint)
+    progress = checkpoint.load()
+    models = list(MODELS)
+    start, last_id = 0, 0
+    if progress is not None:
+        start, last_id = models.index(progress['model']), progress['last_id']
+    writer = RecordWriter(path, format, append=progress is not None)
+    written = 0
+    try:
+        for model in models[start:]:
+            cls, columns = MODELS[model]
+            # Tombstones too, for the reaper of the importing site.
+            rows = cls._base_manager.order_by('id').values(*columns)
+            while True:
+                batch = list(rows.filter(id__gt=last_id)[:batch_size])
+                if not batch:
+                    break
+                writer.write(model, batch)
+                last_id = batch[-1]['id']
+                written += len(batch)
+                checkpoint.save({'model': model, 'last_id': last_id})
+                if stdout is not None:
+                    stdout.write('Exported %d records' % written)
+            last_id = 0
+    finally:
+        writer.close()
+    checkpoint.clear()
+    return written
+
+
+@contextmanager
+def keeping_dates():
+    """Let rows keep their own dates, which auto_now and auto_now_add
+    fields would otherwise overwrite on insert."""
+    fields = [field for cls in [Post, Comment]
+              for field in cls._meta.concrete_fields
+              if getattr(field, 'auto_now', False) or
+              getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+def build_object(model, record):
+    """Return an unsaved instance of ``model`` made from ``record``."""
+    cls, columns = MODELS[model]
+    values = {}
+    for column in columns:
+        value = record.get(column)
+        field = cls._meta.get_field(column)
+        if value == '' and field.null:
+            value = None
+        if value is not None:
+            value = field.to_python(value)
+        if value is not None or field.null:
+            values[column] = value
+    obj = cls(**values)
+    if cls is Post:
+        obj.excerpt = obj.render_excerpt()
+    return obj
+
+
+def insert_batch(batch):
+    """Insert one batch of records of a model, and return how many."""
+    model, records, ignore_conflicts = batch
+    objects = [build_object(model, record) for record in records]
+    with transaction.atomic():
+        MODELS[model][0]._base_manager.bulk_create(
+            objects, ignore_conflicts=ignore_conflicts)
+    return len(objects)
+
+
+def batches(records, batch_size, ignore_conflicts):
+    """Group ``records`` into batches that each hold a single model."""
+    for model, group in groupby(records, key=lambda record: record['model']):
+        if model not in MODELS:
+            raise ValueError('Unknown model %r.' % model)
+        while True:
+            chunk = list(islice(group, batch_size))
+            if not chunk:
+                break
+            yield model, chunk, ignore_conflicts
+
+
+def _close_connections():
+    connections.close_all()
+
+
+def import_records(records, batch_size=1000, workers=1, checkpoint=None,
+                   ignore_conflicts=False, reindex=True, stdout=None,
+                   state=None):
+    """Insert ``records`` in batches, and return how many were inserted.
+
+    With a checkpoint from an earlier run, the records it already saw are
+    skipped. ``state``, a JSON-serializable dict, is saved with the
+    progress, for whatever produced ``records`` to resume from. With several ``workers``, the batches of each model are
+    inserted by that many processes; a model starts once the one before
+    it is complete.
+    """
+    checkpoint = Checkpoint(checkpoint)
+    done = (checkpoint.load() or {}).get('records', 0)
+    records = islice(records, done, None)
+    pool = None
+    inserted = 0
+    with keeping_dates():
+        if workers > 1:
+            # Children must not share the parent's database connections.
+            connections.close_all()
+            pool = multiprocessing.get_context('fork').Pool(
+                workers, initializer=_close_connections)
+        try:
+            for model, model_batches in groupby(
+                    batches(records, batch_size, ignore_conflicts),
+                    key=lambda batch: batch[0]):
+                if pool is not None:
+                    counts = pool.imap(insert_batch, model_batches)
+                else:
+                    counts = map(insert_batch, model_batches)
+                for count in counts:
+                    inserted += count
+                    done += count
+                    checkpoint.save(dict(state or {}, records=done))
+                    if stdout is not None:
+                        stdout.write('Imported %d records' % done)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+    reset_sequences()
+    if reindex:
+        search.rebuild(batch_size=batch_size)
+    purge_feed_pages()
+    checkpoint.clear()
+    return inserted
+
+
+def reset_sequences():
+    """Move id sequences past the imported ids, on databases that have
+    them."""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [cls for cls, columns in MODELS.values()])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def first_free_ids():
+    """Return the id after the last row of each model."""
+    return {model: (cls._base_manager.order_by('-id').values_list(
+        'id', flat=True).first() or 0) + 1
+        for model, (cls, columns) in MODELS.items()}
+
+
+def generate(users=50, posts=500, comments_per_post=10, hot_posts=0.01,
+             hot_share=0.5, days=365, random_seed=0, first_ids=None):
+    """Yield the records of a synthetic dataset with ids from
+    ``first_ids``, by default after the existing rows.
+
+    A resumed import must pass the ``first_ids`` of the interrupted run,
+    since the rows that run inserted move the default.
+
+    ``hot_share`` of the comments go to the first ``hot_posts`` fraction
+    of the posts; the rest are spread evenly over all posts. Only the
+    counters of the posts are held in memory.
+    """
+    if not users:
+        posts = 0
+    first_ids = first_ids or first_free_ids()
+    # One hash, with a fixed salt, for every user.
+    password = make_password(SEED_PASSWORD, 'blogsseed%d' % random_seed)
+    today = timezone.localdate()
+    midnight = timezone.make_aware(datetime.combine(today, time.min))
+    user_ids = range(first_ids['user'], first_ids['user'] + users)
+    post_ids = range(first_ids['post'], first_ids['post'] + posts)
+    hot = post_ids[:max(1, round(posts * hot_posts))]
+    comments = posts * comments_per_post
+
+    for user_id in user_ids:
+        yield {'model': 'user', 'id': user_id,
+               'username': '%s%06d' % (SEED_PREFIX, user_id),
+               'password': password, 'date_joined': midnight}
+
+    rng = random.Random(random_seed)
+    post_days = [rng.randrange(days) for post_id in post_ids]
+
+    def comment_targets():
+        # Drawn twice from the same seed: once for the counters, once for
+        # the comments themselves.
+        targets = random.Random(random_seed + 1)
+        for i in range(comments):
+            post_id = targets.choice(
+                hot if targets.random() < hot_share else post_ids)
+            offset = post_id - first_ids['post']
+            yield post_id, targets.randint(0, post_days[offset])
+
+    counts = [0] * posts
+    latest = list(post_days)
+    for post_id, age in comment_targets():
+        offset = post_id - first_ids['post']
+        counts[offset] += 1
+        latest[offset] = min(latest[offset], age)
+
+    for offset, post_id in enumerate(post_ids):
+        date = today - timedelta(days=post_days[offset])
+        yield {'model': 'post', 'id': post_id,
+               'subject': sentence(rng, 6),
+               'content': paragraphs(rng, rng.randint(1, 6)),
+               'create_date': date, 'last_date': date,
+               'owner_id': rng.choice(user_ids),
+               'comment_count': counts[offset],
+               'last_activity': timezone.make_aware(datetime.combine(
+                   today - timedelta(days=latest[offset]), time.min))}
+
+    for i, (post_id, age) in enumerate(comment_targets()):
+        date = today - timedelta(days=age)
+        yield {'model': 'comment', 'id': first_ids['comment'] + i,
+               'content': sentence(rng, rng.randint(5, 60)),
+               'create_date': date, 'last_date': date,
+               'owner_id': rng.choice(user_ids),
+               'comment_post_id': post_id}
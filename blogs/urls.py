@@ -2,28 +2,63 @@ from django.contrib.auth.views import LoginView, LogoutView
 from django.urls import path
 
 from blogs import views
+from blogs.captchas import cached_captcha_image
+from blogs.cache import anonymous_page_cache, FEED_SCOPE
+from blogs.feeds import LatestPostsFeed, LatestPostsAtomFeed, \
+    AuthorPostsFeed, AuthorPostsAtomFeed
 from blogs.forms import CaptchaAuthenticationForm
+from blogs.ratelimit import ratelimit
+
+# Feeds are cached with the home feed pages and answer conditional GETs.
+cache_feed = anonymous_page_cache(lambda request, **kwargs: FEED_SCOPE)
 
 urlpatterns = [
     # Home page.
     path('', views.index, name='index'),
 
     # Login page.
-    path('login/', LoginView.as_view(template_name='blogs/login.html',
-                                     authentication_form=CaptchaAuthenticationForm),
+    path('login/', ratelimit('login', ip='20/m', user='5/m')(
+        LoginView.as_view(template_name='blogs/login.html',
+                          authentication_form=CaptchaAuthenticationForm)),
          name='login'),
 
     # Logout page.
     path('logout/', LogoutView.as_view(), name='logout'),
 
     # Signup page.
-    path('signup/', views.signup, name='signup'),
+    path('signup/', ratelimit('signup', ip='5/h')(views.signup),
+         name='signup'),
 
     # Detail Page for a single post.
     path('post/<int:post_id>/', views.post, name='post'),
 
+    # Further pages of comments on a post, loaded as JSON.
+    path('post/<int:post_id>/comments/', views.comments, name='comments'),
+
+    # Search results for posts and comments.
+    path('search/', views.search, name='search'),
+
+    # Request metrics for Prometheus.
+    path('metrics', views.metrics, name='metrics'),
+
+    # RSS and Atom feeds of the whole site.
+    path('feeds/rss/', cache_feed(LatestPostsFeed()), name='rss_feed'),
+    path('feeds/atom/', cache_feed(LatestPostsAtomFeed()), name='atom_feed'),
+
+    # RSS and Atom feeds of a single author.
+    path('feeds/<str:username>/rss/', cache_feed(AuthorPostsFeed()),
+         name='author_rss_feed'),
+    path('feeds/<str:username>/atom/', cache_feed(AuthorPostsAtomFeed()),
+         name='author_atom_feed'),
+
+    # Captcha images, drawn once and then served from the cache. These
+    # shadow the same paths in captcha.urls, which is included later.
+    path('captcha/image/<slug:key>/', cached_captcha_image),
+    path('captcha/image/<slug:key>@2/', cached_captcha_image, {'scale': 2}),
+
     # Page for adding a new post.
-    path('new_post/', views.new_post, name='new_post'),
+    path('new_post/', ratelimit('new_post', ip='30/m', user='10/m')(
+        views.new_post), name='new_post'),
 
     # Page for editing an post.
     path('edit_post/<int:post_id>/', views.edit_post, name='edit_post'),
@@ -33,7 +68,8 @@ urlpatterns = [
          name='delete_post'),
 
     # Page for adding new comment.
-    path('post/<int:post_id>/new_comment/', views.new_comment,
+    path('post/<int:post_id>/new_comment/',
+         ratelimit('new_comment', ip='60/m', user='20/m')(views.new_comment),
          name='new_comment'),
 
     # Page for editing an comment.
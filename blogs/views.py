@@ -1,27 +1,62 @@
 import json
 
 from captcha.helpers import captcha_image_url
-from captcha.models import CaptchaStore
 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 
 from django.contrib.auth.mixins import UserPassesTestMixin
+from django.db import transaction
+from django.db.models import F, Max
 from django.http import HttpResponseRedirect, HttpResponseForbidden, Http404, \
-    HttpResponse
+    HttpResponse, JsonResponse
 from django.shortcuts import render, get_object_or_404
+from django.template.loader import render_to_string
 
 from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.http import urlencode
 from django.views.generic import DeleteView, CreateView
 
+from blogs.cache import attach_rendered_content, invalidate_fragment, \
+    anonymous_page_cache, purge_feed_pages, purge_post_pages, FEED_SCOPE, \
+    post_scope
+from blogs.captchas import pick_key
 from blogs.forms import PostForm, CommentForm, CaptchaUserCreationForm, \
     CaptchaAjaxForm
+from blogs.metrics import exposition
 from blogs.models import Post, Comment
+from blogs.pagination import KeysetPaginator, InvalidCursor
+from blogs.search import Search
+from blogs.tombstones import tombstone_post
 
 
+# Orderings of the home feed, each backed by an index on its keys.
+FEED_ORDERINGS = {
+    'new': ('create_date', 'id'),
+    'active': ('last_activity', 'id'),
+}
+
+
+@anonymous_page_cache(lambda request: FEED_SCOPE)
 def index(request):
-    """The home page for Blog, Show all posts."""
-    posts = Post.objects.all().order_by('-create_date', '-id')
-    context = {'posts': posts}
+    """The home page for Blog, Show the newest posts a page at a time."""
+    sort = request.GET.get('sort', 'new')
+    if sort not in FEED_ORDERINGS:
+        raise Http404
+
+    # The feed renders the stored excerpt, never the full content.
+    posts = Post.objects.select_related('owner').defer('content')
+    paginator = KeysetPaginator(posts,
+                                getattr(settings, 'BLOGS_PAGE_SIZE', 20),
+                                keys=FEED_ORDERINGS[sort])
+    try:
+        page = paginator.get_page(request.GET.get('before'))
+    except InvalidCursor:
+        raise Http404
+
+    context = {'posts': page, 'page': page, 'sort': sort}
     return render(request, 'blogs/index.html', context)
 
 
@@ -43,15 +78,104 @@ def signup(request):
     return render(request, 'blogs/signup.html', context)
 
 
+def post_last_modified(request, post_id):
+    """Return the last date a post or any of its comments changed."""
+    dates = Post.objects.filter(id=post_id).aggregate(
+        post=Max('last_date'), comment=Max('comment__last_date'))
+    if dates['post'] is None:
+        return None
+    return max(date for date in dates.values() if date is not None)
+
+
+def get_comment_page(request, post):
+    """Return the page of comments on post picked by the before cursor."""
+    paginator = KeysetPaginator(post.comment_set.select_related('owner'),
+                                getattr(settings, 'BLOGS_COMMENT_PAGE_SIZE',
+                                        20))
+    try:
+        page = paginator.get_page(request.GET.get('before'))
+    except InvalidCursor:
+        raise Http404
+    attach_rendered_content(page)
+    return page
+
+
+@anonymous_page_cache(lambda request, post_id: post_scope(post_id),
+                      last_modified=post_last_modified)
 def post(request, post_id):
-    """Show a single post, and all its comments."""
-    post = get_object_or_404(Post, id=post_id)
-    post_comments = post.comment_set.all().order_by('-create_date', '-id')
+    """Show a single post, and the first page of its comments."""
+    post = get_object_or_404(Post.objects.select_related('owner'), id=post_id)
+    attach_rendered_content([post])
+    comment_page = get_comment_page(request, post)
 
-    context = {'post': post, 'post_comments': post_comments}
+    context = {'post': post, 'post_comments': comment_page,
+               'comment_page': comment_page}
     return render(request, 'blogs/post.html', context)
 
 
+@anonymous_page_cache(lambda request, post_id: post_scope(post_id),
+                      last_modified=post_last_modified)
+def comments(request, post_id):
+    """Return a further page of comments on a post as JSON."""
+    post = get_object_or_404(Post, id=post_id)
+    comment_page = get_comment_page(request, post)
+
+    context = {'post': post, 'post_comments': comment_page}
+    next_url = None
+    if comment_page.has_next:
+        next_url = '%s?%s' % (reverse('comments', args=[post.id]),
+                              urlencode({'before': comment_page.next_cursor}))
+    return JsonResponse({
+        'html': render_to_string('blogs/comment_list.html', context, request),
+        'next': next_url,
+    })
+
+
+def search(request):
+    """Search posts and comments, best matches first."""
+    query = request.GET.get('q', '').strip()
+    try:
+        results = Search(query, getattr(settings, 'BLOGS_PAGE_SIZE', 20)) \
+            .get_page(request.GET.get('after'))
+    except InvalidCursor:
+        raise Http404
+
+    context = {'query': query, 'results': results}
+    return render(request, 'blogs/search.html', context)
+
+
+# Headers a proxy adds when it forwards a request from elsewhere.
+FORWARDED_HEADERS = ('HTTP_FORWARDED', 'HTTP_X_FORWARDED_FOR',
+                     'HTTP_X_REAL_IP')
+
+
+def metrics_allowed(request):
+    """Return whether ``request`` may read the metrics.
+
+    With BLOGS_METRICS_TOKEN set, the request must carry it as a bearer
+    token. Otherwise it must come straight from an address in
+    BLOGS_METRICS_ALLOWED_IPS: behind a proxy on the same host every
+    client has a local address, so forwarded requests are refused.
+    """
+    token = getattr(settings, 'BLOGS_METRICS_TOKEN', None)
+    if token:
+        return constant_time_compare(
+            request.META.get('HTTP_AUTHORIZATION', ''), 'Bearer %s' % token)
+    if any(header in request.META for header in FORWARDED_HEADERS):
+        return False
+    return request.META.get('REMOTE_ADDR') in getattr(
+        settings, 'BLOGS_METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+
+
+def metrics(request):
+    """Request metrics in the Prometheus text format, for local scrapers."""
+    if not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(exposition(),
+                        content_type='text/plain; version=0.0.4; '
+                                     'charset=utf-8')
+
+
 @login_required
 def new_post(request):
     """Add a new post."""
@@ -65,12 +189,17 @@ def new_post(request):
             new_post = form.save(commit=False)
             new_post.owner = request.user
             new_post.save()
+            purge_feed_pages()
             return HttpResponseRedirect(reverse('post', args=[new_post.id]))
 
     context = {'form': form}
     return render(request, 'blogs/new_post.html', context)
 
 
+# The columns an edit changes; excerpt and last_date follow content.
+EDITED_POST_FIELDS = ['subject', 'content', 'excerpt', 'last_date']
+
+
 @login_required
 def edit_post(request, post_id):
     """Edit an existing post."""
@@ -85,9 +214,14 @@ def edit_post(request, post_id):
         form = PostForm(instance=post)
     else:
         # POST data submitted; process data.
+        invalidate_fragment(post)
         form = PostForm(instance=post, data=request.POST)
         if form.is_valid():
-            form.save()
+            # Leave the comment counters to the comment views: a comment
+            # added since the post was loaded must not be written over.
+            form.save(commit=False).save(update_fields=EDITED_POST_FIELDS)
+            purge_post_pages(post.id)
+            purge_feed_pages()
             return HttpResponseRedirect(reverse('post', args=[post.id]))
 
     context = {'post': post, 'form': form}
@@ -104,6 +238,20 @@ class PostDeleteView(UserPassesTestMixin, DeleteView):
         self.object = self.get_object()
         return self.object.owner == self.request.user
 
+    def delete(self, request, *args, **kwargs):
+        # self.object was loaded by test_func.
+        post_id = self.object.id
+        invalidate_fragment(self.object)
+        if getattr(settings, 'BLOGS_SOFT_DELETE', True):
+            # Hidden at once; reap_tombstones deletes it and its comments.
+            tombstone_post(self.object)
+            response = HttpResponseRedirect(self.get_success_url())
+        else:
+            response = super().delete(request, *args, **kwargs)
+        purge_post_pages(post_id)
+        purge_feed_pages()
+        return response
+
 
 @login_required
 def new_comment(request, post_id):
@@ -119,18 +267,32 @@ def new_comment(request, post_id):
             new_comment = form.save(commit=False)
             new_comment.owner = request.user
             new_comment.comment_post = post
-            new_comment.save()
+            with transaction.atomic():
+                new_comment.save()
+                Post.objects.filter(id=post.id).update(
+                    comment_count=F('comment_count') + 1,
+                    last_activity=timezone.now())
+            purge_post_pages(post.id)
+            # The feed shows comment counts.
+            purge_feed_pages()
             return HttpResponseRedirect(reverse('post', args=[post.id]))
 
     context = {'form': form}
     return render(request, 'blogs/new_comment.html', context)
 
 
+def live_comments():
+    """Comments whose post is not tombstoned either."""
+    # A tombstoned post hides its comments only through the post, so that
+    # tombstoning it does not have to update every one of them.
+    return Comment.objects.filter(comment_post__deleted_at__isnull=True)
+
+
 @login_required
 def edit_comment(request, post_id, comment_id):
     """Edit an existing comment."""
     post = get_object_or_404(Post, id=post_id)
-    comment = get_object_or_404(Comment, id=comment_id)
+    comment = get_object_or_404(live_comments(), id=comment_id)
 
     # Make sure the post belongs to the current user.
     if comment.owner != request.user:
@@ -145,9 +307,11 @@ def edit_comment(request, post_id, comment_id):
         form = CommentForm(instance=comment)
     else:
         # POST data submitted; process data.
+        invalidate_fragment(comment)
         form = CommentForm(instance=comment, data=request.POST)
         if form.is_valid():
             form.save()
+            purge_post_pages(post.id)
             return HttpResponseRedirect(reverse('post', args=[post.id]))
 
     context = {'comment': comment, 'form': form}
@@ -158,10 +322,13 @@ class CommentDeleteView(UserPassesTestMixin, DeleteView):
     """Delete an existing comment."""
     model = Comment
 
+    def get_queryset(self):
+        return live_comments()
+
     def get(self, request, *args, **kwargs):
         """Make sure the comment belongs to the current post."""
         post = get_object_or_404(Post, id=self.kwargs.get('post_id'))
-        comment = get_object_or_404(Comment, id=self.kwargs.get('pk'))
+        comment = get_object_or_404(live_comments(), id=self.kwargs.get('pk'))
 
         if post.id == comment.comment_post_id:
             return super().get(request, *args, **kwargs)
@@ -171,7 +338,7 @@ class CommentDeleteView(UserPassesTestMixin, DeleteView):
     def post(self, request, *args, **kwargs):
         """Make sure the comment belongs to the current post"""
         post = get_object_or_404(Post, id=self.kwargs.get('post_id'))
-        comment = get_object_or_404(Comment, id=self.kwargs.get('pk'))
+        comment = get_object_or_404(live_comments(), id=self.kwargs.get('pk'))
 
         if post.id == comment.comment_post_id:
             return super().post(request, *args, **kwargs)
@@ -183,6 +350,18 @@ class CommentDeleteView(UserPassesTestMixin, DeleteView):
         post_id = self.kwargs.get('post_id')
         return reverse('post', args=[post_id])
 
+    def delete(self, request, *args, **kwargs):
+        # self.object was loaded by test_func.
+        invalidate_fragment(self.object)
+        with transaction.atomic():
+            response = super().delete(request, *args, **kwargs)
+            Post.objects.filter(id=self.object.comment_post_id,
+                                comment_count__gt=0) \
+                .update(comment_count=F('comment_count') - 1)
+        purge_post_pages(self.object.comment_post_id)
+        purge_feed_pages()
+        return response
+
     def test_func(self):
         # Make sure the post belongs to the current user.
         self.object = self.get_object()
@@ -200,7 +379,7 @@ class CaptchaAjax(CreateView):
             to_json_response['status'] = 0
             to_json_response['form_errors'] = form.errors
 
-            to_json_response['new_cptch_key'] = CaptchaStore.generate_key()
+            to_json_response['new_cptch_key'] = pick_key()
             to_json_response['new_cptch_image'] = captcha_image_url(
                 to_json_response['new_cptch_key'])
 
@@ -213,7 +392,7 @@ class CaptchaAjax(CreateView):
             to_json_response = dict()
             to_json_response['status'] = 1
 
-            to_json_response['new_cptch_key'] = CaptchaStore.generate_key()
+            to_json_response['new_cptch_key'] = pick_key()
             to_json_response['new_cptch_image'] = captcha_image_url(
                 to_json_response['new_cptch_key'])
 